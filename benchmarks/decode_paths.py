@@ -0,0 +1,144 @@
+"""
+Compares the legacy .mp4 audio path with the single-decode path.
+
+  - legacy: ffmpeg .mp4 -> 192k .mp3 on disk, then Whisper spawns ffmpeg again to decode the .mp3.
+  - single_decode: one ffmpeg pass writing the .mp3 artifact and 16 kHz PCM to a pipe.
+
+Usage:
+  $ uv run python -m benchmarks.decode_paths --minutes 10
+  $ uv run python -m benchmarks.decode_paths --media /path/to/video.mp4
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict
+
+import whisper
+
+from services.audio_extractor.main import (
+    build_extract_command,
+    run_extract_command,
+)
+
+
+def generate_video_fixture(output_path: str, seconds: int) -> str:
+    """Tone + test pattern .mp4 of a fixed length, encoded like a typical upload."""
+
+    command = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-f",
+        "lavfi",
+        "-i",
+        f"sine=frequency=440:duration={seconds}",
+        "-f",
+        "lavfi",
+        "-i",
+        f"testsrc=duration={seconds}:size=320x240:rate=15",
+        "-shortest",
+        "-c:v",
+        "mpeg4",
+        "-c:a",
+        "aac",
+        "-movflags",
+        "+faststart",
+        "-y",
+        output_path,
+    ]
+    subprocess.run(command, check=True)
+    return output_path
+
+
+def _cpu_seconds() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def _measure(run: Callable[[], int]) -> Dict[str, float]:
+    cpu_start = _cpu_seconds()
+    wall_start = time.perf_counter()
+    samples = run()
+    return {
+        "wall_seconds": time.perf_counter() - wall_start,
+        "cpu_seconds": _cpu_seconds() - cpu_start,
+        "samples": samples,
+    }
+
+
+def run_legacy(mp4_path: str, work_dir: str) -> int:
+    mp3_path = os.path.join(work_dir, "legacy.mp3")
+    command = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-i",
+        mp4_path,
+        "-vn",
+        "-acodec",
+        "libmp3lame",
+        "-ab",
+        "192k",
+        "-y",
+        mp3_path,
+    ]
+    subprocess.run(command, check=True)
+    audio = whisper.load_audio(mp3_path)
+    return len(audio)
+
+
+def run_single_decode(mp4_path: str, work_dir: str) -> int:
+    mp3_path = os.path.join(work_dir, "single.mp3")
+    command = build_extract_command(mp4_path, mp3_path)
+    command.insert(1, "-v")
+    command.insert(2, "error")
+    audio = run_extract_command(command)
+    return len(audio)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--media", help="Existing .mp4 to benchmark.")
+    parser.add_argument(
+        "--minutes", type=float, default=10, help="Length of generated fixture."
+    )
+    parser.add_argument("--output", help="Write results JSON to this path.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        mp4_path = args.media or generate_video_fixture(
+            os.path.join(work_dir, "fixture.mp4"), int(args.minutes * 60)
+        )
+
+        legacy = _measure(lambda: run_legacy(mp4_path, work_dir))
+        single = _measure(lambda: run_single_decode(mp4_path, work_dir))
+
+    media_hours = single["samples"] / 16000 / 3600
+
+    results = {
+        "media_seconds": single["samples"] / 16000,
+        "legacy": legacy,
+        "single_decode": single,
+        "saved_per_media_hour": {
+            "wall_seconds": (legacy["wall_seconds"] - single["wall_seconds"])
+            / media_hours,
+            "cpu_seconds": (legacy["cpu_seconds"] - single["cpu_seconds"])
+            / media_hours,
+        },
+    }
+
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, mode="w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,520 @@
+"""
+End-to-end benchmark of the extractor pipeline, fully offline.
+
+Generated .mp3 and .mp4 fixtures of set lengths are uploaded to a local moto S3, Extractor Queue
+messages carrying --uploads-per-message fixtures each (default 1) are queued on moto SQS, and the service's own handle_sqs_message consumes them
+with an in-process MongoDB stand-in (benchmarks/stand_ins.py). Per-stage timings come from the
+service's job records (services/utils/metrics), so the benchmark measures exactly what production
+reports.
+
+Results are saved as JSON. Save a run as a baseline with --save-baseline and pass it as --baseline to
+later runs on the same machine; the run exits non-zero when a tracked number regresses by more than
+--max-regression. No baseline is checked in, numbers are only comparable on the hardware they came from.
+
+Usage (CPU-only Linux, tiny/base models):
+  $ uv run python -m benchmarks.pipeline --model tiny --save-baseline pipeline_tiny_cpu.json
+  $ uv run python -m benchmarks.pipeline --model tiny --baseline pipeline_tiny_cpu.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Set, Tuple
+
+import numpy as np
+
+from benchmarks.stand_ins import (
+    BUCKET_NAME,
+    InMemoryMongoClient,
+    provision_aws_resources,
+    start_aws_stand_in,
+)
+
+BENCH_USER_ID = "64b7f0000000000000000001"
+BENCH_NOTE_ID = "64b7f0000000000000000002"
+
+# Stages faster than this are too noisy to flag as regressions.
+MIN_COMPARED_SECONDS = 0.05
+
+
+def generate_audio_fixture(
+    output_path: str, seconds: int, silent_seconds: int = 0
+) -> str:
+    """Tone .mp3 of a fixed length, encoded like a typical upload, optionally opening with dead air."""
+
+    command = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-f",
+        "lavfi",
+        "-i",
+        f"sine=frequency=330:duration={seconds}",
+        "-af",
+        f"volume=volume=0:enable='lt(t,{min(silent_seconds, seconds)})'",
+        "-acodec",
+        "libmp3lame",
+        "-ab",
+        "192k",
+        "-y",
+        output_path,
+    ]
+    subprocess.run(command, check=True)
+    return output_path
+
+
+def _parse_lengths(value: str) -> List[int]:
+    return [int(length) for length in value.split(",") if length.strip()]
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+        "mean": float(np.mean(values)),
+        "count": len(values),
+    }
+
+
+def _summarize_records(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    stage_names = sorted({stage for record in records for stage in record["stages"]})
+
+    return {
+        "jobs": len(records),
+        "failed": sum(1 for record in records if record["status"] == "failed"),
+        "media_seconds": sum(record.get("media_seconds") or 0 for record in records),
+        "job_seconds": _percentiles([record["total_seconds"] for record in records]),
+        "stages": {
+            stage: _percentiles(
+                [
+                    record["stages"][stage]
+                    for record in records
+                    if stage in record["stages"]
+                ]
+            )
+            for stage in stage_names
+        },
+    }
+
+
+async def _consume(total_messages: int, mongo_client, max_in_flight: int) -> None:
+    """Same polling/backpressure shape as service.main, stopping once every message was received."""
+
+    import service
+
+    received = 0
+    in_flight: Set[asyncio.Task] = set()
+
+    while received < total_messages:
+        if len(in_flight) >= max_in_flight:
+            await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            continue
+
+        free_slots = max_in_flight - len(in_flight)
+
+        incoming_sqs_msg = await service.get_extractor_sqs_request(
+            min(free_slots, service.SQS_MAX_MESSAGES_PER_POLL)
+        )
+
+        for sqs_payload in incoming_sqs_msg.get("Messages", []):
+            received += 1
+            task = asyncio.create_task(
+                service.handle_sqs_message(sqs_payload, mongo_client)
+            )
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+    if in_flight:
+        await asyncio.wait(in_flight)
+
+
+async def _run_service(
+    total_messages: int, mongo_client, max_in_flight: int
+) -> Tuple[float, float, Dict[str, float]]:
+    """
+    Boots the service like service.main and consumes every message.
+    Returns boot and wall seconds, and the utilization of each media pipeline stage.
+    """
+
+    import service
+    from services.aws.aio import close_aio_clients
+    from services.aws.ssm import load_secrets
+    from services.utils.metrics.main import set_default_labels
+
+    try:
+        boot_start = time.perf_counter()
+        set_default_labels(model=service.WHISPER_MODEL_NAME, device=str(service.DEVICE))
+        pools = [variant.pool for variant in service.inference_variants.values()]
+        await asyncio.gather(
+            *[pool.start() for pool in pools],
+            load_secrets(),
+            asyncio.to_thread(service.scratch_space.prepare),
+        )
+        service.media_pipeline.start()
+        boot_seconds = time.perf_counter() - boot_start
+
+        # Excludes the warm-up requests start() sent to every worker.
+        inference_busy_start = sum(pool.busy_worker_seconds for pool in pools)
+
+        consume_start = time.perf_counter()
+        await _consume(total_messages, mongo_client, max_in_flight)
+        wall_seconds = time.perf_counter() - consume_start
+
+    finally:
+        await service.media_pipeline.stop()
+        await close_aio_clients()
+
+    busy_seconds = service.media_pipeline.busy_seconds()
+
+    # Share of each stage's worker time spent on jobs. inference_workers is the transcriber itself,
+    # it should stay near 1 while there's a backlog.
+    utilization = {
+        stage.name: busy_seconds[stage.name] / (wall_seconds * stage.concurrency)
+        for stage in service.media_pipeline.stages
+    }
+    utilization["inference_workers"] = (
+        sum(pool.busy_worker_seconds for pool in pools) - inference_busy_start
+    ) / (wall_seconds * sum(pool.workers for pool in pools))
+
+    return boot_seconds, wall_seconds, utilization
+
+
+def measure_import_seconds() -> float:
+    """Wall time of importing service in a fresh interpreter, the part of a cold start before main runs."""
+
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", "import service"],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        env={**os.environ, "PYTHONPATH": os.getcwd()},
+    )
+    return time.perf_counter() - start
+
+
+def run_benchmark(args: argparse.Namespace, work_dir: str) -> Dict[str, Any]:
+    job_log_path = os.path.join(work_dir, "jobs.jsonl")
+
+    # Service modules read their config at import time.
+    os.environ["WHISPER_MODEL_NAME"] = args.model
+    os.environ["METRICS_PORT"] = "0"
+    os.environ["METRICS_JOB_LOG_PATH"] = job_log_path
+    os.environ["TRANSCRIPT_CACHE_ENABLED"] = "true" if args.with_cache else "false"
+    os.environ["SCRATCH_DIR"] = os.path.join(work_dir, "scratch")
+
+    server = start_aws_stand_in()
+
+    try:
+        import_seconds = measure_import_seconds()
+
+        parameters = provision_aws_resources()
+
+        import boto3
+
+        import service
+        from benchmarks.decode_paths import generate_video_fixture
+
+        fixtures: List[str] = []
+        for seconds in _parse_lengths(args.mp3_seconds):
+            fixtures.append(
+                generate_audio_fixture(
+                    os.path.join(work_dir, f"audio_{seconds}s.mp3"),
+                    seconds,
+                    args.mp3_silent_seconds,
+                )
+            )
+        for seconds in _parse_lengths(args.mp4_seconds):
+            fixtures.append(
+                generate_video_fixture(
+                    os.path.join(work_dir, f"video_{seconds}s.mp4"), seconds
+                )
+            )
+
+        s3_client = boto3.client("s3")
+        sqs_client = boto3.client("sqs")
+
+        total_messages = 0
+        message_uploads: List[Dict[str, str]] = []
+
+        def send_message() -> None:
+            nonlocal total_messages
+
+            sqs_client.send_message(
+                QueueUrl=parameters["/alwayssaved/EXTRACTOR_PUSH_QUEUE_URL"],
+                MessageBody=json.dumps(
+                    {"user_id": BENCH_USER_ID, "media_uploads": message_uploads}
+                ),
+            )
+            message_uploads.clear()
+            total_messages += 1
+
+        for repeat in range(args.repeat):
+            for fixture_path in fixtures:
+                # A distinct key per repeat, the service names local files after the key's basename.
+                base_title, file_extension = os.path.splitext(
+                    os.path.basename(fixture_path)
+                )
+                s3_key = f"{BENCH_USER_ID}/{BENCH_NOTE_ID}/{base_title}_r{repeat}{file_extension}"
+
+                s3_client.upload_file(fixture_path, BUCKET_NAME, s3_key)
+                message_uploads.append(
+                    {
+                        "s3_key": s3_key,
+                        "note_id": BENCH_NOTE_ID,
+                        "user_id": BENCH_USER_ID,
+                    }
+                )
+
+                if len(message_uploads) >= max(1, args.uploads_per_message):
+                    send_message()
+
+        if message_uploads:
+            send_message()
+
+        mongo_client = InMemoryMongoClient(latency_ms=args.mongo_latency_ms)
+
+        boot_seconds, wall_seconds, stage_utilization = asyncio.run(
+            _run_service(
+                total_messages,
+                mongo_client,
+                args.max_in_flight or service.EXTRACTOR_MAX_IN_FLIGHT_MESSAGES,
+            )
+        )
+
+    finally:
+        if "service" in sys.modules:
+            sys.modules["service"].shutdown_inference_pools()
+        server.stop()
+
+    with open(job_log_path, encoding="utf-8") as file:
+        records = [json.loads(line) for line in file if line.strip()]
+
+    upload_records = [r for r in records if r["job_type"] == "media_upload"]
+    message_records = [r for r in records if r["job_type"] == "sqs_message"]
+    media_seconds = sum(r.get("media_seconds") or 0 for r in upload_records)
+
+    import torch
+
+    return {
+        "config": {
+            "model": args.model,
+            "device": str(service.DEVICE),
+            "mp3_seconds": _parse_lengths(args.mp3_seconds),
+            "mp3_silent_seconds": args.mp3_silent_seconds,
+            "mp4_seconds": _parse_lengths(args.mp4_seconds),
+            "repeat": args.repeat,
+            "uploads_per_message": args.uploads_per_message,
+            "mongo_latency_ms": args.mongo_latency_ms,
+            "transcript_cache": args.with_cache,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "torch": torch.__version__,
+        },
+        "import_seconds": import_seconds,
+        "boot_seconds": boot_seconds,
+        "end_to_end": {
+            "messages": total_messages,
+            "wall_seconds": wall_seconds,
+            "media_seconds": media_seconds,
+            # Media seconds processed per wall-clock second, higher is better.
+            "throughput": media_seconds / wall_seconds if wall_seconds else 0.0,
+            "mongo_round_trips": dict(mongo_client.round_trips),
+            "stage_utilization": stage_utilization,
+        },
+        "file_types": {
+            file_type: _summarize_records(
+                [r for r in upload_records if r["file_type"] == file_type]
+            )
+            for file_type in sorted({r["file_type"] for r in upload_records})
+        },
+        # Share of media the vad stage kept away from the model, and the transcription time that saved.
+        "vad": {
+            "skipped_fraction": (
+                sum(
+                    (r.get("vad_skipped_fraction") or 0) * (r.get("media_seconds") or 0)
+                    for r in upload_records
+                )
+                / media_seconds
+                if media_seconds
+                else 0.0
+            ),
+            "saved_seconds": sum(
+                r.get("vad_saved_seconds") or 0 for r in upload_records
+            ),
+        },
+        # Latency per WHISPER_ROUTING_POLICY rule, for tuning the policy against throughput.
+        "routes": {
+            rule: _summarize_records(
+                [r for r in upload_records if r["route_rule"] == rule]
+            )
+            for rule in sorted({r["route_rule"] for r in upload_records})
+        },
+        "sqs_message": _summarize_records(message_records),
+    }
+
+
+def compare_to_baseline(
+    results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float
+) -> List[str]:
+    """Returns a line per tracked number that got worse by more than max_regression."""
+
+    regressions: List[str] = []
+
+    def check(name: str, current: float, previous: float, higher_is_better: bool):
+        if not previous:
+            return
+
+        change = (current - previous) / previous
+        worse = -change if higher_is_better else change
+
+        print(f"  {name:<55} {previous:>10.3f} -> {current:>10.3f} ({change:+.1%})")
+
+        if worse > max_regression:
+            regressions.append(
+                f"{name}: {previous:.3f} -> {current:.3f} ({change:+.1%})"
+            )
+
+    print("📏 Compared with baseline:")
+
+    # Cold start: a fresh interpreter importing service, then workers loading and warming up.
+    for name in ("import_seconds", "boot_seconds"):
+        check(name, results[name], baseline.get(name, 0.0), higher_is_better=False)
+
+    check(
+        "end_to_end.throughput",
+        results["end_to_end"]["throughput"],
+        baseline["end_to_end"]["throughput"],
+        higher_is_better=True,
+    )
+
+    for group_name, group in [
+        *[(f"file_types.{t}", g) for t, g in results["file_types"].items()],
+        ("sqs_message", results["sqs_message"]),
+    ]:
+        baseline_group = baseline
+        for part in group_name.split(".", 1):
+            baseline_group = baseline_group.get(part, {})
+
+        if not baseline_group:
+            continue
+
+        for percentile in ("p50", "p95"):
+            check(
+                f"{group_name}.job_seconds.{percentile}",
+                group["job_seconds"].get(percentile, 0.0),
+                baseline_group["job_seconds"].get(percentile, 0.0),
+                higher_is_better=False,
+            )
+
+        for stage, stats in group["stages"].items():
+            previous = baseline_group["stages"].get(stage, {}).get("p50", 0.0)
+            if max(previous, stats["p50"]) < MIN_COMPARED_SECONDS:
+                continue
+            check(
+                f"{group_name}.stages.{stage}.p50",
+                stats["p50"],
+                previous,
+                higher_is_better=False,
+            )
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--model", default="tiny", help="Whisper model name or checkpoint path."
+    )
+    parser.add_argument(
+        "--mp3-seconds", default="30,300", help="Comma-separated .mp3 fixture lengths."
+    )
+    parser.add_argument(
+        "--mp4-seconds", default="30,300", help="Comma-separated .mp4 fixture lengths."
+    )
+    parser.add_argument(
+        "--mp3-silent-seconds",
+        type=int,
+        default=0,
+        help="Seconds of silence opening each .mp3 fixture, dead air for the vad stage to cut.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=2, help="Messages queued per fixture."
+    )
+    parser.add_argument(
+        "--uploads-per-message",
+        type=int,
+        default=1,
+        help="Uploads fanned out from each SQS message.",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=0,
+        help="SQS messages processed at once (default EXTRACTOR_MAX_IN_FLIGHT_MESSAGES).",
+    )
+    parser.add_argument(
+        "--mongo-latency-ms",
+        type=float,
+        default=1.0,
+        help="Emulated MongoDB round-trip per call.",
+    )
+    parser.add_argument(
+        "--with-cache",
+        action="store_true",
+        help="Keep the transcript cache on (repeats then hit it).",
+    )
+    parser.add_argument("--output", help="Write results JSON to this path.")
+    parser.add_argument("--baseline", help="Baseline results JSON to compare with.")
+    parser.add_argument(
+        "--save-baseline", help="Write these results as the new baseline."
+    )
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.15,
+        help="Allowed relative regression before failing (default 0.15).",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = run_benchmark(args, work_dir)
+
+    print(json.dumps(results, indent=2))
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, mode="w", encoding="utf-8") as file:
+                json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+
+        regressions = compare_to_baseline(results, baseline, args.max_regression)
+
+        if regressions:
+            print("❌ Regressions beyond --max-regression:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+        print("✅ No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Compares int8 dynamic-quantized CPU inference with the fp32 baseline.
+
+Each precision runs in its own fresh process on the same fixed fixtures, loads the model through the
+service's model registry and transcribes every fixture the way the inference workers do. Reported per
+precision:
+  - real_time_factor: transcription seconds per media second, lower is faster.
+  - model_mb, rss_after_load_mb, peak_rss_mb: the resident model and the process's memory.
+  - word_error_rate: against the fp32 transcripts, and against ground truth for fixtures that have a
+    <fixture>.txt next to them.
+
+Usage:
+  $ uv run python -m benchmarks.quantization --model base --media talk.mp3,interview.mp4
+  $ uv run python -m benchmarks.quantization --model small --threads 4 --output quantization.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from benchmarks.decode_paths import generate_video_fixture
+
+SAMPLE_RATE = 16000
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status", encoding="utf-8") as file:
+        for line in file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_precision(
+    model_name: str, precision: str, media_paths: List[str], threads: int, repeat: int
+) -> Dict[str, Any]:
+    """Runs in a fresh process, so memory numbers only cover this precision."""
+
+    import torch
+
+    from services.audio_extractor.main import decode_local_audio
+    from services.audio_transcription.model_registry import (
+        get_model_registry_stats,
+        get_whisper_model,
+    )
+
+    torch.set_num_threads(threads)
+
+    audios = [decode_local_audio(path) for path in media_paths]
+
+    load_start = time.perf_counter()
+    model = get_whisper_model(model_name, device="cpu", precision=precision)
+    load_seconds = time.perf_counter() - load_start
+
+    rss_after_load_mb = _rss_mb()
+
+    # Untimed, first calls pay for lazy initialization.
+    model.transcribe(audios[0][:SAMPLE_RATE], fp16=False)
+
+    fixtures: List[Dict[str, Any]] = []
+
+    for path, audio in zip(media_paths, audios):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = model.transcribe(audio, fp16=False)
+            timings.append(time.perf_counter() - start)
+
+        fixtures.append(
+            {
+                "fixture": os.path.basename(path),
+                "media_seconds": len(audio) / SAMPLE_RATE,
+                "transcribe_seconds": min(timings),
+                "text": result["text"],
+            }
+        )
+
+    return {
+        "load_seconds": load_seconds,
+        "model_mb": get_model_registry_stats()["resident_bytes"] / 1024**2,
+        "rss_after_load_mb": rss_after_load_mb,
+        # ru_maxrss is in KB on Linux.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "fixtures": fixtures,
+    }
+
+
+def _normalize(text: str) -> List[str]:
+    from whisper.normalizers import EnglishTextNormalizer
+
+    return EnglishTextNormalizer()(text).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """(substitutions + deletions + insertions) / reference words, after Whisper's English normalization."""
+
+    reference_words = _normalize(reference)
+    hypothesis_words = _normalize(hypothesis)
+
+    previous = list(range(len(hypothesis_words) + 1))
+    for i, reference_word in enumerate(reference_words, start=1):
+        current = [i]
+        for j, hypothesis_word in enumerate(hypothesis_words, start=1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (reference_word != hypothesis_word),
+                )
+            )
+        previous = current
+
+    return previous[-1] / max(1, len(reference_words))
+
+
+def _reference_text(media_path: str) -> str | None:
+    reference_path = f"{os.path.splitext(media_path)[0]}.txt"
+    if not os.path.exists(reference_path):
+        return None
+
+    with open(reference_path, encoding="utf-8") as file:
+        return file.read()
+
+
+def summarize(
+    results: Dict[str, Dict[str, Any]], media_paths: List[str]
+) -> Dict[str, Any]:
+    baseline_texts = [fixture["text"] for fixture in results["fp32"]["fixtures"]]
+    references = [_reference_text(path) for path in media_paths]
+
+    summary: Dict[str, Any] = {}
+
+    for precision, result in results.items():
+        fixtures = result["fixtures"]
+        media_seconds = sum(fixture["media_seconds"] for fixture in fixtures)
+        transcribe_seconds = sum(fixture["transcribe_seconds"] for fixture in fixtures)
+
+        for fixture, baseline_text, reference in zip(
+            fixtures, baseline_texts, references
+        ):
+            fixture["word_error_rate_vs_fp32"] = word_error_rate(
+                baseline_text, fixture["text"]
+            )
+            if reference is not None:
+                fixture["word_error_rate_vs_reference"] = word_error_rate(
+                    reference, fixture["text"]
+                )
+
+        with_reference = [
+            fixture for fixture in fixtures if "word_error_rate_vs_reference" in fixture
+        ]
+
+        summary[precision] = {
+            "real_time_factor": transcribe_seconds / media_seconds,
+            "load_seconds": result["load_seconds"],
+            "model_mb": result["model_mb"],
+            "rss_after_load_mb": result["rss_after_load_mb"],
+            "peak_rss_mb": result["peak_rss_mb"],
+            "word_error_rate_vs_fp32": sum(
+                fixture["word_error_rate_vs_fp32"] for fixture in fixtures
+            )
+            / len(fixtures),
+            "word_error_rate_vs_reference": (
+                sum(
+                    fixture["word_error_rate_vs_reference"]
+                    for fixture in with_reference
+                )
+                / len(with_reference)
+                if with_reference
+                else None
+            ),
+            "fixtures": fixtures,
+        }
+
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--model", default="base", help="Whisper model name or checkpoint path."
+    )
+    parser.add_argument(
+        "--media",
+        help="Comma-separated speech fixtures (.mp3/.mp4). Without them a tone fixture is generated, "
+        "which measures speed and memory but has no words for the error rate.",
+    )
+    parser.add_argument(
+        "--precisions", default="fp32,int8", help="Comma-separated, fp32 first."
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="torch threads per run (default all cores).",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="Timed runs per fixture, fastest kept."
+    )
+    parser.add_argument("--output", help="Write results JSON to this path.")
+    args = parser.parse_args()
+
+    precisions = [precision.strip() for precision in args.precisions.split(",")]
+    if precisions[0] != "fp32":
+        parser.error("--precisions must start with the fp32 baseline.")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        media_paths = (
+            [os.path.abspath(path) for path in args.media.split(",")]
+            if args.media
+            else [generate_video_fixture(os.path.join(work_dir, "fixture.mp4"), 30)]
+        )
+
+        results: Dict[str, Dict[str, Any]] = {}
+
+        for precision in precisions:
+            print(f"⏱️ Transcribing {len(media_paths)} fixtures with {precision}...")
+
+            # A fresh spawned process per precision, so peak RSS isn't shared between them.
+            with ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                results[precision] = executor.submit(
+                    run_precision,
+                    args.model,
+                    precision,
+                    media_paths,
+                    args.threads,
+                    args.repeat,
+                ).result()
+
+    summary = summarize(results, media_paths)
+    baseline = summary["fp32"]
+
+    output = {
+        "config": {
+            "model": args.model,
+            "threads": args.threads,
+            "repeat": args.repeat,
+            "media": [os.path.basename(path) for path in media_paths],
+        },
+        "precisions": summary,
+        "vs_fp32": {
+            precision: {
+                # > 1 is faster than fp32.
+                "speedup": baseline["real_time_factor"] / stats["real_time_factor"],
+                "model_memory_ratio": stats["model_mb"] / baseline["model_mb"],
+                "peak_rss_ratio": stats["peak_rss_mb"] / baseline["peak_rss_mb"],
+                "word_error_rate": stats["word_error_rate_vs_fp32"],
+            }
+            for precision, stats in summary.items()
+            if precision != "fp32"
+        },
+    }
+
+    print(json.dumps(output, indent=2))
+
+    if args.output:
+        with open(args.output, mode="w", encoding="utf-8") as file:
+            json.dump(output, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
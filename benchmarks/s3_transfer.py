@@ -0,0 +1,160 @@
+"""
+Compares default S3 transfers with the tuned transfer layer (services/aws/transfer.py).
+
+  - stream: one GetObject body read sequentially vs. ParallelS3Body's concurrent ranged parts.
+  - download: download_fileobj with boto3 defaults vs. download_s3_object.
+  - upload: upload_file with boto3 defaults vs. upload_s3_object.
+
+Runs against a local moto server by default, or any S3-compatible endpoint with --endpoint-url.
+Loopback has no per-connection bandwidth limit, so expect the gap to be much larger against real S3.
+Tune with the S3_TRANSFER_* env vars.
+
+Usage:
+  $ uv run python -m benchmarks.s3_transfer --size-mb 512
+  $ uv run python -m benchmarks.s3_transfer --endpoint-url https://s3.us-east-1.amazonaws.com --bucket my-bench-bucket
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Dict
+
+import boto3
+from botocore.config import Config
+
+from services.aws.transfer import (
+    S3_TRANSFER_CHECKSUM,
+    S3_TRANSFER_MAX_CONCURRENCY,
+    S3_TRANSFER_PART_SIZE_MB,
+    ParallelS3Body,
+    download_s3_object,
+    upload_s3_object,
+)
+
+MB = 1024 * 1024
+
+
+def _measure(size_bytes: int, run: Callable[[], None]) -> Dict[str, float]:
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "mb_per_second": size_bytes / MB / seconds}
+
+
+def _drain(body) -> None:
+    for _ in body.iter_chunks(MB):
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--size-mb", type=int, default=256, help="Test object size.")
+    parser.add_argument(
+        "--endpoint-url", help="S3 endpoint, defaults to a local moto server."
+    )
+    parser.add_argument("--bucket", default="alwayssaved-transfer-bench")
+    parser.add_argument("--output", help="Write results JSON to this path.")
+    args = parser.parse_args()
+
+    server = None
+    endpoint_url = args.endpoint_url
+
+    if endpoint_url is None:
+        from moto.server import ThreadedMotoServer
+
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+        server = ThreadedMotoServer(port=0)
+        server.start()
+        host, port = server.get_host_and_port()
+        endpoint_url = f"http://{host}:{port}"
+
+    s3_client = boto3.client(
+        "s3",
+        endpoint_url=endpoint_url,
+        region_name="us-east-1",
+        config=Config(max_pool_connections=max(10, S3_TRANSFER_MAX_CONCURRENCY * 2)),
+    )
+
+    if server is not None:
+        s3_client.create_bucket(Bucket=args.bucket)
+
+    size_bytes = args.size_mb * MB
+    s3_key = "bench/video.mp4"
+
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            source_path = os.path.join(work_dir, "source.bin")
+            with open(source_path, "wb") as file:
+                for _ in range(args.size_mb):
+                    file.write(os.urandom(MB))
+
+            results = {
+                "size_mb": args.size_mb,
+                "part_size_mb": S3_TRANSFER_PART_SIZE_MB,
+                "max_concurrency": S3_TRANSFER_MAX_CONCURRENCY,
+                "checksum": S3_TRANSFER_CHECKSUM or None,
+                "upload": {
+                    "default": _measure(
+                        size_bytes,
+                        lambda: s3_client.upload_file(source_path, args.bucket, s3_key),
+                    ),
+                    "tuned": _measure(
+                        size_bytes,
+                        lambda: upload_s3_object(
+                            s3_client, source_path, args.bucket, s3_key
+                        ),
+                    ),
+                },
+            }
+
+            target_path = os.path.join(work_dir, "target.bin")
+
+            def download_default() -> None:
+                with open(target_path, "wb") as file:
+                    s3_client.download_fileobj(args.bucket, s3_key, file)
+
+            results["download"] = {
+                "default": _measure(size_bytes, download_default),
+                "tuned": _measure(
+                    size_bytes,
+                    lambda: download_s3_object(
+                        s3_client, args.bucket, s3_key, target_path
+                    ),
+                ),
+            }
+
+            results["stream"] = {
+                "default": _measure(
+                    size_bytes,
+                    lambda: _drain(
+                        s3_client.get_object(Bucket=args.bucket, Key=s3_key)["Body"]
+                    ),
+                ),
+                "tuned": _measure(
+                    size_bytes,
+                    lambda: _drain(ParallelS3Body(s3_client, args.bucket, s3_key)),
+                ),
+            }
+
+        for direction in ("upload", "download", "stream"):
+            results[direction]["speedup"] = (
+                results[direction]["default"]["seconds"]
+                / results[direction]["tuned"]["seconds"]
+            )
+
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, mode="w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Local stand-ins for the services the extractor talks to, so benchmarks run fully offline.
+
+  - S3, SQS and SSM: a moto server on localhost. It's a real HTTP endpoint, so ffmpeg/ffprobe can read
+    presigned URLs from it just like they do from S3.
+  - MongoDB: InMemoryMongoClient, an async in-process stand-in for the subset of AsyncMongoClient
+    the service uses, with optional per-call latency to emulate a network round-trip.
+"""
+
+import asyncio
+import copy
+import os
+from typing import Any, Dict, Iterable, List
+
+from pymongo import InsertOne, UpdateOne
+
+
+class _Result:
+    def __init__(self, **fields: Any):
+        self.__dict__.update(fields)
+
+
+def _matches(document: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for field, condition in query.items():
+        value = document.get(field)
+
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$ne" in condition and value == condition["$ne"]:
+                return False
+        elif value != condition:
+            return False
+
+    return True
+
+
+class InMemoryCollection:
+    def __init__(self, latency_seconds: float, counters: Dict[str, int]):
+        self.documents: Dict[Any, Dict[str, Any]] = {}
+        self._latency_seconds = latency_seconds
+        self._counters = counters
+
+    async def _round_trip(self, operation: str) -> None:
+        self._counters[operation] = self._counters.get(operation, 0) + 1
+        if self._latency_seconds:
+            await asyncio.sleep(self._latency_seconds)
+
+    def _find(self, query: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+        return [doc for doc in self.documents.values() if _matches(doc, query)]
+
+    def _insert(self, document: Dict[str, Any]) -> Any:
+        from bson.objectid import ObjectId
+
+        document = copy.deepcopy(document)
+        document.setdefault("_id", ObjectId())
+
+        if document["_id"] in self.documents:
+            raise ValueError(f"Duplicate _id {document['_id']}")
+
+        self.documents[document["_id"]] = document
+        return document["_id"]
+
+    @staticmethod
+    def _increment(document: Dict[str, Any], increments: Dict[str, float]) -> None:
+        for path, amount in increments.items():
+            *parents, field = path.split(".")
+            target = document
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[field] = target.get(field, 0) + amount
+
+    def _update(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool):
+        matches = list(self._find(query))
+
+        if not matches and upsert:
+            document = {**query, **update.get("$set", {})}
+            self._increment(document, update.get("$inc", {}))
+            self._insert(document)
+            return None
+
+        for document in matches[:1]:
+            document.update(update.get("$set", {}))
+            self._increment(document, update.get("$inc", {}))
+            return document
+
+        return None
+
+    async def insert_one(self, document: Dict[str, Any]):
+        await self._round_trip("insert_one")
+        return _Result(inserted_id=self._insert(document))
+
+    async def find_one(self, query: Dict[str, Any]):
+        await self._round_trip("find_one")
+        matches = list(self._find(query))
+        return copy.deepcopy(matches[0]) if matches else None
+
+    async def find_one_and_update(
+        self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False
+    ):
+        await self._round_trip("find_one_and_update")
+        return self._update(query, update, upsert)
+
+    async def update_one(
+        self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False
+    ):
+        await self._round_trip("update_one")
+        self._update(query, update, upsert)
+
+    async def bulk_write(self, operations: List[Any], ordered: bool = True):
+        await self._round_trip("bulk_write")
+
+        for operation in operations:
+            if isinstance(operation, InsertOne):
+                self._insert(operation._doc)
+            elif isinstance(operation, UpdateOne):
+                self._update(operation._filter, operation._doc, operation._upsert)
+            else:
+                raise NotImplementedError(type(operation).__name__)
+
+    async def delete_one(self, query: Dict[str, Any]):
+        await self._round_trip("delete_one")
+        for document in list(self._find(query))[:1]:
+            del self.documents[document["_id"]]
+
+    async def delete_many(self, query: Dict[str, Any]):
+        await self._round_trip("delete_many")
+        matches = list(self._find(query))
+        for document in matches:
+            del self.documents[document["_id"]]
+        return _Result(deleted_count=len(matches))
+
+
+class InMemoryDatabase:
+    def __init__(self, latency_seconds: float, counters: Dict[str, int]):
+        self._collections: Dict[str, InMemoryCollection] = {}
+        self._latency_seconds = latency_seconds
+        self._counters = counters
+
+    def get_collection(self, name: str) -> InMemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = InMemoryCollection(
+                self._latency_seconds, self._counters
+            )
+        return self._collections[name]
+
+
+class InMemoryMongoClient:
+    """round_trips counts calls per operation, the number the File bookkeeping is judged on."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self._databases: Dict[str, InMemoryDatabase] = {}
+        self._latency_seconds = latency_ms / 1000
+        self.round_trips: Dict[str, int] = {}
+
+    def get_database(self, name: str) -> InMemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = InMemoryDatabase(
+                self._latency_seconds, self.round_trips
+            )
+        return self._databases[name]
+
+
+BUCKET_NAME = "alwayssaved-bench"
+
+
+def start_aws_stand_in():
+    """
+    Starts a moto server and points every boto3 and aiobotocore client created afterwards at it
+    (AWS_ENDPOINT_URL). The service creates its clients on first use, so call this before the first call.
+    """
+
+    from moto.server import ThreadedMotoServer
+
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+
+    os.environ["AWS_ENDPOINT_URL"] = f"http://{host}:{port}"
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    os.environ["AWS_REGION"] = "us-east-1"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+    return server
+
+
+def provision_aws_resources() -> Dict[str, str]:
+    """Bucket, queues and the SSM parameters the service reads at boot."""
+
+    import boto3
+
+    s3_client = boto3.client("s3")
+    sqs_client = boto3.client("sqs")
+    ssm_client = boto3.client("ssm")
+
+    s3_client.create_bucket(Bucket=BUCKET_NAME)
+
+    extractor_queue_url = sqs_client.create_queue(QueueName="extractor-push-queue")[
+        "QueueUrl"
+    ]
+    embedding_queue_url = sqs_client.create_queue(QueueName="embedding-push-queue")[
+        "QueueUrl"
+    ]
+
+    parameters = {
+        "/alwayssaved/AWS_BUCKET": BUCKET_NAME,
+        "/alwayssaved/AWS_BUCKET_BASE_URL": f"{os.environ['AWS_ENDPOINT_URL']}/{BUCKET_NAME}",
+        "/alwayssaved/EXTRACTOR_PUSH_QUEUE_URL": extractor_queue_url,
+        "/alwayssaved/EMBEDDING_PUSH_QUEUE_URL": embedding_queue_url,
+    }
+
+    for name, value in parameters.items():
+        ssm_client.put_parameter(Name=name, Value=value, Type="String", Overwrite=True)
+
+    return parameters
@@ -0,0 +1,177 @@
+"""
+Compares peak memory of in-memory and streamed transcription against media length.
+
+  - in_memory: the media decoded to one float32 array, then whisper's transcribe with the full
+    log-mel spectrogram, what the inference workers do for media under WHISPER_STREAMING_MIN_SECONDS.
+  - streaming: the media decoded to a PCM file, then transcribed from it one 30-second window at a
+    time (services/audio_transcription/streaming).
+
+Every length and path runs in its own fresh process holding the model, so peak RSS only covers that
+run. Reported per run: peak_rss_mb, job_peak_mb (peak above the loaded model) and the real-time factor.
+--features-only stops after the log-mel features, the part that grows with the media, so multi-hour
+lengths measure in seconds.
+
+Usage:
+  $ uv run python -m benchmarks.streaming --model tiny --minutes 10,60,240 --features-only
+  $ uv run python -m benchmarks.streaming --model tiny --minutes 5,30 --output streaming.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict
+
+from benchmarks.pipeline import generate_audio_fixture
+from benchmarks.quantization import _rss_mb
+
+SAMPLE_RATE = 16000
+
+PATHS = ("in_memory", "streaming")
+
+
+def run_path(
+    model_name: str, path: str, media_path: str, pcm_path: str, features_only: bool
+) -> Dict[str, Any]:
+    """Runs in a fresh process, so its peak RSS only covers this path and length."""
+
+    import whisper
+
+    from services.audio_extractor.main import count_pcm_samples, decode_local_audio
+    from services.audio_transcription.model_registry import get_whisper_model
+    from services.audio_transcription.streaming import (
+        StreamedAudio,
+        _window_mel,
+        transcribe_streaming,
+    )
+
+    model = get_whisper_model(model_name, device="cpu", precision="fp32")
+    rss_after_load_mb = _rss_mb()
+
+    start = time.perf_counter()
+
+    if path == "in_memory":
+        audio = decode_local_audio(media_path)
+        media_seconds = len(audio) / SAMPLE_RATE
+
+        if features_only:
+            # What whisper's transcribe computes up front.
+            whisper.log_mel_spectrogram(
+                audio, model.dims.n_mels, padding=whisper.audio.N_SAMPLES
+            )
+        else:
+            model.transcribe(audio, fp16=False, language="en")
+    else:
+        decode_local_audio(media_path, pcm_path)
+        streamed = StreamedAudio(pcm_path, count_pcm_samples(pcm_path))
+        media_seconds = streamed.seconds
+
+        if features_only:
+            window_frames = whisper.audio.N_FRAMES
+            content_frames = streamed.samples // whisper.audio.HOP_LENGTH
+            for seek in range(0, content_frames, window_frames):
+                _window_mel(
+                    model,
+                    streamed,
+                    seek,
+                    min(window_frames, content_frames - seek),
+                    False,
+                )
+        else:
+            transcribe_streaming(model, streamed, False, {"language": "en"})
+
+    elapsed_seconds = time.perf_counter() - start
+    # ru_maxrss is in KB on Linux.
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    return {
+        "media_seconds": media_seconds,
+        "seconds": elapsed_seconds,
+        "real_time_factor": elapsed_seconds / media_seconds,
+        "rss_after_load_mb": rss_after_load_mb,
+        "peak_rss_mb": peak_rss_mb,
+        "job_peak_mb": peak_rss_mb - rss_after_load_mb,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--model", default="tiny", help="Whisper model name or checkpoint path."
+    )
+    parser.add_argument(
+        "--minutes",
+        default="10,60,240",
+        help="Comma-separated lengths of the generated fixtures.",
+    )
+    parser.add_argument(
+        "--features-only",
+        action="store_true",
+        help="Stop after the log-mel features instead of decoding text.",
+    )
+    parser.add_argument("--output", help="Write results JSON to this path.")
+    args = parser.parse_args()
+
+    lengths = [float(minutes) for minutes in args.minutes.split(",") if minutes]
+    runs = []
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for minutes in lengths:
+            media_path = generate_audio_fixture(
+                os.path.join(work_dir, f"audio_{minutes:g}m.mp3"), int(minutes * 60)
+            )
+            pcm_path = os.path.join(work_dir, f"audio_{minutes:g}m.pcm")
+
+            run: Dict[str, Any] = {"minutes": minutes}
+
+            for path in PATHS:
+                print(f"⏱️ {path} on {minutes:g} minutes of audio...")
+
+                # A fresh spawned process per run, so peak RSS isn't shared between them.
+                with ProcessPoolExecutor(
+                    max_workers=1, mp_context=multiprocessing.get_context("spawn")
+                ) as executor:
+                    run[path] = executor.submit(
+                        run_path,
+                        args.model,
+                        path,
+                        media_path,
+                        pcm_path,
+                        args.features_only,
+                    ).result()
+
+            os.remove(pcm_path)
+
+            # > 1 means streaming held less memory per job.
+            run["job_peak_ratio"] = run["in_memory"]["job_peak_mb"] / max(
+                run["streaming"]["job_peak_mb"], 1.0
+            )
+            runs.append(run)
+
+            print(
+                f"📈 {minutes:g} min: peak {run['in_memory']['peak_rss_mb']:.0f} MB in memory, "
+                f"{run['streaming']['peak_rss_mb']:.0f} MB streaming"
+            )
+
+    output = {
+        "config": {
+            "model": args.model,
+            "minutes": lengths,
+            "features_only": args.features_only,
+        },
+        "runs": runs,
+    }
+
+    print(json.dumps(output, indent=2))
+
+    if args.output:
+        with open(args.output, mode="w", encoding="utf-8") as file:
+            json.dump(output, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,17 @@ from concurrent.futures import ThreadPoolExecutor
 from typing import TYPE_CHECKING, Any, Dict, List
 
 import boto3
-import whisper
+import torch
 import yt_dlp
 from botocore.exceptions import BotoCoreError, ClientError
 from bson.objectid import ObjectId
 from dotenv import load_dotenv
 
+from services.audio_transcription.model_registry import (
+    get_model_registry_stats,
+    get_whisper_model,
+    precision_uses_fp16,
+)
 from services.aws.ssm import get_secret
 from services.utils.main import format_timestamp
 
@@ -240,7 +245,7 @@ def _mp4_to_mp3_keep_original(mp4_abs_path: str) -> str:
 
 
 def transcribe_local_media(
-    file_name_or_path: str, include_timestamps: bool = True
+    file_name_or_path: str, include_timestamps: bool = True, precision: str = "fp32"
 ) -> str | None:
     """
     Accepts a local .mp4 or .mp3 file (bare filename, or full path).
@@ -249,6 +254,7 @@ def transcribe_local_media(
     Transcribes the resulting .mp3 with Whisper and writes a timestamped
     .txt transcript to the project root. Nothing is deleted. Returns the
     transcript's abs path, or None on failure.
+    precision is fp32, fp16 (GPU) or int8 (dynamic-quantized, CPU).
     """
 
     try:
@@ -268,11 +274,19 @@ def transcribe_local_media(
         if not os.path.exists(mp3_abs_path):
             raise FileNotFoundError(f"❌ Expected mp3 not found: {mp3_abs_path}")
 
-        print(f"🧠 Loading Whisper model '{WHISPER_MODEL_NAME}'...")
-        model = whisper.load_model(WHISPER_MODEL_NAME)
+        print(f"🧠 Loading Whisper model '{WHISPER_MODEL_NAME}' ({precision})...")
+        model = get_whisper_model(
+            WHISPER_MODEL_NAME,
+            device="cuda" if torch.cuda.is_available() else "cpu",
+            precision=precision,
+        )
+        registry_stats = get_model_registry_stats()
+        print(
+            f"📦 Model registry hits {registry_stats['hits']} misses {registry_stats['misses']} load times {registry_stats['load_seconds']}"
+        )
 
         print(f"📝 Transcribing {mp3_abs_path}...")
-        result = model.transcribe(mp3_abs_path, fp16=False)
+        result = model.transcribe(mp3_abs_path, fp16=precision_uses_fp16(precision))
 
         transcript_abs_path = os.path.join(PROJECT_ROOT, f"{file_name}.txt")
 
@@ -299,3 +313,4 @@ def transcribe_local_media(
 # transcribe_local_media("my_video.mp4")             # project root or ~/Downloads, timestamps on
 # transcribe_local_media("my_audio.mp3", False)       # plain text, no timestamps
 # transcribe_local_media("/absolute/path/clip.mp4")   # full path also works
+# transcribe_local_media("my_audio.mp3", precision="int8")  # int8 quantized model on cpu
@@ -5,28 +5,121 @@ Main extractor service file
 import asyncio
 import json
 import os
+import signal
 import time
-from typing import Coroutine, List
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Dict,
+    List,
+    NamedTuple,
+    Set,
+    Tuple,
+)
 
-import boto3
-import torch
-import whisper
+import numpy as np
 from dotenv import load_dotenv
 from pymongo import AsyncMongoClient
 
 from services.audio_extractor.main import (
+    WHISPER_SAMPLE_RATE,
+    count_pcm_samples,
+    decode_media,
     delete_local_file,
-    download_and_convert_from_s3,
+    estimate_decoded_audio_bytes,
+    estimate_scratch_bytes,
+    fetch_source_from_s3,
+    probe_media_duration,
+)
+from services.audio_transcription.batching import (
+    BatchTranscriber,
+    fits_single_window,
+)
+from services.audio_transcription.chunked import (
+    should_transcribe_chunked,
+    transcribe_chunked,
+)
+from services.audio_transcription.inference_pool import (
+    InferencePool,
+    get_device_slots,
+    resolve_device_concurrency,
+    resolve_worker_count,
+    split_worker_count,
+)
+from services.audio_transcription.real_time_factor import (
+    estimate_processing_seconds,
+    record_real_time_factor,
+)
+from services.audio_transcription.routing import (
+    DEFAULT_USER_TIER,
+    WHISPER_ROUTING_POLICY,
+    ModelRouter,
+    RoutingDecision,
+    parse_routing_rules,
+)
+from services.audio_transcription.streaming import StreamedAudio, should_stream
+from services.audio_transcription.vad import (
+    WHISPER_VAD_ENABLED,
+    TimeMap,
+    find_speech_clips,
+    trim_to_speech,
+)
+from services.aws.aio import close_aio_clients
+from services.aws.s3 import (
+    commit_file_records,
+    copy_s3_file,
+    delete_s3_files,
+    download_s3_file,
+    head_s3_object,
+    upload_s3_file,
 )
-
-from services.aws.s3 import upload_s3_file_record_in_db
 from services.aws.sqs import (
-    delete_extractor_sqs_message,
+    EXTRACTOR_INITIAL_VISIBILITY_TIMEOUT,
+    SQS_MAX_MESSAGES_PER_POLL,
     get_extractor_sqs_request,
-    send_embedding_sqs_message,
+)
+from services.aws.sqs_heartbeat import VisibilityHeartbeat
+from services.aws.sqs_outbox import ack_extractor_message, send_embedding_message
+from services.aws.ssm import load_secrets
+from services.utils.metrics.main import (
+    JobTimer,
+    cold_start_seconds,
+    process_age_seconds,
+    real_time_factor,
+    routed_job_seconds,
+    routing_decisions_total,
+    set_default_labels,
+    set_ready,
+    start_metrics_server,
+    vad_saved_seconds_total,
+    vad_skipped_seconds_total,
+)
+from services.utils.mongodb.language_profile import (
+    get_language_hint,
+    record_detected_language,
 )
 from services.utils.mongodb.main import create_mongodb_instance
-from services.utils.types.main import ExtractorStatus, FilePayload, s3MediaUpload
+from services.utils.mongodb.transcript_cache import (
+    build_cache_key,
+    fingerprint_audio,
+    fingerprint_pcm_file,
+    fingerprint_s3_object,
+    forget_cached_transcript,
+    get_transcript_cache_stats,
+    lookup_cached_transcript,
+    store_cached_transcript,
+)
+from services.utils.admission.main import audio_memory, ffmpeg_slots
+from services.utils.pipeline.main import Stage, StagedPipeline
+from services.utils.scratch.main import Workspace, scratch_space
+from services.utils.types.main import (
+    CachedTranscript,
+    ExtractorStatus,
+    FileRecord,
+    s3MediaUpload,
+)
 from services.utils.main import format_timestamp
 
 # GLOBAL INIT
@@ -34,275 +127,1089 @@ load_dotenv()
 
 PYTHON_ENVIRONMENT = os.getenv("PYTHON_ENVIRONMENT", "production")
 
-# Force device detection once in main context
+# cpu, cuda or mps. auto detects it, which costs importing torch in a process that otherwise never needs it.
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "auto")
+
+
+def detect_device() -> str:
+    if WHISPER_DEVICE != "auto":
+        return WHISPER_DEVICE
+
+    import torch
+
+    if PYTHON_ENVIRONMENT == "production" and torch.cuda.is_available():
+        return "cuda"
 
-DEVICE = "cpu"
-if PYTHON_ENVIRONMENT == "production" and torch.cuda.is_available():
-    DEVICE = "cuda"
-elif torch.backends.mps.is_available():
-    DEVICE = torch.device("mps")
-    print("Using 🍎 Apple GPU")
+    if torch.backends.mps.is_available():
+        print("Using 🍎 Apple GPU")
+        return "mps"
+
+    return "cpu"
+
+
+# Force device detection once in main context
+DEVICE = detect_device()
 
 print(f"✅ [BOOT] Using device: {DEVICE}")
 
-WHISPER_MODEL_NAME = "base"  # Or turbo -> confirm this is valid
-WHISPER_MODEL = whisper.load_model(WHISPER_MODEL_NAME, device=str(DEVICE))
-print(f"✅ Model loaded on device: {next(WHISPER_MODEL.parameters()).device}")
+WHISPER_MODEL_NAME = os.getenv(
+    "WHISPER_MODEL_NAME", "base"
+)  # Or turbo -> confirm this is valid
+WHISPER_PRECISION = os.getenv("WHISPER_PRECISION", "fp32")
+
+# Picks the model and decode settings per upload, WHISPER_MODEL_NAME and WHISPER_PRECISION unless a rule matches.
+model_router = ModelRouter(
+    WHISPER_MODEL_NAME,
+    WHISPER_PRECISION,
+    parse_routing_rules(WHISPER_ROUTING_POLICY, str(DEVICE)),
+)
+
+
+def transcript_options(route: RoutingDecision) -> Dict[str, Any]:
+    """Everything besides the model and the media that changes the transcript, part of the transcript cache key."""
+
+    options = route.transcript_options()
+    if WHISPER_VAD_ENABLED:
+        options["vad"] = "energy"
+    return options
+
+
+# Max number of SQS messages being processed at once on this node, resolved below the media pipeline.
+EXTRACTOR_MAX_IN_FLIGHT_MESSAGES_SETTING = os.getenv(
+    "EXTRACTOR_MAX_IN_FLIGHT_MESSAGES", "auto"
+)
+
+# Jobs that can wait in front of each media pipeline stage.
+PIPELINE_QUEUE_SIZE = max(1, int(os.getenv("PIPELINE_QUEUE_SIZE", "2")))
+
+
+class InferenceVariant(NamedTuple):
+    pool: InferencePool
+    batch_transcriber: BatchTranscriber
+
+
+# Every (model, precision) the routing policy can pick, the default first.
+_variant_keys = [model_router.default.variant] + sorted(
+    model_router.variants() - {model_router.default.variant}
+)
+
+# The variants split the device's workers and cores instead of each sizing a pool for the whole node.
+_device_workers = resolve_worker_count(str(DEVICE))
+_variant_workers = split_worker_count(str(DEVICE), len(_variant_keys))
+_torch_threads = max(1, (os.cpu_count() or 1) // sum(_variant_workers))
+
+# Transcriptions admitted on this device at once, shared by every variant.
+device_slots = get_device_slots(str(DEVICE), _device_workers)
+
+# Whisper runs in long-lived worker processes that each hold the model, never in the event loop's process.
+# Short clips from concurrent uploads share one batched forward pass.
+inference_variants: Dict[Tuple[str, str], InferenceVariant] = {}
+
+for (_model_name, _precision), _workers in zip(_variant_keys, _variant_workers):
+    _pool = InferencePool(
+        _model_name,
+        device=str(DEVICE),
+        precision=_precision,
+        workers=_workers,
+        torch_threads=_torch_threads,
+    )
+    inference_variants[(_model_name, _precision)] = InferenceVariant(
+        _pool, BatchTranscriber(_pool.transcribe_batch, device_slots)
+    )
 
-AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
-s3_client = boto3.client("s3", region_name=AWS_REGION)
+inference_pool, batch_transcriber = inference_variants[model_router.default.variant]
 
 
-# Global lock to serialize GPU access
-gpu_lock = asyncio.Lock()
+def shutdown_inference_pools() -> None:
+    for variant in inference_variants.values():
+        variant.pool.shutdown()
 
 
 # AUDIO TRANSCRIPTION
 
 """
-Returns {file_name}.txt string to callsite or None.
+Writes a Whisper result to transcript_path in the job's workspace and returns the path.
 """
 
 
-def transcribe_audio(file_name: str, include_timestamps: bool = False) -> str | None:
+def write_transcript(
+    transcript_path: str, result: Dict[str, Any], include_timestamps: bool = False
+) -> str:
 
-    try:
-        print(f"💻 [subprocess] Using device in transcribe_audio: {DEVICE}")
+    with open(file=transcript_path, mode="w", encoding="utf-8") as file:
+        if include_timestamps:
+            for segment in result["segments"]:
+                line_timestamp = format_timestamp(segment["start"])
+                line_text = segment["text"].strip()
+                file.write(f"{line_timestamp}: {line_text}\n")
+        else:
+            file.write(result["text"])
+
+    return transcript_path
 
-        model = whisper.load_model(WHISPER_MODEL_NAME, device=str(DEVICE))
 
-        print(f"📦 Model loaded on: {next(model.parameters()).device}")
+"""
+Transcribes 16 kHz mono float32 audio decoded by the decode stage in the inference workers,
+or streams it window by window from the PCM file of a StreamedAudio, in language when given instead of detecting it.
+Returns the Whisper result (text, segments, language) to callsite or None.
+"""
 
-        transcript_file_name = f"{file_name}.txt"
 
-        mp3_file_name = f"{file_name}.mp3"
+async def transcribe_audio(
+    audio: np.ndarray | StreamedAudio,
+    route: RoutingDecision | None = None,
+    language: str | None = None,
+) -> Dict[str, Any] | None:
 
-        mp3_file_abs_path = os.path.abspath(mp3_file_name)
+    route = route or model_router.default
+    pool = inference_variants[route.variant].pool
 
-        result = model.transcribe(mp3_file_abs_path, fp16=False)
+    decode_options = route.decode_options()
+    if language:
+        decode_options["language"] = language
 
-        with open(file=transcript_file_name, mode="w", encoding="utf-8") as file:
-            file.write(result["text"])
+    try:
+        print(
+            f"💻 Transcribing with {route.model} ({route.precision}) in an inference worker on device: {DEVICE}"
+        )
 
-        transcript_file_name = f"{file_name}.txt"
+        if isinstance(audio, StreamedAudio):
+            print(
+                f"🌊 Streaming {audio.clip_seconds:.0f}s of {audio.seconds:.0f}s of audio from {os.path.basename(audio.pcm_path)} in 30s windows."
+            )
+            return await pool.transcribe_stream(audio, decode_options)
 
-        with open(file=transcript_file_name, mode="w", encoding="utf-8") as file:
-            if include_timestamps:
-                for segment in result["segments"]:
-                    line_timestamp = format_timestamp(segment["start"])
-                    line_text = segment["text"].strip()
-                    file.write(f"{line_timestamp}: {line_text}\n")
-            else:
-                file.write(result["text"])
+        if should_transcribe_chunked(audio, pool):
+            return await transcribe_chunked(audio, pool, device_slots, decode_options)
 
-        return transcript_file_name
+        # Whisper takes the in-memory array as-is, no second ffmpeg decode.
+        return await pool.transcribe(audio, decode_options)
 
     except Exception as e:
-        print(f"❌ [subprocess] Failed in transcribe_audio: {e}")
+        print(f"❌ Failed in transcribe_audio: {e}")
     return None
 
 
 """
-MEDIA PROCESSING
-NOTE: process_media_upload will not handle sanitizing media file title. Should be handled by Frontend.
+Reuses a cached transcript of identical media for a new upload with server-side s3 copies.
+Returns None if the cached objects are gone, so the caller can process the upload from scratch.
 """
 
 
-async def process_media_upload(
-    upload: s3MediaUpload, mongo_client: AsyncMongoClient
-) -> ExtractorStatus:
-
-    mp3_abs_path = None
-    transcript_abs_path = None
+async def copy_cached_transcript(
+    upload: s3MediaUpload, cached: CachedTranscript
+) -> ExtractorStatus | None:
 
     user_id = upload["user_id"]
     note_id = upload["note_id"]
+    base_filename = os.path.basename(upload["s3_key"])
+    file_name, file_extension = os.path.splitext(base_filename)
+
+    copies: List[Coroutine] = [
+        copy_s3_file(
+            {
+                "file_name": f"{file_name}.txt",
+                "source_s3_key": cached["transcript_s3_key"],
+                "user_id": user_id,
+                "note_id": note_id,
+            },
+        )
+    ]
+
+    if file_extension == ".mp4":
+        copies.append(
+            copy_s3_file(
+                {
+                    "file_name": f"{file_name}.mp3",
+                    "source_s3_key": cached["audio_s3_key"],
+                    "user_id": user_id,
+                    "note_id": note_id,
+                },
+            )
+        )
+
+    file_records: List[FileRecord | None] = await asyncio.gather(*copies)
+
+    if not all(file_records):
+        await delete_s3_files([record for record in file_records if record])
+        return None
+
+    transcript_record = file_records[0]
+
+    print(
+        f"♻️ Reused cached transcript {cached['transcript_s3_key']} for user {user_id} note {note_id} media_title {file_name}"
+    )
+
+    return {
+        "s3_key": upload["s3_key"],
+        "status": "success",
+        "file_records": file_records,
+        "embedding_message": {
+            "original_filename": base_filename,
+            "note_id": note_id,
+            "user_id": user_id,
+            "file_id": transcript_record["new_file_id"],
+            "transcript_s3_key": transcript_record["uploaded_s3_key"],
+        },
+        "cache_keys": [],
+    }
+
+
+"""
+MEDIA PROCESSING
+Every media upload runs through media_pipeline: fetch -> decode -> vad -> transcribe -> publish.
+Each stage has its own workers and a bounded queue in front of it, so while one upload is being
+transcribed the next ones are already downloaded and decoded, waiting for the device.
+NOTE: process_media_upload will not handle sanitizing media file title. Should be handled by Frontend.
+"""
+
+
+class MediaJob:
+    """One media upload's state as it moves through the pipeline stages."""
+
+    def __init__(
+        self,
+        upload: s3MediaUpload,
+        mongo_client: AsyncMongoClient,
+        route: RoutingDecision,
+        user_tier: str = DEFAULT_USER_TIER,
+        backlog: int = 0,
+        probed_duration: float | None = None,
+    ):
+        self.upload = upload
+        self.mongo_client = mongo_client
+        self.route = route
+        self.probed_duration = probed_duration
+
+        # Multi-hour media is decoded to a PCM file and transcribed from it in windows, never held in memory.
+        self.is_streamed = should_stream(probed_duration)
+
+        self.base_filename = os.path.basename(upload["s3_key"])  # e.g., video1.mp4
+        self.file_name, self.file_extension = os.path.splitext(self.base_filename)
+
+        self.timer = JobTimer(
+            "media_upload",
+            file_type=self.file_extension,
+            s3_key=upload["s3_key"],
+            user_id=upload["user_id"],
+            note_id=upload["note_id"],
+            route_rule=route.rule,
+            model=route.model,
+            precision=route.precision,
+            user_tier=user_tier,
+            backlog=backlog,
+        )
+        self.status = "failed"
+        self.media_duration = 0.0
+
+        self.cache_keys: List[str] = []
+        self.head_response: Dict[str, Any] | None = None
+        self.workspace: Workspace | None = None
+        self.source_path: str | None = None
+        self.audio: np.ndarray | None = None
+        # Bytes of audio_memory held for the decoded audio, returned by release_audio.
+        self.audio_reserved_bytes = 0
+        self.streamed: StreamedAudio | None = None
+        self.mp3_path: str | None = None
+        self.transcript_path: str | None = None
+        self.language_hint: str | None = None
+
+        # Set when the vad stage cut non-speech out of audio, maps its timestamps back to the media.
+        self.time_map: TimeMap | None = None
+        self.transcribed_seconds = 0.0
+        self.vad_skipped_seconds = 0.0
+        self.vad_saved_seconds = 0.0
+
+        # When the job left its last stage, to time how long it queued for the next one.
+        self.handed_off_at = time.perf_counter()
+
+    def local_path(self, extension: str) -> str:
+        return os.path.join(self.workspace.path, f"{self.file_name}{extension}")
+
+
+async def fetch_stage(job: MediaJob) -> ExtractorStatus | None:
+    upload = job.upload
     s3_key = upload["s3_key"]
 
+    # 0) Identical media already transcribed -> reuse it without downloading anything.
+    with job.timer.stage("cache_lookup"):
+        job.head_response = await head_s3_object(s3_key)
+        s3_fingerprint = (
+            fingerprint_s3_object(job.head_response) if job.head_response else None
+        )
+
+        cached = None
+        if s3_fingerprint:
+            s3_cache_key = build_cache_key(
+                "s3",
+                s3_fingerprint,
+                job.route.model,
+                transcript_options(job.route),
+            )
+            job.cache_keys.append(s3_cache_key)
+
+            cached = await lookup_cached_transcript(
+                job.mongo_client, s3_cache_key, "s3"
+            )
+
+    # An .mp4 hit also needs the cached .mp3 artifact.
+    if cached and (job.file_extension != ".mp4" or cached["audio_s3_key"]):
+        with job.timer.stage("cache_copy"):
+            cached_status = await copy_cached_transcript(upload, cached)
+
+        if cached_status:
+            job.status = "cache_hit"
+            return cached_status
+
+        await forget_cached_transcript(job.mongo_client, s3_cache_key)
+
+    # 1) Reserve an isolated scratch workspace, waits while the scratch budget is used up.
+    with job.timer.stage("scratch_wait"):
+        job.workspace = await scratch_space.acquire(
+            job.file_name,
+            estimate_scratch_bytes(
+                (job.head_response or {}).get("ContentLength", 0),
+                job.file_extension,
+                job.probed_duration if job.is_streamed else 0.0,
+            ),
+        )
+
+    # 1a) In "download" ingest mode, bring the source into the workspace ahead of its decode.
+    with job.timer.stage("fetch"):
+        try:
+            job.source_path = await asyncio.to_thread(
+                fetch_source_from_s3, s3_key, job.workspace.path
+            )
+        except Exception as e:
+            raise ValueError(f"fetch_source_from_s3 failed: {e}") from e
+
+    return None
+
+
+async def decode_stage(job: MediaJob) -> ExtractorStatus | None:
+    s3_key = job.upload["s3_key"]
+    local_mp3_path = job.local_path(".mp3")
+
+    # Streamed media goes to a PCM file in the workspace, counted in its scratch reservation.
+    pcm_path = job.local_path(".pcm") if job.is_streamed else None
+
+    # 1b) Reserve memory for the decoded audio, waits while the audio memory budget is used up.
+    if not job.is_streamed:
+        with job.timer.stage("audio_memory_wait"):
+            job.audio_reserved_bytes = await audio_memory.acquire(
+                estimate_decoded_audio_bytes(
+                    job.probed_duration,
+                    (job.head_response or {}).get("ContentLength", 0),
+                    job.file_extension,
+                )
+            )
+
+    with job.timer.stage("ffmpeg_wait"):
+        await ffmpeg_slots.acquire()
+
+    # 1c) Decode the source once to PCM, streaming it from S3 if it wasn't fetched.
     try:
-        # 1) Download the s3 file.
-        audio_download_start_time = time.time()
+        with job.timer.stage("decode"):
+            try:
+                audio = await asyncio.to_thread(
+                    decode_media, s3_key, job.workspace.path, job.source_path, pcm_path
+                )
+            except Exception as e:
+                raise ValueError(f"decode_media failed: {e}") from e
+    finally:
+        ffmpeg_slots.release()
+
+    # If an .mp4's .mp3 wasn't created locally, raise error.
+    if job.file_extension == ".mp4" and not os.path.exists(local_mp3_path):
+        raise ValueError("decode_media didn't write the .mp3 audio track.")
+
+    if job.file_extension == ".mp4":
+        job.mp3_path = local_mp3_path
+
+    if pcm_path:
+        job.streamed = StreamedAudio(pcm_path, count_pcm_samples(pcm_path))
+        job.media_duration = job.streamed.seconds
+        audio_fingerprint = await asyncio.to_thread(fingerprint_pcm_file, pcm_path)
+    else:
+        # The estimate was an upper bound, hold what the audio really takes.
+        job.audio_reserved_bytes = await audio_memory.adjust(
+            job.audio_reserved_bytes, audio.nbytes
+        )
+        job.media_duration = len(audio) / WHISPER_SAMPLE_RATE
+        audio_fingerprint = fingerprint_audio(audio)
+
+    # 1d) Same audio in a different container -> reuse its transcript, skip transcription.
+    audio_cache_key = build_cache_key(
+        "audio",
+        audio_fingerprint,
+        job.route.model,
+        transcript_options(job.route),
+    )
+    job.cache_keys.append(audio_cache_key)
+
+    with job.timer.stage("cache_lookup"):
+        cached = await lookup_cached_transcript(
+            job.mongo_client, audio_cache_key, "audio"
+        )
 
-        await asyncio.to_thread(download_and_convert_from_s3, s3_key)
+        if cached:
+            local_transcript_path = job.local_path(".txt")
 
-        base_filename = os.path.basename(s3_key)  # e.g., video1.mp4
+            if await download_s3_file(
+                cached["transcript_s3_key"], local_transcript_path
+            ):
+                job.transcript_path = local_transcript_path
+                job.status = "cache_hit"
+                await release_audio(job)
+                print(
+                    f"♻️ Reused cached transcript {cached['transcript_s3_key']} for user {job.upload['user_id']} note {job.upload['note_id']} media_title {job.file_name}"
+                )
+                return None
+
+            await forget_cached_transcript(job.mongo_client, audio_cache_key)
+
+    job.audio = audio
+    job.transcribed_seconds = job.media_duration
+    return None
 
-        file_name, file_extension = os.path.splitext(base_filename)
 
-        # If an .mp3 file was not downloaded or created locally, raise error.
-        if not os.path.exists(f"{file_name}.mp3"):
-            raise ValueError("download_and_convert_from_s3 failed.")
+async def vad_stage(job: MediaJob) -> ExtractorStatus | None:
+    # 1e) Only speech regions go on to the model, long silences and dead air are cut out.
+    if job.streamed:
+        # Streamed audio isn't cut, its speech regions become the clips the stream decodes.
+        with job.timer.stage("vad"):
+            clips = await asyncio.to_thread(
+                find_speech_clips, job.streamed.pcm_path, job.streamed.samples
+            )
 
-        audio_elapsed_time = time.time() - audio_download_start_time
+        if clips is None:
+            return None
 
-        print(
-            f"Elapsed time for user {user_id} note {note_id} media_title {file_name} audio download: {audio_elapsed_time:.2f}s"
+        job.streamed = job.streamed._replace(clips=clips)
+        job.transcribed_seconds = job.streamed.clip_seconds
+        job.vad_skipped_seconds = max(0.0, job.media_duration - job.transcribed_seconds)
+    else:
+        with job.timer.stage("vad"):
+            trimmed_audio, time_map = await asyncio.to_thread(trim_to_speech, job.audio)
+
+        if time_map is None:
+            return None
+
+        job.audio = trimmed_audio
+        job.audio_reserved_bytes = await audio_memory.adjust(
+            job.audio_reserved_bytes, trimmed_audio.nbytes
         )
+        job.time_map = time_map
+        job.transcribed_seconds = len(trimmed_audio) / WHISPER_SAMPLE_RATE
+        job.vad_skipped_seconds = max(0.0, job.media_duration - time_map.speech_seconds)
 
-        mp3_abs_path = os.path.abspath(f"{file_name}.mp3")
+    # What the skipped audio would have cost at this node's measured real-time factor.
+    job.vad_saved_seconds = estimate_processing_seconds(
+        max(0.0, job.media_duration - job.transcribed_seconds)
+    )
 
-        # 2) Transcribe audio file.
-        # 7-11-26 TODO: Implement timestamped transcripting for paid subscriptions feature.
-        async with gpu_lock:
-            transcribe_start_time = time.time()
-            base_transcript_file_name = transcribe_audio(file_name)
+    vad_skipped_seconds_total.inc(job.vad_skipped_seconds, file_type=job.file_extension)
+    vad_saved_seconds_total.inc(job.vad_saved_seconds, file_type=job.file_extension)
 
-            if base_transcript_file_name:
-                transcript_abs_path = os.path.abspath(base_transcript_file_name)
+    print(
+        f"🔇 Skipping {job.vad_skipped_seconds:.0f}s of {job.media_duration:.0f}s without speech in {job.file_name}, about {job.vad_saved_seconds:.0f}s of transcription saved."
+    )
 
-            transcribe_elapsed_time = time.time() - transcribe_start_time
+    return None
 
-        print(
-            f"Elapsed time for user {user_id} note {note_id} media_title {file_name} transcribing: {transcribe_elapsed_time:.2f}s"
+
+async def transcribe_stage(job: MediaJob) -> ExtractorStatus | None:
+    audio = job.streamed or job.audio
+    route = job.route
+    variant = inference_variants[route.variant]
+    user_id = job.upload["user_id"]
+    local_transcript_path = job.local_path(".txt")
+
+    # The user's usual language skips Whisper's language detection pass, None leaves it to detection.
+    with job.timer.stage("language_lookup"):
+        job.language_hint = await get_language_hint(job.mongo_client, user_id)
+
+    # 2) Transcribe audio file with the routed model and decode settings.
+    # Timestamped transcripts (e.g. for paid subscriptions) come from a routing rule's include_timestamps.
+    # Batches decode greedily without segment timestamps, clips routed to beam search or timestamps take the regular path.
+    is_batched = (
+        job.streamed is None
+        and not route.beam_size
+        and not route.include_timestamps
+        and variant.batch_transcriber.enabled()
+        and fits_single_window(audio)
+    )
+    # Long audio split into chunks takes a device slot per chunk instead of one for the job.
+    is_chunked = (
+        job.streamed is None
+        and not is_batched
+        and should_transcribe_chunked(audio, variant.pool)
+    )
+    transcribe_elapsed_time = 0.0
+    result: Dict[str, Any] | None = None
+
+    try:
+        if is_batched:
+            # Short clip -> joins the next batched forward pass with other uploads' clips.
+            transcribe_start_time = time.perf_counter()
+            result = await variant.batch_transcriber.transcribe(
+                audio, job.language_hint
+            )
+
+            transcribe_elapsed_time = time.perf_counter() - transcribe_start_time
+            job.timer.add_stage("transcribe_batched", transcribe_elapsed_time)
+        else:
+            if not is_chunked:
+                with job.timer.stage("transcribe_wait"):
+                    await device_slots.acquire()
+
+            try:
+                transcribe_start_time = time.perf_counter()
+                result = await transcribe_audio(audio, route, job.language_hint)
+
+                transcribe_elapsed_time = time.perf_counter() - transcribe_start_time
+                job.timer.add_stage("transcribe", transcribe_elapsed_time)
+            finally:
+                if not is_chunked:
+                    device_slots.release()
+
+    finally:
+        # Decoded audio is no longer needed, free it before the uploads.
+        del audio
+        await release_audio(job)
+
+    if result is not None:
+        # Segment times back onto the original media.
+        if job.time_map is not None:
+            result = job.time_map.remap_result(result)
+
+        job.transcript_path = write_transcript(
+            local_transcript_path, result, route.include_timestamps
         )
 
-        if not transcript_abs_path:
-            raise ValueError(
-                f"Transcription for user {user_id} note {note_id} media_title {file_name} failed."
+        # Only detected languages fill in the profile, a hinted result just echoes the hint.
+        if job.language_hint is None:
+            await record_detected_language(
+                job.mongo_client, user_id, result.get("language")
             )
 
-        audio_payload: FilePayload = {"s3_key": "", "file_id": ""}
+    # Batched clips include queue wait in their elapsed time, keep them out of the estimate.
+    # Per second actually transcribed, so VAD-trimmed jobs don't skew it.
+    if job.transcript_path and transcribe_elapsed_time and not is_batched:
+        record_real_time_factor(job.transcribed_seconds, transcribe_elapsed_time)
+        real_time_factor.observe(
+            transcribe_elapsed_time / max(job.transcribed_seconds, 1e-3),
+            file_type=job.file_extension,
+            model=route.model,
+        )
+
+    if not job.transcript_path:
+        raise ValueError(
+            f"Transcription for user {user_id} note {job.upload['note_id']} media_title {job.file_name} failed."
+        )
 
-        # 2a) Upload the .mp3 file to s3 if target file was an .mp4 file.
-        if file_extension == ".mp4":
-            audio_payload = await upload_s3_file_record_in_db(
-                s3_client,
-                mongo_client,
+    return None
+
+
+async def publish_stage(job: MediaJob) -> ExtractorStatus:
+    user_id = job.upload["user_id"]
+    note_id = job.upload["note_id"]
+
+    # 3) Upload the transcript, and the .mp3 file if target file was an .mp4 file, side by side.
+    # File _ids are pre-allocated, the File documents are committed with the rest of the SQS message.
+    uploads: List[Coroutine] = [
+        upload_s3_file(
+            {
+                "file_name": f"{job.file_name}.txt",
+                "file_path": job.transcript_path,
+                "user_id": user_id,
+                "note_id": note_id,
+            },
+        )
+    ]
+
+    if job.file_extension == ".mp4":
+        uploads.append(
+            upload_s3_file(
                 {
-                    "file_name": f"{file_name}.mp3",
-                    "file_path": mp3_abs_path,
+                    "file_name": f"{job.file_name}.mp3",
+                    "file_path": job.mp3_path,
                     "user_id": user_id,
                     "note_id": note_id,
                 },
             )
+        )
 
-        # 3) Upload the transcript to s3 and create File document.
-        transcript_payload = await upload_s3_file_record_in_db(
-            s3_client,
-            mongo_client,
-            {
-                "file_name": f"{file_name}.txt",
-                "file_path": transcript_abs_path,
-                "user_id": user_id,
-                "note_id": note_id,
-            },
+    with job.timer.stage("upload"):
+        file_records: List[FileRecord | None] = await asyncio.gather(*uploads)
+
+    if not all(file_records):
+        # Nothing gets committed for this upload, don't leave the artifacts that made it behind.
+        await delete_s3_files([record for record in file_records if record])
+        raise ValueError("Failed to upload audio or transcript to S3.")
+
+    transcript_record = file_records[0]
+    audio_record = file_records[1] if len(file_records) > 1 else None
+
+    # 4) Delete the job's workspace with its local .txt & .mp3 files, freeing its scratch budget.
+    await scratch_space.release(job.workspace)
+    job.workspace = None
+
+    if job.status != "cache_hit":
+        job.status = "success"
+
+    return {
+        "s3_key": job.upload["s3_key"],
+        "status": "success",
+        "file_records": file_records,
+        "embedding_message": {
+            "original_filename": job.base_filename,
+            "note_id": note_id,
+            "user_id": user_id,
+            "file_id": transcript_record["new_file_id"],
+            "transcript_s3_key": transcript_record["uploaded_s3_key"],
+        },
+        "cache_keys": job.cache_keys,
+        "model_name": job.route.model,
+        "cached_transcript": {
+            "transcript_s3_key": transcript_record["uploaded_s3_key"],
+            "transcript_file_id": transcript_record["new_file_id"],
+            "audio_s3_key": audio_record["uploaded_s3_key"] if audio_record else "",
+        },
+    }
+
+
+def _queued_stage(
+    name: str, handler: Callable[[MediaJob], Awaitable[ExtractorStatus | None]]
+) -> Callable[[MediaJob], Awaitable[ExtractorStatus | None]]:
+    """Records how long the job waited in the stage's queue in its timing record, e.g. transcribe_queue."""
+
+    async def run(job: MediaJob) -> ExtractorStatus | None:
+        job.timer.add_stage(f"{name}_queue", time.perf_counter() - job.handed_off_at)
+        try:
+            return await handler(job)
+        finally:
+            job.handed_off_at = time.perf_counter()
+
+    return run
+
+
+async def release_audio(job: MediaJob) -> None:
+    """Drops the job's decoded audio and returns its reservation to the audio memory budget."""
+
+    job.audio = None
+
+    # A streamed job's PCM file goes as soon as it's transcribed, not with the rest of the workspace.
+    if job.streamed:
+        delete_local_file(job.streamed.pcm_path)
+        job.streamed = None
+
+    await audio_memory.release(job.audio_reserved_bytes)
+    job.audio_reserved_bytes = 0
+
+
+async def finalize_media_job(job: MediaJob) -> None:
+    """Runs once per job however it left the pipeline."""
+
+    await release_audio(job)
+
+    if job.workspace:
+        await scratch_space.release(job.workspace)
+        job.workspace = None
+
+    record = job.timer.finish(
+        job.status,
+        media_seconds=job.media_duration,
+        language_hint=job.language_hint,
+        streamed=job.is_streamed,
+        vad_skipped_seconds=job.vad_skipped_seconds,
+        vad_skipped_fraction=job.vad_skipped_seconds / max(job.media_duration, 1e-3),
+        vad_saved_seconds=job.vad_saved_seconds,
+    )
+
+    routed_job_seconds.observe(
+        record["total_seconds"],
+        rule=job.route.rule,
+        model=job.route.model,
+        status=job.status,
+    )
+
+
+def _stage_concurrency(name: str, default: int) -> int:
+    return max(1, int(os.getenv(f"PIPELINE_{name.upper()}_CONCURRENCY", default)))
+
+
+# Enough transcriptions in the stage to keep every device slot busy, and to fill a batch of clips.
+_transcribe_concurrency = resolve_device_concurrency(_device_workers) * (
+    batch_transcriber.batch_size if batch_transcriber.enabled() else 1
+)
+
+media_pipeline = StagedPipeline(
+    "media",
+    [
+        Stage(
+            "fetch",
+            _queued_stage("fetch", fetch_stage),
+            _stage_concurrency("fetch", 4),
+            PIPELINE_QUEUE_SIZE,
+        ),
+        Stage(
+            "decode",
+            _queued_stage("decode", decode_stage),
+            _stage_concurrency("decode", 2),
+            PIPELINE_QUEUE_SIZE,
+        ),
+        Stage(
+            "vad",
+            _queued_stage("vad", vad_stage),
+            _stage_concurrency("vad", 2),
+            PIPELINE_QUEUE_SIZE,
+            skip=lambda job: not WHISPER_VAD_ENABLED or job.transcript_path is not None,
+        ),
+        Stage(
+            "transcribe",
+            _queued_stage("transcribe", transcribe_stage),
+            _stage_concurrency("transcribe", _transcribe_concurrency),
+            PIPELINE_QUEUE_SIZE,
+            # Audio-level cache hits already have their transcript.
+            skip=lambda job: job.transcript_path is not None,
+        ),
+        Stage(
+            "publish",
+            _queued_stage("publish", publish_stage),
+            _stage_concurrency("publish", 4),
+            PIPELINE_QUEUE_SIZE,
+        ),
+    ],
+    finalize=finalize_media_job,
+)
+
+# Max number of SQS messages being processed at once on this node. auto = enough to fill every stage and queue.
+EXTRACTOR_MAX_IN_FLIGHT_MESSAGES = (
+    sum(stage.concurrency + stage.queue_size for stage in media_pipeline.stages)
+    if EXTRACTOR_MAX_IN_FLIGHT_MESSAGES_SETTING == "auto"
+    else max(1, int(EXTRACTOR_MAX_IN_FLIGHT_MESSAGES_SETTING))
+)
+
+
+def route_media_upload(
+    upload: s3MediaUpload, media_duration: float | None, user_tier: str
+) -> Tuple[RoutingDecision, int]:
+    """Picks the upload's model and decode settings from its duration, the user's tier and the backlog."""
+
+    # Jobs already in the pipeline on this node, ahead of this one.
+    backlog = media_pipeline.pending()
+    route = model_router.route(media_duration, user_tier, backlog)
+
+    routing_decisions_total.inc(
+        rule=route.rule, model=route.model, precision=route.precision, tier=user_tier
+    )
+
+    if route.rule != model_router.default.rule:
+        duration_text = f"{media_duration:.0f}s" if media_duration else "unknown length"
+        print(
+            f"🧭 Routed {upload['s3_key']} ({duration_text}, {user_tier} tier, backlog {backlog}) to {route.model} ({route.precision}) by rule {route.rule}"
         )
 
-        if file_extension == "mp4":
-            if not all(
-                [
-                    audio_payload.get("uploaded_s3_key"),
-                    audio_payload.get("new_file_id"),
-                    transcript_payload.get("uploaded_s3_key"),
-                    transcript_payload.get("new_file_id"),
-                ]
-            ):
-                raise ValueError("Failed to upload audio or transcript to S3.")
-        else:
-            if not all(
-                [
-                    transcript_payload.get("uploaded_s3_key"),
-                    transcript_payload.get("new_file_id"),
-                ]
-            ):
-                raise ValueError("Failed to upload audio to S3.")
+    return route, backlog
 
-        # 4) Delete local .txt & .mp3 files from Extractor Service.
-        delete_local_file(mp3_abs_path)
-        mp3_abs_path = None
 
-        delete_local_file(transcript_abs_path)
-        transcript_abs_path = None
+async def process_media_upload(
+    upload: s3MediaUpload,
+    mongo_client: AsyncMongoClient,
+    media_duration: float | None = None,
+    user_tier: str = DEFAULT_USER_TIER,
+) -> ExtractorStatus:
 
-        # 5) Send SQS Message to embedding queue & delete old processed SQS message.
-        await asyncio.to_thread(
-            send_embedding_sqs_message,
-            {
-                "original_filename": base_filename,
-                "note_id": note_id,
-                "user_id": user_id,
-                "file_id": transcript_payload["new_file_id"],
-                "transcript_s3_key": transcript_payload["uploaded_s3_key"],
-            },
+    try:
+        route, backlog = route_media_upload(upload, media_duration, user_tier)
+
+        return await media_pipeline.submit(
+            MediaJob(upload, mongo_client, route, user_tier, backlog, media_duration)
         )
 
+    except ValueError as e:
+        print(
+            f"❌ Value Error in process_media_upload function for user {upload['user_id']} with note_id {upload['note_id']} and s3_key {upload['s3_key']}: {e}"
+        )
         return {
-            "s3_key": s3_key,
-            "status": "success",
+            "s3_key": upload["s3_key"],
+            "status": "failed",
         }
 
-    except ValueError as e:
+    # Anything else a stage raises (S3, disk, a dead inference worker) fails this upload only,
+    # so the message's other uploads still get their File records committed.
+    except Exception as e:
         print(
-            f"❌ Value Error in process_media_upload function for user {user_id} with note_id {note_id} and s3_key {s3_key}: {e}"
+            f"❌ Unexpected Error in process_media_upload function for user {upload['user_id']} with note_id {upload['note_id']} and s3_key {upload['s3_key']}: {e}"
         )
-        if mp3_abs_path:
-            delete_local_file(mp3_abs_path)
-
-        if transcript_abs_path:
-            delete_local_file(transcript_abs_path)
-
-        mp3_abs_path = None
-        transcript_abs_path = None
-
         return {
-            "s3_key": s3_key,
+            "s3_key": upload["s3_key"],
             "status": "failed",
         }
 
 
-# MAIN LOOP
-async def main():
+async def probe_upload_duration(s3_key: str) -> float | None:
+    """ffprobe counts against the same process cap as the decodes."""
 
-    mongo_client = create_mongodb_instance()
+    async with ffmpeg_slots.hold():
+        return await asyncio.to_thread(probe_media_duration, s3_key)
 
-    while True:
-        if mongo_client is None:
-            print(
-                "❌ App fails preliminary first check with mongo_client unavailable. Can't run Extractor service."
-            )
-            return
 
-        # For MVP, will only dequee one SQS message at a time.
-        incoming_sqs_msg = get_extractor_sqs_request()
-        message_list = incoming_sqs_msg.get("Messages", [])
+# SQS MESSAGE HANDLING
+async def handle_sqs_message(
+    sqs_payload: Dict[str, Any], mongo_client: AsyncMongoClient
+) -> None:
+    """
+    Processes every media upload in one Extractor Queue message.
+    The message is deleted if at least one upload succeeded, otherwise it's released for SQS redrive or DLQ.
+    """
 
-        if not message_list:
-            print("No messages in SQS queue. Waiting...")
-            await asyncio.sleep(5)
-            continue
+    message_id = sqs_payload.get("MessageId", "")
 
-        popped_sqs_payload = message_list.pop()
+    message_job = JobTimer("sqs_message", message_id=message_id)
+    message_status = "failed"
 
-        message_id = popped_sqs_payload.get("MessageId", "")
+    # Time from the upload being queued to this worker picking it up.
+    sent_timestamp = sqs_payload.get("Attributes", {}).get("SentTimestamp")
+    if sent_timestamp:
+        message_job.add_stage(
+            "queue_wait", max(0.0, time.time() - int(sent_timestamp) / 1000)
+        )
+
+    heartbeat = VisibilityHeartbeat(sqs_payload, EXTRACTOR_INITIAL_VISIBILITY_TIMEOUT)
+    heartbeat.start()
 
-        sqs_message_body = json.loads(popped_sqs_payload.get("Body", {}))
+    try:
+        sqs_message_body = json.loads(sqs_payload.get("Body", "{}"))
 
         user_id = sqs_message_body.get("user_id")
         media_uploads: List[s3MediaUpload] = sqs_message_body.get("media_uploads")
+        user_tier = sqs_message_body.get("user_tier") or DEFAULT_USER_TIER
 
         if not (user_id and media_uploads):
             raise ValueError(
-                f"❌ App fails preliminary second check. Incoming SQS Message {message_id} missing user_id or media_uploads. Can't continue with Extractor service."
+                f"Incoming SQS Message {message_id} missing user_id or media_uploads."
+            )
+
+        # Size the visibility lease from the actual media length before doing the work.
+        with message_job.stage("probe"):
+            media_durations: List[float | None] = await asyncio.gather(
+                *[probe_upload_duration(upload["s3_key"]) for upload in media_uploads]
             )
 
+        await heartbeat.set_media_duration(
+            sum(duration for duration in media_durations if duration)
+        )
+
         tasks: List[Coroutine] = [
-            process_media_upload(upload, mongo_client) for upload in media_uploads
+            process_media_upload(upload, mongo_client, media_duration, user_tier)
+            for upload, media_duration in zip(media_uploads, media_durations)
         ]
 
-        results = await asyncio.gather(*tasks)
-        success_count = sum(1 for result in results if result["status"] == "success")
+        with message_job.stage("process_uploads"):
+            results: List[ExtractorStatus] = await asyncio.gather(*tasks)
+        successes = [result for result in results if result["status"] == "success"]
+        success_count = len(successes)
         failure_count = len(results) - success_count
 
         if success_count == 0:
-            # All failed -> Don't delete -> Let SQS redrive or DLQ
-            print("❌ All media uploads failed — skipping delete to allow DLQ redrive.")
-        else:
-            # 6) Delete old processed SQS message.
-            delete_extractor_sqs_message(popped_sqs_payload)
+            # All failed -> Release right away -> Let SQS redrive or DLQ
+            print(
+                f"❌ All media uploads failed for SQS Message {message_id} — releasing it for DLQ redrive."
+            )
+            await heartbeat.release()
+            return
+
+        # 5) Commit the File documents of every successful upload in one round-trip.
+        with message_job.stage("mongo_commit"):
+            committed = await commit_file_records(
+                mongo_client,
+                [record for result in successes for record in result["file_records"]],
+            )
 
+        if not committed:
             print(
-                f"✅ Processed message with {success_count} successes and {failure_count} failures."
+                f"❌ Failed to commit File documents for SQS Message {message_id} — releasing it for retry."
+            )
+            await heartbeat.release()
+            return
+
+        # 6) Remember new transcripts for identical media, then hand them to the embedding queue.
+        with message_job.stage("cache_store"):
+            await asyncio.gather(
+                *[
+                    store_cached_transcript(
+                        mongo_client,
+                        result["cache_keys"],
+                        result["model_name"],
+                        result["cached_transcript"],
+                    )
+                    for result in successes
+                    if result["cache_keys"]
+                ]
+            )
+
+        cache_stats = get_transcript_cache_stats()
+        print(
+            f"♻️ Transcript cache hit rate {cache_stats['hit_rate']:.1%} (s3 hits {cache_stats['s3_hits']}, audio hits {cache_stats['audio_hits']}, misses {cache_stats['misses']})"
+        )
+
+        # Batched with the hand-offs of every other in-flight message.
+        with message_job.stage("sqs_handoff"):
+            delivered: List[bool] = await asyncio.gather(
+                *[
+                    send_embedding_message(result["embedding_message"])
+                    for result in successes
+                ]
+            )
+
+        if not all(delivered):
+            # Acking would lose the transcripts that never reached the embedding queue.
+            print(
+                f"❌ {delivered.count(False)} embedding messages not sent for SQS Message {message_id} — releasing it for retry."
+            )
+            await heartbeat.release()
+            return
+
+        # 7) Delete old processed SQS message.
+        await heartbeat.stop()
+
+        with message_job.stage("sqs_ack"):
+            await ack_extractor_message(sqs_payload)
+
+        message_status = "success" if failure_count == 0 else "partial"
+
+        print(
+            f"✅ Processed message {message_id} with {success_count} successes and {failure_count} failures."
+        )
+
+    except (ValueError, json.JSONDecodeError) as e:
+        print(
+            f"❌ Skipping SQS Message {message_id}, releasing it for DLQ redrive: {e}"
+        )
+        await heartbeat.release()
+
+    except Exception as e:
+        print(f"❌ Unexpected error handling SQS Message {message_id}: {e}")
+        await heartbeat.release()
+
+    finally:
+        await heartbeat.stop()
+        message_job.finish(message_status)
+
+
+# MAIN LOOP
+async def connect_mongodb(boot: JobTimer) -> AsyncMongoClient | None:
+    # One GetParametersByPath call instead of a GetParameter per lookup, Mongo's URI is built from them.
+    with boot.stage("secrets"):
+        await load_secrets()
+
+    with boot.stage("mongo"):
+        return await create_mongodb_instance()
+
+
+async def start_inference_workers(boot: JobTimer) -> None:
+    # Every inference worker of every routable model loads and warms up before the first message is taken.
+    with boot.stage("model_load"):
+        await asyncio.gather(
+            *[variant.pool.start() for variant in inference_variants.values()]
+        )
+
+    for variant in inference_variants.values():
+        print(
+            f"✅ Model {variant.pool.model_name} loaded in {variant.pool.workers} inference workers on device: {DEVICE}"
+        )
+
+
+async def main():
+
+    boot = JobTimer("boot")
+
+    # Interpreter start-up and module imports, everything before main runs.
+    boot.add_stage("imports", process_age_seconds())
+
+    set_default_labels(model=WHISPER_MODEL_NAME, device=str(DEVICE))
+
+    # /ready answers 503 until the first message can be taken.
+    start_metrics_server()
+
+    # Workers spawn and load their weights while secrets, Mongo and scratch are set up.
+    mongo_client, _, _ = await asyncio.gather(
+        connect_mongodb(boot),
+        start_inference_workers(boot),
+        asyncio.to_thread(scratch_space.prepare),
+    )
+
+    if mongo_client is None:
+        print(
+            "❌ App fails preliminary first check with mongo_client unavailable. Can't run Extractor service."
+        )
+        boot.finish("failed")
+        shutdown_inference_pools()
+        return
+
+    media_pipeline.start()
+
+    in_flight: Set[asyncio.Task] = set()
+
+    print(
+        f"✅ [BOOT] Consuming up to {EXTRACTOR_MAX_IN_FLIGHT_MESSAGES} SQS messages at a time."
+    )
+
+    # docker stop sends SIGTERM: cancel main like Ctrl+C does, which also aborts the SQS long poll in flight.
+    asyncio.get_running_loop().add_signal_handler(
+        signal.SIGTERM, asyncio.current_task().cancel
+    )
+
+    cold_start = process_age_seconds()
+    cold_start_seconds.set(cold_start)
+    boot.finish("success", cold_start_seconds=cold_start)
+
+    set_ready(True)
+    print(f"✅ [BOOT] Ready to take SQS messages {cold_start:.2f}s after start.")
+
+    try:
+        while True:
+            # Backpressure: stop polling until a worker slot frees up and the pipeline has room.
+            if in_flight and (
+                len(in_flight) >= EXTRACTOR_MAX_IN_FLIGHT_MESSAGES
+                or not media_pipeline.accepting()
+            ):
+                await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            free_slots = EXTRACTOR_MAX_IN_FLIGHT_MESSAGES - len(in_flight)
+
+            incoming_sqs_msg = await get_extractor_sqs_request(
+                min(free_slots, SQS_MAX_MESSAGES_PER_POLL)
             )
+            message_list = incoming_sqs_msg.get("Messages", [])
+
+            if not message_list:
+                if not in_flight:
+                    print("No messages in SQS queue. Waiting...")
+                await asyncio.sleep(5)
+                continue
+
+            for sqs_payload in message_list:
+                task = asyncio.create_task(
+                    handle_sqs_message(sqs_payload, mongo_client)
+                )
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+    finally:
+        set_ready(False)
+
+        # Unfinished messages become visible again once their lease runs out.
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+
+        await media_pipeline.stop()
+        await close_aio_clients()
+        shutdown_inference_pools()
 
 
 if __name__ == "__main__":
@@ -1,14 +1,46 @@
 import logging
 import os
 import re
+import struct
 import subprocess
+import threading
 import time
+from typing import Iterator
 
-import boto3
+import numpy as np
 
 from services.aws.ssm import get_secret
+from services.aws.transfer import (
+    ParallelS3Body,
+    download_s3_object,
+    get_s3_client,
+)
+from services.utils.metrics.main import stage_timer
 
-s3_client = boto3.client("s3")
+# "stream" pipes S3 bytes straight into ffmpeg, "download" writes the whole .mp4 to disk first.
+EXTRACTOR_INGEST_MODE = os.getenv("EXTRACTOR_INGEST_MODE", "stream")
+
+STREAM_CHUNK_BYTES = 1024 * 1024
+
+# Whisper's native input: 16 kHz mono.
+WHISPER_SAMPLE_RATE = 16000
+
+# ffmpeg's PCM output, 16-bit little-endian samples.
+PCM_BYTES_PER_SAMPLE = 2
+
+PCM_STDOUT = "pipe:1"
+
+# Presigned URLs handed to ffmpeg/ffprobe only need to outlive a single job.
+PRESIGNED_URL_EXPIRY_SECONDS = 6 * 60 * 60
+
+# Scratch reserved for a transcript, generous for hours of speech.
+TRANSCRIPT_SCRATCH_BYTES = 4 * 1024 * 1024
+
+# Decoding holds ffmpeg's int16 output and the float32 audio made from it at once.
+DECODED_BYTES_PER_SAMPLE = 2 + 4
+
+# Lowest bitrates expected per format, bounding the duration of media that couldn't be probed.
+MIN_BYTES_PER_SECOND = {".mp3": 4000, ".mp4": 16000}
 
 """Deletes the local MP3 file after uploading to S3."""
 
@@ -25,55 +57,217 @@ def delete_local_file(file_path: str):
         print(f"❌ Failed to delete file {file_path}: {e}")
 
 
+def _generate_presigned_get_url(bucket_name: str, s3_key: str) -> str:
+    return get_s3_client().generate_presigned_url(
+        "get_object",
+        Params={"Bucket": bucket_name, "Key": s3_key},
+        ExpiresIn=PRESIGNED_URL_EXPIRY_SECONDS,
+    )
+
+
+def probe_media_duration(s3_key: str) -> float | None:
+    """
+    Returns the duration in seconds of an S3 media object using ffprobe, without downloading it.
+    ffprobe reads only the container headers through a presigned URL (ranged reads when needed).
+    """
+
+    try:
+        bucket_name = get_secret("/alwayssaved/AWS_BUCKET")
+        if not bucket_name:
+            raise ValueError("AWS_BUCKET not set in SSM.")
+
+        presigned_url = _generate_presigned_get_url(bucket_name, s3_key)
+
+        command = [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            presigned_url,
+        ]
+
+        completed = subprocess.run(
+            command, check=True, capture_output=True, text=True, timeout=60
+        )
+
+        return float(completed.stdout.strip())
+
+    except Exception as e:
+        print(f"❌ Error in probe_media_duration for s3_key {s3_key}: {e}")
+        return None
+
+
 # TODO: Delete and reimplement logic for Frontend.
 def sanitize_filename(filename: str) -> str:
     return re.sub(r'[\\/*?:"<>|]', "", filename).strip()
 
 
+def build_extract_command(
+    input_source: str, mp3_file: str | None, pcm_path: str | None = None
+) -> list[str]:
+    """
+    Single ffmpeg invocation that decodes the source once and writes:
+      - 16 kHz mono 16-bit PCM to stdout for Whisper, or to pcm_path for streamed transcription; and
+      - optionally, a 192k .mp3 file for the S3 audio artifact.
+    """
+
+    command = ["ffmpeg"]
+
+    if input_source != "pipe:0":
+        command.append("-nostdin")
+
+    command += ["-threads", "0", "-i", input_source]
+
+    if mp3_file:
+        command += ["-map", "0:a:0", "-vn", "-acodec", "libmp3lame", "-ab", "192k"]
+        command += ["-y", mp3_file]
+
+    command += ["-map", "0:a:0", "-vn", "-f", "s16le", "-acodec", "pcm_s16le"]
+    command += ["-ac", "1", "-ar", str(WHISPER_SAMPLE_RATE)]
+    command += ["-y", pcm_path] if pcm_path else [PCM_STDOUT]
+
+    return command
+
+
+def pcm_bytes_to_audio(pcm_bytes: bytes) -> np.ndarray:
+    """Same normalization as whisper.audio.load_audio."""
+
+    return np.frombuffer(pcm_bytes, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def count_pcm_samples(pcm_path: str) -> int:
+    return os.path.getsize(pcm_path) // PCM_BYTES_PER_SAMPLE
+
+
+def read_pcm_file(pcm_path: str, start_sample: int, samples: int) -> np.ndarray:
+    """samples of audio from start_sample of a PCM file, normalized like pcm_bytes_to_audio."""
+
+    with open(pcm_path, "rb") as file:
+        file.seek(start_sample * PCM_BYTES_PER_SAMPLE)
+        return pcm_bytes_to_audio(file.read(samples * PCM_BYTES_PER_SAMPLE))
+
+
+def iter_pcm_file(pcm_path: str, window_samples: int) -> Iterator[np.ndarray]:
+    """A PCM file's audio in consecutive windows, so it's never all in memory at once."""
+
+    with open(pcm_path, "rb") as file:
+        while pcm_bytes := file.read(window_samples * PCM_BYTES_PER_SAMPLE):
+            yield pcm_bytes_to_audio(pcm_bytes)
+
+
+def _pipe_s3_body_to_stdin(
+    body, process: subprocess.Popen, errors: list[Exception]
+) -> None:
+    try:
+        for chunk in body.iter_chunks(STREAM_CHUNK_BYTES):
+            process.stdin.write(chunk)
+    except BrokenPipeError:
+        # ffmpeg exited early; its return code tells the caller what happened.
+        pass
+    except Exception as e:
+        # A failed read or checksum mismatch; ffmpeg only saw part of the media.
+        errors.append(e)
+    finally:
+        body.close()
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+
+
+def run_extract_command(command: list[str], s3_body=None) -> np.ndarray | None:
+    """
+    Runs an extract command and returns the decoded audio as a float32 array,
+    or None when the command writes its PCM to a file.
+    When s3_body is given, it's fed into ffmpeg's stdin from a separate thread while stdout is drained.
+    """
+
+    pcm_to_stdout = command[-1] == PCM_STDOUT
+
+    # Streamed decodes include the S3 transfer, ffmpeg reads as the bytes arrive.
+    with stage_timer("ffmpeg_stream" if s3_body is not None else "ffmpeg"):
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE if s3_body is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE if pcm_to_stdout else subprocess.DEVNULL,
+        )
+
+        feeder = None
+        feeder_errors: list[Exception] = []
+        if s3_body is not None:
+            feeder = threading.Thread(
+                target=_pipe_s3_body_to_stdin,
+                args=(s3_body, process, feeder_errors),
+                daemon=True,
+            )
+            feeder.start()
+
+        pcm_bytes = process.stdout.read() if pcm_to_stdout else None
+        return_code = process.wait()
+
+        if feeder is not None:
+            feeder.join()
+
+        if feeder_errors:
+            raise feeder_errors[0]
+
+        if return_code != 0:
+            raise subprocess.CalledProcessError(return_code, command)
+
+        return pcm_bytes_to_audio(pcm_bytes) if pcm_to_stdout else None
+
+
 """
-Converts .mp4 to .mp3 file and immediately deletes .mp4 file.
+Converts a local .mp4 to an .mp3 file next to it plus in-memory PCM in one decode, and immediately deletes the .mp4 file.
 """
 
 
-def convert_mp4_to_mp3(base_filename: str) -> None:
+def convert_mp4_to_mp3(
+    file_path: str, pcm_path: str | None = None
+) -> np.ndarray | None:
+
+    base_path, _ = os.path.splitext(file_path)
+
+    mp3_file = f"{base_path}.mp3"
+
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"❌ MP4 file not found: {file_path}")
 
-    base_title, _ = os.path.splitext(base_filename)
+    command = build_extract_command(file_path, mp3_file, pcm_path)
 
-    mp3_file = f"{base_title}.mp3"
+    audio = run_extract_command(command)
 
-    if not os.path.exists(base_filename):
-        raise FileNotFoundError(f"❌ MP4 file not found: {base_filename}")
+    delete_local_file(file_path)
 
-    command = [
-        "ffmpeg",
-        "-i",
-        base_filename,
-        "-vn",
-        "-acodec",
-        "libmp3lame",
-        "-ab",
-        "192k",
-        "-y",
-        mp3_file,
-    ]
+    return audio
+
+
+def decode_local_audio(
+    file_path: str, pcm_path: str | None = None
+) -> np.ndarray | None:
+    """
+    Decodes a local media file to 16 kHz mono float32 PCM without writing anything to disk,
+    or to 16-bit PCM in pcm_path.
+    """
 
-    subprocess.run(command, check=True)
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"❌ Media file not found: {file_path}")
 
-    delete_local_file(base_filename)
+    return run_extract_command(build_extract_command(file_path, None, pcm_path))
 
 
 def download_with_retry(
-    bucket_name: str, s3_key: str, retries: int = 5, delay: int = 2
+    bucket_name: str, s3_key: str, file_path: str, retries: int = 5, delay: int = 2
 ) -> None:
-    """Try downloading from S3 with retries and exponential backoff."""
-
-    base_filename = os.path.basename(s3_key)  # e.g., video1.mp4
+    """Try downloading from S3 to file_path with retries and exponential backoff."""
 
     for attempt in range(retries):
         try:
-            with open(base_filename, "wb") as f:
-                s3_client.download_fileobj(bucket_name, s3_key, f)
-            if os.path.exists(base_filename):
+            download_s3_object(get_s3_client(), bucket_name, s3_key, file_path)
+            if os.path.exists(file_path):
                 return
         except Exception:
             logging.error("An exception occurred in download_with_retry", exc_info=True)
@@ -84,31 +278,191 @@ def download_with_retry(
     raise Exception(f"Failed to download {s3_key} from S3 after {retries} attempts.")
 
 
-# 7-10-26 TODO: Need to handle sanitized .mp4 and .mp3 filename titles on Frontend before uploading to s3.
-def download_and_convert_from_s3(s3_key: str) -> None:
+def _read_s3_range(bucket_name: str, s3_key: str, start: int, length: int) -> bytes:
+    response = get_s3_client().get_object(
+        Bucket=bucket_name, Key=s3_key, Range=f"bytes={start}-{start + length - 1}"
+    )
+    return response["Body"].read()
+
+
+def is_streamable_mp4(bucket_name: str, s3_key: str, max_boxes: int = 32) -> bool:
     """
-    Downloads .mp3 or .mp4 files from S3 using the s3_key.
-    Converts .mp4 files to .mp3 files.
-      - Deletes local .mp4 file.
+    Walks the top-level MP4 boxes with small ranged reads.
+    Returns True when the moov (index) box comes before mdat, i.e. ffmpeg can decode it from a pipe.
+    Non-faststart files need seeking and are read through ranged HTTP requests instead.
     """
 
-    try:
-        bucket_name = get_secret("/alwayssaved/AWS_BUCKET")
-        if not bucket_name:
-            raise ValueError("AWS_BUCKET not set in SSM.")
+    offset = 0
 
-        base_filename = os.path.basename(s3_key)  # e.g., video1.mp4
+    for _ in range(max_boxes):
+        header = _read_s3_range(bucket_name, s3_key, offset, 16)
+        if len(header) < 8:
+            return False
 
-        _, file_extension = os.path.splitext(base_filename)
+        box_size, box_type = struct.unpack(">I4s", header[:8])
 
-        # File is successfully downloaded or an Exception is raised
-        download_with_retry(bucket_name, s3_key)
+        if box_type == b"moov":
+            return True
+        if box_type == b"mdat":
+            return False
 
-        if file_extension == ".mp3":
-            return
+        if box_size == 1:
+            # 64-bit largesize follows the type field.
+            if len(header) < 16:
+                return False
+            box_size = struct.unpack(">Q", header[8:16])[0]
+        elif box_size == 0:
+            # Box runs to the end of the file.
+            return False
 
-        convert_mp4_to_mp3(base_filename)
+        if box_size < 8:
+            return False
 
-    except Exception as e:
-        print(f"❌ Error in download_and_convert_from_s3: {e}")
+        offset += box_size
+
+    return False
+
+
+def stream_convert_from_s3(
+    bucket_name: str, s3_key: str, workspace_dir: str, pcm_path: str | None = None
+) -> np.ndarray | None:
+    """
+    Decodes an S3 media file while it's being transferred, without writing the source to disk.
+      - .mp4 files also get their .mp3 audio track written to workspace_dir for the S3 audio artifact.
+      - .mp3 and faststart .mp4 files are fetched as concurrent ranged parts and piped in order into ffmpeg's stdin.
+      - .mp4 files with the index at the end are handed to ffmpeg as a presigned URL so it can seek with ranged reads.
+    """
+
+    base_filename = os.path.basename(s3_key)  # e.g., video1.mp4
+    base_title, file_extension = os.path.splitext(base_filename)
+    mp3_file = (
+        os.path.join(workspace_dir, f"{base_title}.mp3")
+        if file_extension == ".mp4"
+        else None
+    )
+
+    if file_extension == ".mp4" and not is_streamable_mp4(bucket_name, s3_key):
+        print(f"🌐 Extracting audio from {s3_key} with ranged reads (moov at end).")
+        command = build_extract_command(
+            _generate_presigned_get_url(bucket_name, s3_key), mp3_file, pcm_path
+        )
+        return run_extract_command(command)
+
+    print(f"🌊 Streaming {s3_key} from S3 into ffmpeg.")
+
+    return run_extract_command(
+        build_extract_command("pipe:0", mp3_file, pcm_path),
+        s3_body=ParallelS3Body(get_s3_client(), bucket_name, s3_key),
+    )
+
+
+def stream_convert_with_retry(
+    bucket_name: str,
+    s3_key: str,
+    workspace_dir: str,
+    pcm_path: str | None = None,
+    retries: int = 5,
+    delay: int = 2,
+) -> np.ndarray | None:
+    """Try streaming the media file from S3 into ffmpeg with retries and exponential backoff."""
+
+    for attempt in range(retries):
+        try:
+            return stream_convert_from_s3(bucket_name, s3_key, workspace_dir, pcm_path)
+        except Exception:
+            logging.error(
+                "An exception occurred in stream_convert_with_retry", exc_info=True
+            )
+            wait = delay * (2**attempt)
+            logging.warning(f"S3 stream failed. Retrying in {wait}s...")
+            time.sleep(wait)
+
+    raise Exception(f"Failed to stream {s3_key} from S3 after {retries} attempts.")
+
+
+def _get_bucket_name() -> str:
+    bucket_name = get_secret("/alwayssaved/AWS_BUCKET")
+    if not bucket_name:
+        raise ValueError("AWS_BUCKET not set in SSM.")
+    return bucket_name
+
+
+# 7-10-26 TODO: Need to handle sanitized .mp4 and .mp3 filename titles on Frontend before uploading to s3.
+def fetch_source_from_s3(s3_key: str, workspace_dir: str) -> str | None:
+    """
+    Fetches a job's .mp3 or .mp4 source ahead of decode_media, so its transfer can overlap another job's decode.
+      - In "download" ingest mode the source is downloaded into workspace_dir and its path returned.
+      - In "stream" ingest mode there is nothing to fetch ahead, decode_media reads S3 as it decodes.
+    Raises an Exception if the download fails.
+    """
+
+    if EXTRACTOR_INGEST_MODE == "stream":
         return None
+
+    local_path = os.path.join(workspace_dir, os.path.basename(s3_key))
+
+    # File is successfully downloaded or an Exception is raised
+    download_with_retry(_get_bucket_name(), s3_key, local_path)
+
+    return local_path
+
+
+def decode_media(
+    s3_key: str,
+    workspace_dir: str,
+    local_path: str | None = None,
+    pcm_path: str | None = None,
+) -> np.ndarray | None:
+    """
+    Decodes the local source fetched by fetch_source_from_s3 once to 16 kHz mono float32 PCM (deleting it
+    afterwards), or streams s3_key from S3 when there's none. .mp4 sources also get their .mp3 track
+    written to workspace_dir in the same ffmpeg pass.
+    With pcm_path the PCM is written to that file instead of returned, for streamed transcription.
+    Raises an Exception if decoding fails.
+    """
+
+    if local_path is None:
+        # Audio is decoded or an Exception is raised
+        return stream_convert_with_retry(
+            _get_bucket_name(), s3_key, workspace_dir, pcm_path
+        )
+
+    _, file_extension = os.path.splitext(local_path)
+
+    if file_extension == ".mp3":
+        audio = decode_local_audio(local_path, pcm_path)
+        delete_local_file(local_path)
+        return audio
+
+    return convert_mp4_to_mp3(local_path, pcm_path)
+
+
+def estimate_scratch_bytes(
+    content_length: int, file_extension: str, pcm_seconds: float = 0.0
+) -> int:
+    """
+    Upper bound of the scratch a job writes: the downloaded source in "download" ingest mode, an
+    .mp4's .mp3 track (192 kbps, smaller than the video it came from), the PCM file of a streamed
+    transcription (pcm_seconds long) and the transcript.
+    """
+
+    source_bytes = content_length if EXTRACTOR_INGEST_MODE == "download" else 0
+    mp3_bytes = content_length if file_extension == ".mp4" else 0
+    pcm_bytes = int(pcm_seconds * WHISPER_SAMPLE_RATE * PCM_BYTES_PER_SAMPLE)
+
+    return source_bytes + mp3_bytes + pcm_bytes + TRANSCRIPT_SCRATCH_BYTES
+
+
+def estimate_decoded_audio_bytes(
+    media_duration: float | None, content_length: int, file_extension: str
+) -> int:
+    """
+    Peak memory of decoding a job's audio to 16 kHz PCM. Without a probed duration, the duration is
+    bounded from the file size at the lowest bitrate expected for its format.
+    """
+
+    if media_duration is None:
+        min_bytes_per_second = MIN_BYTES_PER_SECOND.get(file_extension, 4000)
+        media_duration = content_length / min_bytes_per_second
+
+    return int(media_duration * WHISPER_SAMPLE_RATE * DECODED_BYTES_PER_SAMPLE)
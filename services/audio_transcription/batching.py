@@ -0,0 +1,217 @@
+"""
+Batched transcription for short clips.
+
+Clips that fit in one 30-second Whisper window are queued from every in-flight upload. A collector
+gathers up to WHISPER_BATCH_SIZE of them (or whatever arrived within WHISPER_BATCH_MAX_WAIT_MS),
+runs a single batched encoder/decoder pass in an inference worker, and hands each result back to the
+upload that asked.
+Clips whose batched decode looks unreliable are re-run through the regular transcribe path,
+which has Whisper's temperature fallback.
+"""
+
+import asyncio
+import os
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, NamedTuple, Set
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import whisper
+
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "8"))
+WHISPER_BATCH_MAX_WAIT_MS = int(os.getenv("WHISPER_BATCH_MAX_WAIT_MS", "200"))
+
+# whisper.audio's 30-second window at 16 kHz. torch and whisper are only imported by the inference
+# workers that call transcribe_batch, never by the service process that queues clips.
+_SAMPLE_RATE = 16000
+_WINDOW_SAMPLES = 30 * _SAMPLE_RATE
+
+# Same thresholds whisper.transcribe uses to decide a decode needs a retry.
+_COMPRESSION_RATIO_THRESHOLD = 2.4
+_LOGPROB_THRESHOLD = -1.0
+_NO_SPEECH_THRESHOLD = 0.6
+
+
+def fits_single_window(audio: np.ndarray) -> bool:
+    return 0 < len(audio) <= _WINDOW_SAMPLES
+
+
+def transcribe_batch(
+    model: "whisper.Whisper",
+    audios: List[np.ndarray],
+    fp16: bool = False,
+    languages: List[str | None] | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Transcribes single-window clips in one forward pass.
+    Clips with a language skip Whisper's language detection, None detects it.
+    Returns dicts shaped like whisper's transcribe result (text, segments, language).
+    """
+
+    import torch
+    import whisper
+
+    mels = torch.stack(
+        [
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(torch.from_numpy(audio)),
+                n_mels=model.dims.n_mels,
+            )
+            for audio in audios
+        ]
+    ).to(model.device)
+
+    if fp16:
+        mels = mels.half()
+
+    languages = languages or [None] * len(audios)
+
+    # One encoder pass for every clip, then a decoder pass per language (given or detected).
+    with torch.no_grad():
+        audio_features = model.embed_audio(mels)
+
+    decoded: List[Any] = [None] * len(audios)
+
+    for language in dict.fromkeys(languages):
+        indexes = [
+            i for i, clip_language in enumerate(languages) if clip_language == language
+        ]
+        options = whisper.DecodingOptions(
+            fp16=fp16, language=language, without_timestamps=True
+        )
+
+        for i, decoding in zip(indexes, model.decode(audio_features[indexes], options)):
+            decoded[i] = decoding
+
+    results: List[Dict[str, Any]] = []
+
+    for audio, decoding, language in zip(audios, decoded, languages):
+        duration = len(audio) / _SAMPLE_RATE
+
+        is_silent = (
+            decoding.no_speech_prob > _NO_SPEECH_THRESHOLD
+            and decoding.avg_logprob < _LOGPROB_THRESHOLD
+        )
+        needs_fallback = not is_silent and (
+            decoding.compression_ratio > _COMPRESSION_RATIO_THRESHOLD
+            or decoding.avg_logprob < _LOGPROB_THRESHOLD
+        )
+
+        if needs_fallback:
+            results.append(model.transcribe(audio, fp16=fp16, language=language))
+            continue
+
+        text = "" if is_silent else decoding.text
+
+        results.append(
+            {
+                "text": text,
+                "segments": (
+                    [{"id": 0, "start": 0.0, "end": duration, "text": text}]
+                    if text
+                    else []
+                ),
+                "language": decoding.language,
+            }
+        )
+
+    return results
+
+
+class _PendingClip(NamedTuple):
+    audio: np.ndarray
+    language: str | None
+    future: asyncio.Future
+
+
+class BatchTranscriber:
+    """
+    Collects short clips from concurrent uploads and transcribes them in batches.
+    run_batch transcribes a list of clips in their languages (InferencePool.transcribe_batch), each
+    batch takes one of the device's slots like any other transcription.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[
+            [List[np.ndarray], List[str | None]], Awaitable[List[Dict[str, Any]]]
+        ],
+        device_slots: asyncio.Semaphore,
+        batch_size: int = WHISPER_BATCH_SIZE,
+        max_wait_ms: int = WHISPER_BATCH_MAX_WAIT_MS,
+    ):
+        self._run_batch = run_batch
+        self._device_slots = device_slots
+        self._batch_size = max(1, batch_size)
+        self._max_wait_seconds = max_wait_ms / 1000
+        self._queue: asyncio.Queue[_PendingClip] | None = None
+        self._task: asyncio.Task | None = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    def enabled(self) -> bool:
+        return self._batch_size > 1
+
+    async def transcribe(
+        self, audio: np.ndarray, language: str | None = None
+    ) -> Dict[str, Any] | None:
+        """Returns the transcription result, or None if the batch failed. language None detects it."""
+
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingClip(audio, language, future))
+        return await future
+
+    async def _collect_batch(self) -> List[_PendingClip]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self._max_wait_seconds
+
+        while len(batch) < self._batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+
+            # With several inference workers, the next batch can run while this one is in flight.
+            await self._device_slots.acquire()
+
+            flush = asyncio.create_task(self._flush(batch))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[_PendingClip]) -> None:
+        batch_start_time = time.time()
+
+        try:
+            results = await self._run_batch(
+                [clip.audio for clip in batch], [clip.language for clip in batch]
+            )
+        except Exception as e:
+            print(f"❌ Failed in BatchTranscriber for {len(batch)} clips: {e}")
+            results = [None] * len(batch)
+        finally:
+            self._device_slots.release()
+
+        print(
+            f"📚 Transcribed batch of {len(batch)} clips in {time.time() - batch_start_time:.2f}s"
+        )
+
+        for clip, result in zip(batch, results):
+            if not clip.future.done():
+                clip.future.set_result(result)
@@ -0,0 +1,178 @@
+"""
+Parallel chunked transcription for long media on CPU nodes: the audio is split near silence into
+overlapping chunks, transcribed across the inference pool and stitched back together.
+"""
+
+import asyncio
+import os
+from typing import Any, Dict, List, NamedTuple
+
+import numpy as np
+
+from services.audio_transcription.inference_pool import InferencePool
+
+SAMPLE_RATE = 16000
+
+WHISPER_CHUNK_SECONDS = float(os.getenv("WHISPER_CHUNK_SECONDS", "300"))
+WHISPER_CHUNK_OVERLAP_SECONDS = float(os.getenv("WHISPER_CHUNK_OVERLAP_SECONDS", "4"))
+
+# How far from each target boundary to look for the quietest split point.
+WHISPER_CHUNK_SEARCH_SECONDS = float(os.getenv("WHISPER_CHUNK_SEARCH_SECONDS", "20"))
+
+_FRAME_SECONDS = 0.02
+
+
+class AudioChunk(NamedTuple):
+    start_sample: int
+    end_sample: int
+
+
+def frame_rms(audio: np.ndarray, frame_seconds: float = _FRAME_SECONDS) -> np.ndarray:
+    """RMS energy per non-overlapping frame."""
+
+    frame_length = int(frame_seconds * SAMPLE_RATE)
+    frame_count = len(audio) // frame_length
+
+    if frame_count == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    frames = audio[: frame_count * frame_length].reshape(frame_count, frame_length)
+    return np.sqrt(np.mean(np.square(frames), axis=1))
+
+
+def find_split_points(
+    audio: np.ndarray,
+    chunk_seconds: float = WHISPER_CHUNK_SECONDS,
+    search_seconds: float = WHISPER_CHUNK_SEARCH_SECONDS,
+) -> List[int]:
+    """
+    Returns sample indices to cut at, one near every chunk_seconds boundary,
+    moved to the quietest frame within +/- search_seconds.
+    """
+
+    energy = frame_rms(audio)
+    frame_length = int(_FRAME_SECONDS * SAMPLE_RATE)
+    chunk_frames = int(chunk_seconds / _FRAME_SECONDS)
+    search_frames = int(search_seconds / _FRAME_SECONDS)
+
+    split_points: List[int] = []
+    target = chunk_frames
+
+    while target < len(energy) - search_frames:
+        window_start = max(0, target - search_frames)
+        window_end = min(len(energy), target + search_frames)
+        quietest = window_start + int(np.argmin(energy[window_start:window_end]))
+
+        split_points.append(quietest * frame_length)
+        target = quietest + chunk_frames
+
+    return split_points
+
+
+def build_chunks(
+    audio_length: int,
+    split_points: List[int],
+    overlap_seconds: float = WHISPER_CHUNK_OVERLAP_SECONDS,
+) -> List[AudioChunk]:
+    """Each chunk starts half an overlap before its split point and ends half an overlap after the next."""
+
+    half_overlap = int(overlap_seconds * SAMPLE_RATE / 2)
+    boundaries = [0] + split_points + [audio_length]
+
+    chunks: List[AudioChunk] = []
+
+    for start, end in zip(boundaries[:-1], boundaries[1:]):
+        chunks.append(
+            AudioChunk(
+                start_sample=max(0, start - half_overlap),
+                end_sample=min(audio_length, end + half_overlap),
+            )
+        )
+
+    return chunks
+
+
+def stitch_chunk_results(
+    chunks: List[AudioChunk], chunk_results: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Shifts chunk-relative timestamps to the original media and drops overlap duplicates:
+    a segment is kept only if it starts on its own chunk's side of the overlap midpoints.
+    """
+
+    segments: List[Dict[str, Any]] = []
+
+    for i, (chunk, chunk_result) in enumerate(zip(chunks, chunk_results)):
+        offset = chunk.start_sample / SAMPLE_RATE
+
+        keep_from = (
+            0.0
+            if i == 0
+            else (chunks[i - 1].end_sample + chunk.start_sample) / 2 / SAMPLE_RATE
+        )
+        keep_until = (
+            float("inf")
+            if i == len(chunks) - 1
+            else (chunk.end_sample + chunks[i + 1].start_sample) / 2 / SAMPLE_RATE
+        )
+
+        for segment in chunk_result["segments"]:
+            start = segment["start"] + offset
+            end = segment["end"] + offset
+
+            if not keep_from <= start < keep_until:
+                continue
+
+            text = segment["text"]
+            if segments and text.strip() == segments[-1]["text"].strip():
+                continue
+
+            segments.append(
+                {"id": len(segments), "start": start, "end": end, "text": text}
+            )
+
+    languages = [result["language"] for result in chunk_results if result["language"]]
+
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": languages[0] if languages else None,
+    }
+
+
+def should_transcribe_chunked(audio: np.ndarray, inference_pool: InferencePool) -> bool:
+    return (
+        inference_pool.device == "cpu"
+        and inference_pool.workers > 1
+        and len(audio) > 2 * WHISPER_CHUNK_SECONDS * SAMPLE_RATE
+    )
+
+
+async def transcribe_chunked(
+    audio: np.ndarray,
+    inference_pool: InferencePool,
+    device_slots: asyncio.Semaphore,
+    decode_options: Dict[str, Any] | None = None,
+) -> Dict[str, Any]:
+    """
+    Transcribes long audio across the inference pool's workers, each chunk admitted through its own
+    device slot. Returns a dict shaped like whisper's transcribe result (text, segments, language).
+    """
+
+    chunks = await asyncio.to_thread(
+        lambda: build_chunks(len(audio), find_split_points(audio))
+    )
+
+    print(
+        f"🧩 Transcribing {len(audio) / SAMPLE_RATE:.0f}s of audio as {len(chunks)} chunks across {inference_pool.workers} workers."
+    )
+
+    async def transcribe_chunk(chunk: AudioChunk) -> Dict[str, Any]:
+        async with device_slots:
+            return await inference_pool.transcribe(
+                audio[chunk.start_sample : chunk.end_sample], decode_options
+            )
+
+    chunk_results = await asyncio.gather(*[transcribe_chunk(chunk) for chunk in chunks])
+
+    return stitch_chunk_results(chunks, chunk_results)
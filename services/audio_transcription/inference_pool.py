@@ -0,0 +1,311 @@
+"""
+Persistent Whisper inference workers, each loading the model once, so transcription never runs in the
+service's own process. Jobs are admitted per device with get_device_slots (WHISPER_DEVICE_CONCURRENCY).
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Any, Callable, Dict, List
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from services.audio_transcription.streaming import StreamedAudio
+
+# Worker processes holding a model. auto = half the cores (max 8) on CPU, 1 per GPU.
+# WHISPER_CHUNK_WORKERS is still honored from before the chunk pool became the inference pool.
+WHISPER_INFERENCE_WORKERS = os.getenv(
+    "WHISPER_INFERENCE_WORKERS", os.getenv("WHISPER_CHUNK_WORKERS", "auto")
+)
+
+# Transcriptions admitted per device at once. auto = one per worker.
+WHISPER_DEVICE_CONCURRENCY = os.getenv("WHISPER_DEVICE_CONCURRENCY", "auto")
+
+# Each worker decodes a second of silence after loading its model, so CUDA context and kernel setup,
+# allocator pools and torch's lazy initialization are paid at boot instead of by the first job.
+WHISPER_WARMUP = os.getenv("WHISPER_WARMUP", "true") == "true"
+
+
+def resolve_worker_count(device: str) -> int:
+    if WHISPER_INFERENCE_WORKERS != "auto":
+        return max(1, int(WHISPER_INFERENCE_WORKERS))
+
+    if device != "cpu":
+        return 1
+
+    return max(1, min(8, (os.cpu_count() or 1) // 2))
+
+
+def split_worker_count(device: str, pools: int) -> List[int]:
+    """Shares the device's workers between pools, the first ones get the remainder. At least one each."""
+
+    share, remainder = divmod(resolve_worker_count(device), pools)
+    return [max(1, share + (1 if i < remainder else 0)) for i in range(pools)]
+
+
+# WORKER PROCESSES
+
+_worker_model = None
+
+
+def _init_worker(
+    model_name: str, device: str, precision: str, torch_threads: int
+) -> None:
+    global _worker_model
+
+    import torch
+
+    from services.audio_transcription.model_registry import get_whisper_model
+
+    torch.set_num_threads(torch_threads)
+    _worker_model = get_whisper_model(model_name, device=device, precision=precision)
+
+    if WHISPER_WARMUP:
+        _warm_up(fp16=precision == "fp16")
+
+
+def _warm_up(fp16: bool) -> None:
+    import torch
+    import whisper
+
+    warmup_start_time = time.time()
+
+    mel = whisper.log_mel_spectrogram(
+        whisper.pad_or_trim(torch.zeros(whisper.audio.SAMPLE_RATE)),
+        n_mels=_worker_model.dims.n_mels,
+    ).to(_worker_model.device)
+
+    if fp16:
+        mel = mel.half()
+
+    _worker_model.decode(
+        mel,
+        whisper.DecodingOptions(
+            language="en", fp16=fp16, without_timestamps=True, sample_len=8
+        ),
+    )
+
+    print(
+        f"🔥 Inference worker pid {os.getpid()} warmed up in {time.time() - warmup_start_time:.2f}s"
+    )
+
+
+def _worker_ready() -> str:
+    # Held briefly so each warm-up request lands on a different worker.
+    time.sleep(0.5)
+    return f"pid {os.getpid()} on {next(_worker_model.parameters()).device}"
+
+
+def _compact_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Only what callers read, so results cross the process boundary cheaply."""
+
+    return {
+        "text": result["text"],
+        "language": result.get("language"),
+        "segments": [
+            {
+                "start": float(segment["start"]),
+                "end": float(segment["end"]),
+                "text": segment["text"],
+            }
+            for segment in result["segments"]
+        ],
+    }
+
+
+def _transcribe_in_worker(
+    audio: np.ndarray, fp16: bool, decode_options: Dict[str, Any]
+) -> Dict[str, Any]:
+    return _compact_result(_worker_model.transcribe(audio, fp16=fp16, **decode_options))
+
+
+def _transcribe_stream_in_worker(
+    streamed: "StreamedAudio", fp16: bool, decode_options: Dict[str, Any]
+) -> Dict[str, Any]:
+    from services.audio_transcription.streaming import transcribe_streaming
+
+    return _compact_result(
+        transcribe_streaming(_worker_model, streamed, fp16, decode_options)
+    )
+
+
+def _transcribe_batch_in_worker(
+    audios: List[np.ndarray], fp16: bool, languages: List[str | None]
+) -> List[Dict[str, Any]]:
+    from services.audio_transcription.batching import transcribe_batch
+
+    return [
+        _compact_result(result)
+        for result in transcribe_batch(_worker_model, audios, fp16, languages)
+    ]
+
+
+class InferencePool:
+    """
+    A pool of worker processes holding one model variant.
+    Started lazily by the first request, or ahead of time with start().
+    If a worker dies (e.g. OOM-killed) the request fails and the pool is rebuilt on the next one.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        device: str = "cpu",
+        precision: str = "fp32",
+        workers: int | None = None,
+        torch_threads: int | None = None,
+    ):
+        self._model_name = model_name
+        self._device = str(device)
+        self._precision = precision
+        self._workers = workers or resolve_worker_count(self._device)
+        # Threads per worker, the pool's workers split the cores between them by default.
+        self._torch_threads = torch_threads or max(
+            1, (os.cpu_count() or 1) // self._workers
+        )
+        self._fp16 = precision == "fp16"
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._busy_worker_seconds = 0.0
+        self._last_change = time.perf_counter()
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @property
+    def device(self) -> str:
+        return self._device
+
+    @property
+    def model_name(self) -> str:
+        return self._model_name
+
+    @property
+    def busy_worker_seconds(self) -> float:
+        """Seconds workers spent on requests, summed over workers. / (wall * workers) = utilization."""
+
+        self._track_in_flight(0)
+        return self._busy_worker_seconds
+
+    def _track_in_flight(self, change: int) -> None:
+        now = time.perf_counter()
+        self._busy_worker_seconds += min(self._in_flight, self._workers) * (
+            now - self._last_change
+        )
+        self._in_flight += change
+        self._last_change = now
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._workers,
+                    # torch doesn't survive fork() well, start workers from a clean interpreter.
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(
+                        self._model_name,
+                        self._device,
+                        self._precision,
+                        self._torch_threads,
+                    ),
+                )
+
+            return self._executor
+
+    async def _submit(self, function: Callable, *args: Any) -> Any:
+        executor = self._get_executor()
+        self._track_in_flight(1)
+
+        try:
+            return await asyncio.wrap_future(executor.submit(function, *args))
+        except BrokenProcessPool:
+            print(
+                f"❌ Inference worker for {self._model_name} on {self._device} died, restarting the pool."
+            )
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            self._track_in_flight(-1)
+
+    async def start(self) -> None:
+        """Spawns every worker and waits until each has its model loaded and warmed up."""
+
+        ready = await asyncio.gather(
+            *[self._submit(_worker_ready) for _ in range(self._workers)]
+        )
+
+        for worker in sorted(set(ready)):
+            print(f"✅ Inference worker ready: {worker}")
+
+    async def transcribe(
+        self, audio: np.ndarray, decode_options: Dict[str, Any] | None = None
+    ) -> Dict[str, Any]:
+        """
+        Returns a dict shaped like whisper's transcribe result (text, segments, language).
+        decode_options are passed on to whisper's transcribe, e.g. beam_size.
+        """
+
+        return await self._submit(
+            _transcribe_in_worker, audio, self._fp16, decode_options or {}
+        )
+
+    async def transcribe_stream(
+        self, streamed: "StreamedAudio", decode_options: Dict[str, Any] | None = None
+    ) -> Dict[str, Any]:
+        """
+        Same result as transcribe, read from a PCM file window by window in one worker.
+        Only the file's path crosses the process boundary.
+        """
+
+        return await self._submit(
+            _transcribe_stream_in_worker, streamed, self._fp16, decode_options or {}
+        )
+
+    async def transcribe_batch(
+        self, audios: List[np.ndarray], languages: List[str | None] | None = None
+    ) -> List[Dict[str, Any]]:
+        return await self._submit(
+            _transcribe_batch_in_worker,
+            audios,
+            self._fp16,
+            languages or [None] * len(audios),
+        )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def resolve_device_concurrency(workers: int) -> int:
+    if WHISPER_DEVICE_CONCURRENCY == "auto":
+        return max(1, workers)
+
+    return max(1, int(WHISPER_DEVICE_CONCURRENCY))
+
+
+_device_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+def get_device_slots(device: str, workers: int) -> asyncio.Semaphore:
+    """Admission limit for transcriptions on one device, shared by every caller."""
+
+    device = str(device)
+
+    if device not in _device_slots:
+        _device_slots[device] = asyncio.Semaphore(resolve_device_concurrency(workers))
+
+    return _device_slots[device]
@@ -0,0 +1,292 @@
+"""
+Process-wide Whisper models keyed by (model_name, device, precision), loaded once and LRU-evicted over
+WHISPER_MODEL_MEMORY_BUDGET_MB. Local weights are memory-mapped after a one-time SHA256 check.
+"""
+
+import gc
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple
+
+import torch
+import whisper
+
+from services.audio_transcription.routing import check_precision
+from services.utils.types.main import ModelRegistryStats
+
+# 0 disables eviction (keep every variant that gets requested).
+WHISPER_MODEL_MEMORY_BUDGET_MB = int(os.getenv("WHISPER_MODEL_MEMORY_BUDGET_MB", "0"))
+
+# Where the <model>.pt weights are looked up and downloaded to. Defaults to whisper's ~/.cache/whisper.
+WHISPER_MODEL_DIR = os.getenv("WHISPER_MODEL_DIR", "")
+
+
+def resolve_model_dir() -> str:
+    if WHISPER_MODEL_DIR:
+        return WHISPER_MODEL_DIR
+
+    default = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(os.getenv("XDG_CACHE_HOME", default), "whisper")
+
+
+def local_checkpoint_path(model_name: str) -> str | None:
+    """The weights file for an official model name or a checkpoint path, if it's on local disk."""
+
+    if os.path.isfile(model_name):
+        return model_name
+
+    url = whisper._MODELS.get(model_name)
+    if url is None:
+        return None
+
+    checkpoint_path = os.path.join(resolve_model_dir(), os.path.basename(url))
+    if not os.path.isfile(checkpoint_path):
+        return None
+
+    # whisper's model URLs end in <sha256>/<model>.pt.
+    expected_sha256 = url.split("/")[-2]
+    if not verify_checkpoint(checkpoint_path, expected_sha256):
+        print(
+            f"⚠️ [model_registry] {checkpoint_path} doesn't match its SHA256 checksum, downloading it again."
+        )
+        return None
+
+    return checkpoint_path
+
+
+_verified_checkpoints: Dict[str, str] = {}
+
+
+def verify_checkpoint(checkpoint_path: str, expected_sha256: str) -> bool:
+    """
+    Streams the file through SHA256, once per process. Custom checkpoint paths have no published
+    checksum and are loaded as given.
+    """
+
+    if _verified_checkpoints.get(checkpoint_path) == expected_sha256:
+        return True
+
+    sha256 = hashlib.sha256()
+    with open(checkpoint_path, "rb") as file:
+        for block in iter(lambda: file.read(8 * 1024 * 1024), b""):
+            sha256.update(block)
+
+    if sha256.hexdigest() != expected_sha256:
+        return False
+
+    _verified_checkpoints[checkpoint_path] = expected_sha256
+    return True
+
+
+def load_local_checkpoint(model_name: str, checkpoint_path: str) -> whisper.Whisper:
+    """Same model whisper.load_model builds, with the state dict memory-mapped from checkpoint_path on cpu."""
+
+    try:
+        checkpoint = torch.load(
+            checkpoint_path, map_location="cpu", mmap=True, weights_only=True
+        )
+    except RuntimeError:
+        # Checkpoints in torch's legacy (non-zip) format can't be mapped.
+        checkpoint = torch.load(checkpoint_path, map_location="cpu", weights_only=True)
+
+    model = whisper.model.Whisper(whisper.model.ModelDimensions(**checkpoint["dims"]))
+    model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+
+    if model_name in whisper._ALIGNMENT_HEADS:
+        model.set_alignment_heads(whisper._ALIGNMENT_HEADS[model_name])
+
+    return model
+
+
+class ModelKey(NamedTuple):
+    model_name: str
+    device: str
+    precision: str
+
+
+class _ResidentModel(NamedTuple):
+    model: whisper.Whisper
+    size_bytes: int
+
+
+def _tensor_bytes(value) -> int:
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(item) for item in value)
+    return 0
+
+
+def _model_size_bytes(model: torch.nn.Module) -> int:
+    # state_dict rather than parameters(), int8 Linear weights are packed params, not Parameters.
+    return sum(_tensor_bytes(value) for value in model.state_dict().values())
+
+
+def quantize_int8(model: whisper.Whisper) -> whisper.Whisper:
+    """Dynamic int8 quantization of the Linear layers of an fp32 model on cpu, in place."""
+
+    for module in model.modules():
+        # whisper.model.Linear only adds a dtype cast to nn.Linear.forward, which fp32 never needs.
+        # The quantizer only swaps exact nn.Linear modules.
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+
+
+class WhisperModelRegistry:
+    def __init__(self, memory_budget_bytes: int = 0):
+        self._memory_budget_bytes = memory_budget_bytes
+        self._models: "OrderedDict[ModelKey, _ResidentModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading_locks: Dict[ModelKey, threading.Lock] = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._load_seconds: Dict[ModelKey, float] = {}
+
+    def get_model(
+        self, model_name: str, device: str = "cpu", precision: str = "fp32"
+    ) -> whisper.Whisper:
+        """
+        Returns the shared model for (model_name, device, precision), loading it on first use.
+        Concurrent callers asking for the same missing variant wait for a single load.
+        """
+
+        check_precision(precision, device)
+
+        key = ModelKey(model_name, str(device), precision)
+
+        with self._lock:
+            resident = self._models.get(key)
+            if resident is not None:
+                self._models.move_to_end(key)
+                self._hits += 1
+                return resident.model
+
+            loading_lock = self._loading_locks.setdefault(key, threading.Lock())
+
+        with loading_lock:
+            # Another thread may have finished loading while we waited.
+            with self._lock:
+                resident = self._models.get(key)
+                if resident is not None:
+                    self._models.move_to_end(key)
+                    self._hits += 1
+                    return resident.model
+
+                self._misses += 1
+
+            load_start_time = time.time()
+            model = self._load(key)
+            load_elapsed_time = time.time() - load_start_time
+
+            size_bytes = _model_size_bytes(model)
+
+            with self._lock:
+                self._models[key] = _ResidentModel(model, size_bytes)
+                self._load_seconds[key] = load_elapsed_time
+                self._loading_locks.pop(key, None)
+                self._evict_over_budget(keep=key)
+
+        print(
+            f"📦 [model_registry] Loaded {key.model_name} ({key.precision}) on {key.device} in {load_elapsed_time:.2f}s ({size_bytes / 1024**2:.0f} MB)"
+        )
+
+        return model
+
+    def _load(self, key: ModelKey) -> whisper.Whisper:
+        checkpoint_path = local_checkpoint_path(key.model_name)
+
+        if checkpoint_path:
+            model = load_local_checkpoint(key.model_name, checkpoint_path).to(
+                key.device
+            )
+        else:
+            print(
+                f"⚠️ [model_registry] {key.model_name} weights aren't in {resolve_model_dir()}, downloading them."
+            )
+            model = whisper.load_model(
+                key.model_name, device=key.device, download_root=resolve_model_dir()
+            )
+
+        if key.precision == "fp16":
+            model = model.half()
+
+        model.eval()
+
+        if key.precision == "int8":
+            model = quantize_int8(model)
+
+        return model
+
+    def _evict_over_budget(self, keep: ModelKey) -> None:
+        """Must be called with self._lock held."""
+
+        if self._memory_budget_bytes <= 0:
+            return
+
+        resident_bytes = sum(entry.size_bytes for entry in self._models.values())
+
+        for key in list(self._models.keys()):
+            if resident_bytes <= self._memory_budget_bytes:
+                break
+
+            if key == keep:
+                continue
+
+            evicted = self._models.pop(key)
+            resident_bytes -= evicted.size_bytes
+            self._evictions += 1
+
+            print(
+                f"🗑️ [model_registry] Evicted {key.model_name} ({key.precision}) on {key.device} to stay under memory budget."
+            )
+
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def stats(self) -> ModelRegistryStats:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "resident_models": [
+                    f"{key.model_name}:{key.device}:{key.precision}"
+                    for key in self._models.keys()
+                ],
+                "resident_bytes": sum(
+                    entry.size_bytes for entry in self._models.values()
+                ),
+                "load_seconds": {
+                    f"{key.model_name}:{key.device}:{key.precision}": seconds
+                    for key, seconds in self._load_seconds.items()
+                },
+            }
+
+
+model_registry = WhisperModelRegistry(
+    memory_budget_bytes=WHISPER_MODEL_MEMORY_BUDGET_MB * 1024**2
+)
+
+
+def get_whisper_model(
+    model_name: str, device: str = "cpu", precision: str = "fp32"
+) -> whisper.Whisper:
+    return model_registry.get_model(model_name, device=device, precision=precision)
+
+
+def get_model_registry_stats() -> ModelRegistryStats:
+    return model_registry.stats()
+
+
+def precision_uses_fp16(precision: str) -> bool:
+    return precision == "fp16"
@@ -0,0 +1,45 @@
+"""
+Tracks the measured real-time factor (processing seconds per media second) of transcription on this node.
+"""
+
+import os
+import threading
+
+# Used until the first transcription on this node has been measured.
+WHISPER_DEFAULT_REAL_TIME_FACTOR = float(
+    os.getenv("WHISPER_DEFAULT_REAL_TIME_FACTOR", "0.5")
+)
+
+# Weight given to the newest measurement in the moving average.
+_SMOOTHING = 0.3
+
+_lock = threading.Lock()
+_real_time_factor = WHISPER_DEFAULT_REAL_TIME_FACTOR
+_samples = 0
+
+
+def record_real_time_factor(media_seconds: float, processing_seconds: float) -> None:
+    global _real_time_factor, _samples
+
+    if media_seconds <= 0 or processing_seconds <= 0:
+        return
+
+    measured = processing_seconds / media_seconds
+
+    with _lock:
+        if _samples == 0:
+            _real_time_factor = measured
+        else:
+            _real_time_factor = (
+                _SMOOTHING * measured + (1 - _SMOOTHING) * _real_time_factor
+            )
+        _samples += 1
+
+
+def get_real_time_factor() -> float:
+    with _lock:
+        return _real_time_factor
+
+
+def estimate_processing_seconds(media_seconds: float) -> float:
+    return media_seconds * get_real_time_factor()
@@ -0,0 +1,270 @@
+"""
+Per-upload model routing: the first WHISPER_ROUTING_POLICY rule matching an upload's duration, user tier
+and the node's backlog picks its model, precision and decode settings (policy format in the README).
+"""
+
+import json
+import os
+from typing import Any, Dict, List, NamedTuple, Set, Tuple
+
+WHISPER_ROUTING_POLICY = os.getenv("WHISPER_ROUTING_POLICY", "")
+
+DEFAULT_USER_TIER = "free"
+
+DEFAULT_RULE_NAME = "default"
+
+_CONDITION_KEYS = {
+    "tiers",
+    "min_duration_seconds",
+    "max_duration_seconds",
+    "min_backlog",
+    "max_backlog",
+}
+_SETTING_KEYS = {"model", "precision", "beam_size", "include_timestamps"}
+
+SUPPORTED_PRECISIONS = ("fp32", "fp16", "int8")
+
+# whisper._MODELS' names, whisper (and torch) are only imported by the inference workers.
+WHISPER_MODEL_NAMES = (
+    "tiny.en",
+    "tiny",
+    "base.en",
+    "base",
+    "small.en",
+    "small",
+    "medium.en",
+    "medium",
+    "large-v1",
+    "large-v2",
+    "large-v3",
+    "large",
+    "large-v3-turbo",
+    "turbo",
+)
+
+
+def check_precision(precision: str, device: str) -> None:
+    """Raises ValueError when precision can't run on device."""
+
+    if precision not in SUPPORTED_PRECISIONS:
+        raise ValueError(f"Unsupported Whisper precision: {precision}")
+
+    if precision == "fp16" and str(device) == "cpu":
+        raise ValueError("fp16 Whisper inference is not supported on cpu.")
+
+    if precision == "int8" and str(device) != "cpu":
+        raise ValueError("int8 Whisper inference is only supported on cpu.")
+
+
+class RoutingDecision(NamedTuple):
+    rule: str
+    model: str
+    precision: str
+    beam_size: int | None = None
+    include_timestamps: bool = False
+
+    @property
+    def variant(self) -> Tuple[str, str]:
+        """The (model, precision) pair an inference pool is loaded with."""
+
+        return (self.model, self.precision)
+
+    def decode_options(self) -> Dict[str, Any]:
+        """Keyword arguments for whisper's transcribe on top of the defaults."""
+
+        return {"beam_size": self.beam_size} if self.beam_size else {}
+
+    def transcript_options(self) -> Dict[str, Any]:
+        """Everything besides the model and the media that changes the transcript, for the cache key."""
+
+        options: Dict[str, Any] = {
+            "precision": self.precision,
+            "include_timestamps": self.include_timestamps,
+        }
+        if self.beam_size:
+            options["beam_size"] = self.beam_size
+        return options
+
+
+class RoutingRule(NamedTuple):
+    name: str
+    settings: Dict[str, Any]
+    tiers: Tuple[str, ...] | None = None
+    min_duration_seconds: float | None = None
+    max_duration_seconds: float | None = None
+    min_backlog: int | None = None
+    max_backlog: int | None = None
+
+    def matches(self, duration: float | None, tier: str, backlog: int) -> bool:
+        if self.tiers is not None and tier not in self.tiers:
+            return False
+
+        if (
+            self.min_duration_seconds is not None
+            or self.max_duration_seconds is not None
+        ):
+            if duration is None:
+                return False
+            if (
+                self.min_duration_seconds is not None
+                and duration < self.min_duration_seconds
+            ):
+                return False
+            if (
+                self.max_duration_seconds is not None
+                and duration > self.max_duration_seconds
+            ):
+                return False
+
+        if self.min_backlog is not None and backlog < self.min_backlog:
+            return False
+        if self.max_backlog is not None and backlog > self.max_backlog:
+            return False
+
+        return True
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _check_rule(name: str, raw_rule: Dict[str, Any], device: str) -> None:
+    """Raises ValueError naming the rule, at boot instead of in a worker that can't load its model."""
+
+    def invalid(key: str, expected: str) -> ValueError:
+        return ValueError(
+            f"Routing rule {name} has an invalid {key}: {raw_rule[key]!r}, expected {expected}."
+        )
+
+    model = raw_rule.get("model")
+    if model is not None and not (
+        isinstance(model, str)
+        and (model in WHISPER_MODEL_NAMES or os.path.isfile(model))
+    ):
+        raise invalid("model", "a Whisper model name or checkpoint path")
+
+    precision = raw_rule.get("precision")
+    if precision is not None:
+        if not isinstance(precision, str):
+            raise invalid("precision", ", ".join(SUPPORTED_PRECISIONS))
+        try:
+            check_precision(precision, device)
+        except ValueError as e:
+            raise ValueError(f"Routing rule {name}: {e}") from e
+
+    beam_size = raw_rule.get("beam_size")
+    if beam_size is not None and not (_is_int(beam_size) and beam_size >= 1):
+        raise invalid("beam_size", "an integer of at least 1")
+
+    if "include_timestamps" in raw_rule and not isinstance(
+        raw_rule["include_timestamps"], bool
+    ):
+        raise invalid("include_timestamps", "true or false")
+
+    tiers = raw_rule.get("tiers")
+    if tiers is not None and not (
+        isinstance(tiers, list) and all(isinstance(tier, str) for tier in tiers)
+    ):
+        raise invalid("tiers", "a list of tier names")
+
+    for key in ("min_duration_seconds", "max_duration_seconds"):
+        if raw_rule.get(key) is not None and not _is_number(raw_rule[key]):
+            raise invalid(key, "a number of seconds")
+
+    for key in ("min_backlog", "max_backlog"):
+        if raw_rule.get(key) is not None and not _is_int(raw_rule[key]):
+            raise invalid(key, "an integer")
+
+
+def parse_routing_rules(setting: str, device: str = "cpu") -> List[RoutingRule]:
+    """
+    Rules from inline JSON or a .json file path, checked against the models and precisions device
+    can run. Raises ValueError on a malformed policy.
+    """
+
+    setting = setting.strip()
+    if not setting:
+        return []
+
+    try:
+        if setting.startswith("["):
+            raw_rules = json.loads(setting)
+        else:
+            with open(setting, encoding="utf-8") as file:
+                raw_rules = json.load(file)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Can't read WHISPER_ROUTING_POLICY: {e}") from e
+
+    if not isinstance(raw_rules, list):
+        raise ValueError("WHISPER_ROUTING_POLICY must be a JSON list of rules.")
+
+    rules: List[RoutingRule] = []
+
+    for index, raw_rule in enumerate(raw_rules):
+        if not isinstance(raw_rule, dict):
+            raise ValueError(f"Routing rule {index} isn't a JSON object.")
+
+        name = str(raw_rule.get("name") or f"rule_{index}")
+
+        unknown_keys = set(raw_rule) - _CONDITION_KEYS - _SETTING_KEYS - {"name"}
+        if unknown_keys:
+            raise ValueError(
+                f"Routing rule {name} has unknown keys: {', '.join(sorted(unknown_keys))}"
+            )
+
+        _check_rule(name, raw_rule, device)
+
+        tiers = raw_rule.get("tiers")
+
+        rules.append(
+            RoutingRule(
+                name=name,
+                settings={
+                    key: raw_rule[key] for key in _SETTING_KEYS if key in raw_rule
+                },
+                tiers=tuple(tiers) if tiers is not None else None,
+                min_duration_seconds=raw_rule.get("min_duration_seconds"),
+                max_duration_seconds=raw_rule.get("max_duration_seconds"),
+                min_backlog=raw_rule.get("min_backlog"),
+                max_backlog=raw_rule.get("max_backlog"),
+            )
+        )
+
+    return rules
+
+
+class ModelRouter:
+    """Picks a RoutingDecision per upload from the rules, falling back to the default model and precision."""
+
+    def __init__(
+        self, default_model: str, default_precision: str, rules: List[RoutingRule]
+    ):
+        self._default = RoutingDecision(
+            DEFAULT_RULE_NAME, default_model, default_precision
+        )
+        self._routes = [
+            (rule, self._default._replace(rule=rule.name, **rule.settings))
+            for rule in rules
+        ]
+
+    @property
+    def default(self) -> RoutingDecision:
+        return self._default
+
+    def variants(self) -> Set[Tuple[str, str]]:
+        """Every (model, precision) the policy can route to, the default included."""
+
+        return {self._default.variant} | {
+            decision.variant for _, decision in self._routes
+        }
+
+    def route(self, duration: float | None, tier: str, backlog: int) -> RoutingDecision:
+        for rule, decision in self._routes:
+            if rule.matches(duration, tier, backlog):
+                return decision
+
+        return self._default
@@ -0,0 +1,287 @@
+"""
+Transcribes media of WHISPER_STREAMING_MIN_SECONDS or longer from a 16-bit PCM file, one 30-second window
+at a time with whisper.transcribe's fallback and seeking, so a worker's memory doesn't grow with the media.
+"""
+
+import os
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, NamedTuple, Tuple
+
+from services.audio_extractor.main import read_pcm_file
+
+if TYPE_CHECKING:
+    import whisper
+
+# Media at least this long takes the streaming path, 0 turns it off.
+WHISPER_STREAMING_MIN_SECONDS = float(
+    os.getenv("WHISPER_STREAMING_MIN_SECONDS", "3600")
+)
+
+# whisper.audio's constants. torch and whisper are only imported by the inference workers.
+_SAMPLE_RATE = 16000
+_HOP_LENGTH = 160
+_FRAMES_PER_SECOND = _SAMPLE_RATE // _HOP_LENGTH
+_WINDOW_FRAMES = 30 * _FRAMES_PER_SECOND
+
+# Same decoding defaults and thresholds whisper.transcribe uses.
+_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+_COMPRESSION_RATIO_THRESHOLD = 2.4
+_LOGPROB_THRESHOLD = -1.0
+_NO_SPEECH_THRESHOLD = 0.6
+
+
+class StreamedAudio(NamedTuple):
+    pcm_path: str
+    samples: int
+    # Ranges to transcribe in seconds, None for all of it.
+    clips: Tuple[Tuple[float, float], ...] | None = None
+
+    @property
+    def seconds(self) -> float:
+        return self.samples / _SAMPLE_RATE
+
+    @property
+    def clip_seconds(self) -> float:
+        if self.clips is None:
+            return self.seconds
+        return sum(end - start for start, end in self.clips)
+
+
+def should_stream(media_duration: float | None) -> bool:
+    return (
+        WHISPER_STREAMING_MIN_SECONDS > 0
+        and media_duration is not None
+        and media_duration >= WHISPER_STREAMING_MIN_SECONDS
+    )
+
+
+def _clip_frames(streamed: StreamedAudio) -> List[Tuple[int, int]]:
+    content_frames = streamed.samples // _HOP_LENGTH
+
+    if streamed.clips is None:
+        return [(0, content_frames)]
+
+    return [
+        (
+            round(start * _FRAMES_PER_SECOND),
+            min(content_frames, round(end * _FRAMES_PER_SECOND)),
+        )
+        for start, end in streamed.clips
+    ]
+
+
+def _window_mel(
+    model: "whisper.Whisper",
+    streamed: StreamedAudio,
+    seek: int,
+    frames: int,
+    fp16: bool,
+):
+    """Log-mel of the frames from seek, padded to a full window, computed from those samples alone."""
+
+    import torch
+    import whisper
+
+    audio = read_pcm_file(streamed.pcm_path, seek * _HOP_LENGTH, frames * _HOP_LENGTH)
+
+    mel = whisper.log_mel_spectrogram(
+        whisper.pad_or_trim(torch.from_numpy(audio)), n_mels=model.dims.n_mels
+    ).to(model.device)
+
+    return mel.half() if fp16 else mel
+
+
+def detect_stream_language(
+    model: "whisper.Whisper", streamed: StreamedAudio, fp16: bool = False
+) -> str:
+    """Whisper's detection, from the first window of the first clip."""
+
+    if not model.is_multilingual:
+        return "en"
+
+    seek, end = _clip_frames(streamed)[0]
+    mel = _window_mel(model, streamed, seek, min(_WINDOW_FRAMES, end - seek), fp16)
+
+    _, probs = model.detect_language(mel)
+    return max(probs, key=probs.get)
+
+
+def _decode_with_fallback(model: "whisper.Whisper", mel, options: Dict[str, Any]):
+    import whisper
+
+    for temperature in _TEMPERATURES:
+        kwargs = {**options}
+        if temperature > 0:
+            kwargs.pop("beam_size", None)
+            kwargs.pop("patience", None)
+        else:
+            kwargs.pop("best_of", None)
+
+        result = model.decode(
+            mel, whisper.DecodingOptions(**kwargs, temperature=temperature)
+        )
+
+        is_silent = (
+            result.no_speech_prob > _NO_SPEECH_THRESHOLD
+            and result.avg_logprob < _LOGPROB_THRESHOLD
+        )
+        needs_fallback = not is_silent and (
+            result.compression_ratio > _COMPRESSION_RATIO_THRESHOLD
+            or result.avg_logprob < _LOGPROB_THRESHOLD
+        )
+
+        if not needs_fallback:
+            break
+
+    return result
+
+
+def stream_segments(
+    model: "whisper.Whisper",
+    streamed: StreamedAudio,
+    language: str,
+    fp16: bool = False,
+    decode_options: Dict[str, Any] | None = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields segments (start, end, text) window by window, seeking through each clip the way
+    whisper.transcribe seeks through its in-memory spectrogram.
+    """
+
+    from whisper.tokenizer import get_tokenizer
+
+    decode_options = {**(decode_options or {}), "language": language, "fp16": fp16}
+
+    tokenizer = get_tokenizer(
+        model.is_multilingual,
+        num_languages=model.num_languages,
+        language=language,
+        task=decode_options.get("task", "transcribe"),
+    )
+    timestamp_begin = tokenizer.timestamp_begin
+
+    # Mel frames per output token, and seconds per timestamp token.
+    input_stride = _WINDOW_FRAMES // model.dims.n_audio_ctx
+    time_precision = input_stride / _FRAMES_PER_SECOND
+
+    # Previous text fed to the next window, no more than the decoder reads.
+    max_prompt_tokens = model.dims.n_text_ctx // 2 - 1
+    prompt: List[int] = []
+
+    def segment(start: float, end: float, tokens: List[int]) -> Dict[str, Any]:
+        text_tokens = [token for token in tokens if token < tokenizer.eot]
+        return {
+            "start": start,
+            "end": end,
+            "text": tokenizer.decode(text_tokens),
+            "tokens": tokens,
+        }
+
+    for clip_start, clip_end in _clip_frames(streamed):
+        seek = clip_start
+
+        while seek < clip_end:
+            frames = min(_WINDOW_FRAMES, clip_end - seek)
+            time_offset = seek / _FRAMES_PER_SECOND
+
+            result = _decode_with_fallback(
+                model,
+                _window_mel(model, streamed, seek, frames, fp16),
+                {**decode_options, "prompt": prompt},
+            )
+            tokens = list(result.tokens)
+
+            if (
+                result.no_speech_prob > _NO_SPEECH_THRESHOLD
+                and result.avg_logprob <= _LOGPROB_THRESHOLD
+            ):
+                seek += frames
+                continue
+
+            is_timestamp = [token >= timestamp_begin for token in tokens]
+            single_timestamp_ending = is_timestamp[-2:] == [False, True]
+            consecutive = [
+                i + 1
+                for i in range(len(tokens) - 1)
+                if is_timestamp[i] and is_timestamp[i + 1]
+            ]
+
+            window_segments: List[Dict[str, Any]] = []
+            advance = frames
+
+            if consecutive:
+                # Segments between pairs of timestamp tokens.
+                slices = consecutive + (
+                    [len(tokens)] if single_timestamp_ending else []
+                )
+                last_slice = 0
+
+                for current_slice in slices:
+                    sliced_tokens = tokens[last_slice:current_slice]
+                    window_segments.append(
+                        segment(
+                            time_offset
+                            + (sliced_tokens[0] - timestamp_begin) * time_precision,
+                            time_offset
+                            + (sliced_tokens[-1] - timestamp_begin) * time_precision,
+                            sliced_tokens,
+                        )
+                    )
+                    last_slice = current_slice
+
+                # An unfinished last segment is decoded again from its start in the next window.
+                if not single_timestamp_ending:
+                    advance = (tokens[last_slice - 1] - timestamp_begin) * input_stride
+            else:
+                duration = frames / _FRAMES_PER_SECOND
+                timestamps = [token for token in tokens if token >= timestamp_begin]
+                if timestamps and timestamps[-1] != timestamp_begin:
+                    duration = (timestamps[-1] - timestamp_begin) * time_precision
+
+                window_segments.append(
+                    segment(time_offset, time_offset + duration, tokens)
+                )
+
+            seek += advance if advance > 0 else frames
+
+            for window_segment in window_segments:
+                if (
+                    window_segment["start"] == window_segment["end"]
+                    or not window_segment["text"].strip()
+                ):
+                    continue
+
+                prompt.extend(window_segment.pop("tokens"))
+                yield window_segment
+
+            # A high temperature decode isn't fed on as context.
+            prompt = [] if result.temperature > 0.5 else prompt[-max_prompt_tokens:]
+
+
+def transcribe_streaming(
+    model: "whisper.Whisper",
+    streamed: StreamedAudio,
+    fp16: bool = False,
+    decode_options: Dict[str, Any] | None = None,
+) -> Dict[str, Any]:
+    """
+    Transcribes a PCM file window by window, in decode_options' language when given.
+    Returns a dict shaped like whisper's transcribe result (text, segments, language).
+    """
+
+    decode_options = dict(decode_options or {})
+    language = decode_options.pop("language", None) or detect_stream_language(
+        model, streamed, fp16
+    )
+
+    segments = [
+        {"id": i, **segment}
+        for i, segment in enumerate(
+            stream_segments(model, streamed, language, fp16, decode_options)
+        )
+    ]
+
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": language,
+    }
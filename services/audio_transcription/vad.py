@@ -0,0 +1,204 @@
+"""
+Energy-based trimming of silence and dead air before transcription, off by default (WHISPER_VAD_ENABLED).
+Frames louder than the recording's noise floor by WHISPER_VAD_THRESHOLD_DB, or than WHISPER_VAD_SPEECH_DBFS
+in any case, count as voiced. It can't tell music from speech, music is kept.
+"""
+
+import bisect
+import os
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from services.audio_extractor.main import iter_pcm_file
+from services.audio_transcription.chunked import frame_rms
+
+SAMPLE_RATE = 16000
+
+WHISPER_VAD_ENABLED = os.getenv("WHISPER_VAD_ENABLED", "false") == "true"
+WHISPER_VAD_THRESHOLD_DB = float(os.getenv("WHISPER_VAD_THRESHOLD_DB", "12"))
+
+# Frames at least this loud are never cut, so a quiet speaker in an otherwise loud recording is kept.
+WHISPER_VAD_SPEECH_DBFS = float(os.getenv("WHISPER_VAD_SPEECH_DBFS", "-45"))
+
+WHISPER_VAD_MIN_SILENCE_SECONDS = float(
+    os.getenv("WHISPER_VAD_MIN_SILENCE_SECONDS", "2")
+)
+WHISPER_VAD_PAD_SECONDS = float(os.getenv("WHISPER_VAD_PAD_SECONDS", "0.4"))
+
+_FRAME_SECONDS = 0.03
+
+# Frames quieter than this are silence whatever the noise floor, e.g. digital silence.
+_SILENCE_DB = -60.0
+
+# Shorter voiced runs are clicks and bumps, not speech.
+_MIN_SPEECH_SECONDS = 0.3
+
+# Silence inserted between kept regions.
+_JOIN_GAP_SECONDS = 0.2
+
+# Trimming less than this isn't worth changing the audio for.
+_MIN_SKIP_FRACTION = 0.05
+
+# PCM files are read a whole number of frames at a time, so their frames match the in-memory ones.
+_PCM_WINDOW_SAMPLES = 60 * SAMPLE_RATE
+
+
+class SpeechRegion(NamedTuple):
+    start_sample: int
+    end_sample: int
+
+
+class _Piece(NamedTuple):
+    trimmed_start: float
+    original_start: float
+    seconds: float
+
+
+class TimeMap:
+    """Maps seconds in the trimmed audio to seconds in the original media."""
+
+    def __init__(self, pieces: List[_Piece]):
+        self._pieces = pieces
+        self._trimmed_starts = [piece.trimmed_start for piece in pieces]
+
+    @property
+    def speech_seconds(self) -> float:
+        return sum(piece.seconds for piece in self._pieces)
+
+    def to_original(self, seconds: float) -> float:
+        # A time inside a join gap belongs to the end of the region before it.
+        index = max(0, bisect.bisect_right(self._trimmed_starts, seconds) - 1)
+        piece = self._pieces[index]
+        offset = min(max(seconds - piece.trimmed_start, 0.0), piece.seconds)
+        return piece.original_start + offset
+
+    def remap_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """A whisper-shaped result (text, segments, language) with segment times on the original media."""
+
+        return {
+            **result,
+            "segments": [
+                {
+                    **segment,
+                    "start": self.to_original(segment["start"]),
+                    "end": self.to_original(segment["end"]),
+                }
+                for segment in result["segments"]
+            ],
+        }
+
+
+def detect_speech_regions(audio: np.ndarray) -> List[SpeechRegion]:
+    return _regions_from_energy(frame_rms(audio, _FRAME_SECONDS), len(audio))
+
+
+def _regions_from_energy(energy: np.ndarray, total_samples: int) -> List[SpeechRegion]:
+    if len(energy) == 0:
+        return []
+
+    energy_db = 20 * np.log10(np.maximum(energy, 1e-10))
+    noise_floor_db = float(np.percentile(energy_db, 10))
+    threshold_db = max(
+        min(noise_floor_db + WHISPER_VAD_THRESHOLD_DB, WHISPER_VAD_SPEECH_DBFS),
+        _SILENCE_DB,
+    )
+
+    voiced = np.flatnonzero(energy_db > threshold_db)
+    if len(voiced) == 0:
+        return []
+
+    # Runs of voiced frames, split wherever the gap to the next one is a long silence.
+    max_gap_frames = int(WHISPER_VAD_MIN_SILENCE_SECONDS / _FRAME_SECONDS)
+    breaks = np.flatnonzero(np.diff(voiced) > max_gap_frames)
+    run_starts = np.concatenate(([voiced[0]], voiced[breaks + 1]))
+    run_ends = np.concatenate((voiced[breaks], [voiced[-1]])) + 1
+
+    frame_length = int(_FRAME_SECONDS * SAMPLE_RATE)
+    pad = int(WHISPER_VAD_PAD_SECONDS * SAMPLE_RATE)
+    min_speech_frames = int(_MIN_SPEECH_SECONDS / _FRAME_SECONDS)
+
+    regions: List[SpeechRegion] = []
+
+    for run_start, run_end in zip(run_starts, run_ends):
+        if run_end - run_start < min_speech_frames:
+            continue
+
+        start = max(0, int(run_start) * frame_length - pad)
+        end = min(total_samples, int(run_end) * frame_length + pad)
+
+        # Padding can make neighbours touch.
+        if regions and start <= regions[-1].end_sample:
+            regions[-1] = SpeechRegion(regions[-1].start_sample, end)
+        else:
+            regions.append(SpeechRegion(start, end))
+
+    return regions
+
+
+def _worth_trimming(regions: List[SpeechRegion], total_samples: int) -> bool:
+    if not regions:
+        return False
+
+    speech_samples = sum(region.end_sample - region.start_sample for region in regions)
+    return 1 - speech_samples / total_samples >= _MIN_SKIP_FRACTION
+
+
+def find_speech_clips(
+    pcm_path: str, total_samples: int
+) -> Tuple[Tuple[float, float], ...] | None:
+    """
+    The speech regions of a 16 kHz PCM file as (start, end) seconds,
+    or None when there's nothing worth skipping.
+    """
+
+    energy = np.concatenate(
+        [np.zeros(0, dtype=np.float32)]
+        + [
+            frame_rms(window, _FRAME_SECONDS)
+            for window in iter_pcm_file(pcm_path, _PCM_WINDOW_SAMPLES)
+        ]
+    )
+
+    regions = _regions_from_energy(energy, total_samples)
+    if not _worth_trimming(regions, total_samples):
+        return None
+
+    return tuple(
+        (region.start_sample / SAMPLE_RATE, region.end_sample / SAMPLE_RATE)
+        for region in regions
+    )
+
+
+def trim_to_speech(audio: np.ndarray) -> Tuple[np.ndarray, TimeMap | None]:
+    """
+    Returns only the speech regions of 16 kHz audio with their TimeMap,
+    or the audio untouched with None when there's nothing worth trimming.
+    """
+
+    regions = detect_speech_regions(audio)
+    if not _worth_trimming(regions, len(audio)):
+        return audio, None
+
+    gap = np.zeros(int(_JOIN_GAP_SECONDS * SAMPLE_RATE), dtype=audio.dtype)
+
+    parts: List[np.ndarray] = []
+    pieces: List[_Piece] = []
+    trimmed_samples = 0
+
+    for region in regions:
+        if parts:
+            parts.append(gap)
+            trimmed_samples += len(gap)
+
+        parts.append(audio[region.start_sample : region.end_sample])
+        pieces.append(
+            _Piece(
+                trimmed_start=trimmed_samples / SAMPLE_RATE,
+                original_start=region.start_sample / SAMPLE_RATE,
+                seconds=(region.end_sample - region.start_sample) / SAMPLE_RATE,
+            )
+        )
+        trimmed_samples += region.end_sample - region.start_sample
+
+    return np.concatenate(parts), TimeMap(pieces)
@@ -0,0 +1,79 @@
+"""
+Async AWS clients for the coroutines in the service.
+
+One aiobotocore client per AWS service is created on first use and kept for the life of the event
+loop, so HTTP connections are pooled and reused across calls (up to AWS_AIO_MAX_POOL_CONNECTIONS per
+service). Calls are coroutines: they never block the loop, any number of them can be in flight from
+the one thread, and cancelling the awaiting task aborts the request.
+
+Code that runs in worker threads (the ffmpeg ingest, ParallelS3Body) keeps using boto3 clients.
+"""
+
+import asyncio
+import os
+from contextlib import AsyncExitStack
+from typing import Any, Dict
+
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
+
+AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+
+AWS_AIO_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_AIO_MAX_POOL_CONNECTIONS", "50"))
+
+_session = None
+
+_clients: Dict[str, Any] = {}
+_exit_stack: AsyncExitStack | None = None
+_clients_loop: asyncio.AbstractEventLoop | None = None
+_clients_lock: asyncio.Lock | None = None
+
+
+async def get_aio_client(service_name: str):
+    """Shared client for service_name ("s3", "sqs", "ssm") on the running event loop."""
+
+    global _session, _exit_stack, _clients_loop, _clients_lock
+
+    loop = asyncio.get_running_loop()
+
+    if _session is None:
+        _session = get_session()
+
+    # Clients are bound to the loop they were opened on.
+    if _clients_loop is not loop:
+        _clients.clear()
+        _exit_stack = AsyncExitStack()
+        _clients_loop = loop
+        _clients_lock = asyncio.Lock()
+
+    client = _clients.get(service_name)
+    if client is not None:
+        return client
+
+    async with _clients_lock:
+        if service_name not in _clients:
+            _clients[service_name] = await _exit_stack.enter_async_context(
+                _session.create_client(
+                    service_name,
+                    region_name=AWS_REGION,
+                    config=AioConfig(max_pool_connections=AWS_AIO_MAX_POOL_CONNECTIONS),
+                )
+            )
+
+        return _clients[service_name]
+
+
+async def close_aio_clients() -> None:
+    """Closes every client and its connection pool. Call before the event loop shuts down."""
+
+    global _exit_stack, _clients_loop, _clients_lock
+
+    exit_stack = _exit_stack
+
+    _clients.clear()
+    _exit_stack = None
+    _clients_loop = None
+    _clients_lock = None
+
+    if exit_stack is not None:
+        await exit_stack.aclose()
@@ -1,84 +1,260 @@
 import os
+from typing import Any, Dict, List
 
-import boto3
-import boto3.exceptions
+from botocore.exceptions import BotoCoreError, ClientError
 from bson.objectid import ObjectId
-from pymongo import AsyncMongoClient
+from pymongo import AsyncMongoClient, InsertOne
+from pymongo.errors import PyMongoError
 
-from services.aws.ssm import get_secret
-from services.utils.types.main import BaseFilePayload, FilePayload
+from services.aws.aio import get_aio_client
+from services.aws.ssm import get_secret_async
+from services.aws.transfer import download_s3_object_async, upload_s3_object_async
+from services.utils.types.main import (
+    BaseFilePayload,
+    CopyFilePayload,
+    FileRecord,
+)
 
 
-async def upload_s3_file_record_in_db(
-    s3_client: boto3.client,
-    mongo_client: AsyncMongoClient,
-    base_file_payload: BaseFilePayload,
-) -> FilePayload:
+def new_file_record(user_id: str, note_id: str, file_name: str) -> FileRecord:
+    """
+    Pre-allocates the File _id client-side, so the s3_key is known before anything is uploaded
+    and the File document can be written once, already complete, after the upload succeeds.
+
+    file_name is the media file name with the .extension.
     """
-    Creates a new MongoDB File, uploads the File to s3, then updates the newly created File document with the s3_key.
 
-    file_name property in BaseFilePayload dictionary is the media file name with the .extension.
+    file_id = ObjectId()
+    target_s3_key = f"{user_id}/{note_id}/{file_id}/{file_name}"
+
+    _, file_extension = os.path.splitext(file_name)
+
+    return {
+        "uploaded_s3_key": target_s3_key,
+        "new_file_id": str(file_id),
+        "document": {
+            "_id": file_id,
+            "user_id": ObjectId(user_id),
+            "note_id": ObjectId(note_id),
+            "file_name": file_name,
+            "file_type": file_extension,
+            "s3_key": target_s3_key,
+        },
+    }
+
+
+async def upload_s3_file(base_file_payload: BaseFilePayload) -> FileRecord | None:
+    """
+    Uploads a local File to s3 under a pre-allocated File _id.
+    Returns the File record to commit with commit_file_records, or None if the upload failed.
     """
 
-    user_id = base_file_payload["user_id"]
-    note_id = base_file_payload["note_id"]
     file_name = base_file_payload["file_name"]
     file_path = base_file_payload["file_path"]
 
-    base_s3_key = f"{user_id}/{note_id}"
-
     try:
-        bucket_name = get_secret("/alwayssaved/AWS_BUCKET")
-        bucket_base_url = get_secret("/alwayssaved/AWS_BUCKET_BASE_URL")
+        bucket_name = await get_secret_async("/alwayssaved/AWS_BUCKET")
 
-        if bucket_name is None or bucket_base_url is None:
-            raise ValueError(
-                "AWS_BUCKET or BUCKET_BASE_URL environment variables are not set."
-            )
+        if bucket_name is None:
+            raise ValueError("AWS_BUCKET environment variable is not set.")
 
         file_abs_path = os.path.abspath(file_path)
 
         if not os.path.exists(file_abs_path):
             raise FileNotFoundError(f"File does not exist: {file_abs_path}")
 
-        _, file_extension = os.path.splitext(file_name)
+        file_record = new_file_record(
+            base_file_payload["user_id"], base_file_payload["note_id"], file_name
+        )
+
+        # Async multipart upload, other uploads keep making progress on the same loop.
+        await upload_s3_object_async(
+            file_abs_path, bucket_name, file_record["uploaded_s3_key"]
+        )
+
+        return file_record
+
+    except (ClientError, BotoCoreError) as e:
+        print(f"❌ Error uploading file to s3 in upload_s3_file: {e}")
+
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e}")
+
+    except ValueError as e:
+        print(f"❌ Value Error in upload_s3_file: {e}")
+
+    return None
+
+
+async def copy_s3_file(copy_file_payload: CopyFilePayload) -> FileRecord | None:
+    """
+    Same as upload_s3_file, but the File content comes from an existing s3 object
+    (server-side copy, nothing is downloaded or uploaded by the Extractor Service).
+    """
+
+    source_s3_key = copy_file_payload["source_s3_key"]
+
+    try:
+        bucket_name = await get_secret_async("/alwayssaved/AWS_BUCKET")
+
+        if bucket_name is None:
+            raise ValueError("AWS_BUCKET environment variable is not set.")
+
+        file_record = new_file_record(
+            copy_file_payload["user_id"],
+            copy_file_payload["note_id"],
+            copy_file_payload["file_name"],
+        )
+
+        s3_client = await get_aio_client("s3")
+        await s3_client.copy_object(
+            Bucket=bucket_name,
+            Key=file_record["uploaded_s3_key"],
+            CopySource={"Bucket": bucket_name, "Key": source_s3_key},
+        )
+
+        return file_record
+
+    except ClientError as e:
+        print(
+            f"❌ Error copying s3 file {source_s3_key} in copy_s3_file: {e.response.get('Error', {}).get('Message', str(e))}"
+        )
+
+    # Connection and endpoint errors fail this copy only, so the caller can clean up the other one.
+    except BotoCoreError as e:
+        print(f"❌ Error copying s3 file {source_s3_key} in copy_s3_file: {e}")
+
+    except ValueError as e:
+        print(f"❌ Value Error in copy_s3_file: {e}")
+
+    return None
 
-        new_file_payload = {
-            "user_id": ObjectId(user_id),
-            "note_id": ObjectId(note_id),
-            "file_name": file_name,
-            "file_type": file_extension,
-        }
 
-        insert_result = (
-            await mongo_client.get_database("alwayssaved")
-            .get_collection("files")
-            .insert_one(new_file_payload)
+async def delete_s3_files(file_records: List[FileRecord]) -> None:
+    """Removes uploaded s3 objects whose File documents will never be committed."""
+
+    if not file_records:
+        return
+
+    try:
+        bucket_name = await get_secret_async("/alwayssaved/AWS_BUCKET")
+
+        if bucket_name is None:
+            raise ValueError("AWS_BUCKET environment variable is not set.")
+
+        s3_client = await get_aio_client("s3")
+        await s3_client.delete_objects(
+            Bucket=bucket_name,
+            Delete={
+                "Objects": [
+                    {"Key": file_record["uploaded_s3_key"]}
+                    for file_record in file_records
+                ],
+                "Quiet": True,
+            },
         )
 
-        new_file_id = str(insert_result.inserted_id)
+    except ClientError as e:
+        print(
+            f"❌ Error in delete_s3_files: {e.response.get('Error', {}).get('Message', str(e))}"
+        )
+
+    except BotoCoreError as e:
+        print(f"❌ Error in delete_s3_files: {e}")
+
+    except ValueError as e:
+        print(f"❌ Value Error in delete_s3_files: {e}")
+
+
+async def commit_file_records(
+    mongo_client: AsyncMongoClient,
+    file_records: List[FileRecord],
+) -> bool:
+    """
+    Writes every File document of one SQS message in a single bulk_write.
+    All or nothing: if the write fails, documents that made it in and the uploaded s3 objects are removed.
+    """
 
-        target_s3_key = f"{base_s3_key}/{new_file_id}/{file_name}"
+    if not file_records:
+        return True
 
-        s3_client.upload_file(file_abs_path, bucket_name, target_s3_key)
+    files_collection = mongo_client.get_database("alwayssaved").get_collection("files")
 
-        await (
-            mongo_client.get_database("alwayssaved")
-            .get_collection("files")
-            .find_one_and_update(
-                {"_id": ObjectId(new_file_id)}, {"$set": {"s3_key": target_s3_key}}
-            )
+    try:
+        await files_collection.bulk_write(
+            [InsertOne(file_record["document"]) for file_record in file_records]
         )
+        return True
 
-        return {"uploaded_s3_key": target_s3_key, "new_file_id": new_file_id}
+    except PyMongoError as e:
+        print(f"❌ MongoDB Error in commit_file_records: {e}")
 
-    except boto3.exceptions.S3UploadFailedError as e:
-        print(f"❌ Error uploading file to s3 in upload_to_s3: {e}")
+    try:
+        await files_collection.delete_many(
+            {
+                "_id": {
+                    "$in": [
+                        file_record["document"]["_id"] for file_record in file_records
+                    ]
+                }
+            }
+        )
+    except PyMongoError as e:
+        print(f"❌ MongoDB Error cleaning up in commit_file_records: {e}")
 
-    except FileNotFoundError as e:
-        print(f"❌ File not found: {e}")
+    await delete_s3_files(file_records)
+
+    return False
+
+
+async def head_s3_object(s3_key: str) -> Dict[str, Any] | None:
+    """Returns the s3 object metadata (ETag, size and full-object checksums when S3 has them)."""
+
+    try:
+        bucket_name = await get_secret_async("/alwayssaved/AWS_BUCKET")
+
+        if bucket_name is None:
+            raise ValueError("AWS_BUCKET environment variable is not set.")
+
+        s3_client = await get_aio_client("s3")
+        return await s3_client.head_object(
+            Bucket=bucket_name, Key=s3_key, ChecksumMode="ENABLED"
+        )
+
+    except ClientError as e:
+        print(
+            f"❌ Error in head_s3_object for s3_key {s3_key}: {e.response.get('Error', {}).get('Message', str(e))}"
+        )
+
+    # Endpoint, connection and read-timeout errors; a failed cache probe is a miss, never a failed job.
+    except BotoCoreError as e:
+        print(f"❌ Error in head_s3_object for s3_key {s3_key}: {e}")
+
+    except ValueError as e:
+        print(f"❌ Value Error in head_s3_object: {e}")
+
+    return None
+
+
+async def download_s3_file(s3_key: str, file_path: str) -> bool:
+    try:
+        bucket_name = await get_secret_async("/alwayssaved/AWS_BUCKET")
+
+        if bucket_name is None:
+            raise ValueError("AWS_BUCKET environment variable is not set.")
+
+        await download_s3_object_async(bucket_name, s3_key, file_path)
+        return True
+
+    except ClientError as e:
+        print(
+            f"❌ Error in download_s3_file for s3_key {s3_key}: {e.response.get('Error', {}).get('Message', str(e))}"
+        )
+
+    except BotoCoreError as e:
+        print(f"❌ Error in download_s3_file for s3_key {s3_key}: {e}")
 
     except ValueError as e:
-        print(f"❌ Value Error in upload_to_s3: {e}")
+        print(f"❌ Value Error in download_s3_file: {e}")
 
-    return {"uploaded_s3_key": "", "new_file_id": ""}
+    return False
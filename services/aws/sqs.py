@@ -1,29 +1,41 @@
 import json
 import os
-from typing import TYPE_CHECKING, Any, Dict, TypedDict
+from typing import Any, Dict, List, TypedDict
 
-import boto3
 from botocore.exceptions import BotoCoreError, ClientError
 
-from services.aws.ssm import get_secret
+from services.aws.aio import get_aio_client
+from services.aws.ssm import get_secret_async
+from services.utils.types.main import SqsBatchResult
 
-if TYPE_CHECKING:
-    from mypy_boto3_sqs import SQSClient
+# Hard SQS limit for a single ReceiveMessage call.
+SQS_MAX_MESSAGES_PER_POLL = 10
 
-AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
-sqs_client: "SQSClient" = boto3.client("sqs", region_name=AWS_REGION)
+# Hard SQS limit for SendMessageBatch / DeleteMessageBatch entries.
+SQS_MAX_BATCH_ENTRIES = 10
 
+# Short initial lease, extended by the per-message heartbeat once the media duration is known.
+EXTRACTOR_INITIAL_VISIBILITY_TIMEOUT = int(
+    os.getenv("EXTRACTOR_INITIAL_VISIBILITY_TIMEOUT", "60")
+)
 
-def get_extractor_sqs_request() -> Dict[str, Any]:
 
-    extractor_push_queue_url = get_secret("/alwayssaved/EXTRACTOR_PUSH_QUEUE_URL")
+async def get_extractor_sqs_request(max_messages: int = 1) -> Dict[str, Any]:
+    """Long polls the Extractor Push Queue without blocking the loop; cancelling the caller ends the poll."""
+
+    extractor_push_queue_url = await get_secret_async(
+        "/alwayssaved/EXTRACTOR_PUSH_QUEUE_URL"
+    )
 
     try:
-        return sqs_client.receive_message(
+        sqs_client = await get_aio_client("sqs")
+
+        return await sqs_client.receive_message(
             QueueUrl=extractor_push_queue_url,
-            MaxNumberOfMessages=1,
+            MaxNumberOfMessages=max(1, min(max_messages, SQS_MAX_MESSAGES_PER_POLL)),
             WaitTimeSeconds=20,  # <-- long polling
-            VisibilityTimeout=3000,  # <-- 50 mins worst-case processing time
+            VisibilityTimeout=EXTRACTOR_INITIAL_VISIBILITY_TIMEOUT,  # <-- extended by VisibilityHeartbeat
+            MessageSystemAttributeNames=["SentTimestamp", "ApproximateReceiveCount"],
         )
 
     except ClientError as e:
@@ -46,73 +58,168 @@ class EmbeddingPayload(TypedDict):
     transcript_s3_key: str
 
 
-def send_embedding_sqs_message(sqs_payload: EmbeddingPayload) -> None:
-    """Sends a message to the SQS embedding_push_queue indicating the transcript is ready for the embedding process."""
+def _split_batch_response(response: Dict[str, Any], entry_count: int) -> SqsBatchResult:
+    """Maps a *MessageBatch response onto entry indexes. Failures SQS blames on the sender won't succeed on retry."""
+
+    failed_ids = {entry["Id"]: entry for entry in response.get("Failed", [])}
+
+    result: SqsBatchResult = {"successful": [], "retryable": [], "failed": []}
+
+    for index in range(entry_count):
+        failure = failed_ids.get(str(index))
+
+        if failure is None:
+            result["successful"].append(index)
+        elif failure.get("SenderFault"):
+            print(
+                f"❌ SQS batch entry {index} rejected: {failure.get('Code')} {failure.get('Message', '')}"
+            )
+            result["failed"].append(index)
+        else:
+            result["retryable"].append(index)
+
+    return result
+
+
+def _retry_all(entry_count: int) -> SqsBatchResult:
+    return {"successful": [], "retryable": list(range(entry_count)), "failed": []}
+
+
+async def send_embedding_sqs_message_batch(
+    sqs_payloads: List[EmbeddingPayload],
+) -> SqsBatchResult:
+    """Sends up to SQS_MAX_BATCH_ENTRIES embedding_push_queue messages in one SendMessageBatch call."""
 
-    embedding_push_queue_url = get_secret("/alwayssaved/EMBEDDING_PUSH_QUEUE_URL")
+    embedding_push_queue_url = await get_secret_async(
+        "/alwayssaved/EMBEDDING_PUSH_QUEUE_URL"
+    )
 
     if not embedding_push_queue_url:
         print("⚠️ ERROR: SQS Queue URL not set!")
-        return
+        return _retry_all(len(sqs_payloads))
 
     try:
-        payload_json = json.dumps(sqs_payload)
-
-        response = sqs_client.send_message(
+        sqs_client = await get_aio_client("sqs")
+        response = await sqs_client.send_message_batch(
             QueueUrl=embedding_push_queue_url,
-            MessageBody=payload_json,
+            Entries=[
+                {"Id": str(index), "MessageBody": json.dumps(sqs_payload)}
+                for index, sqs_payload in enumerate(sqs_payloads)
+            ],
         )
 
-        print(
-            f"✅ SQS Message Sent in send_embedding_sqs_message for s3_key {sqs_payload['transcript_s3_key']}! Message ID: {response['MessageId']}"
-        )
+        result = _split_batch_response(response, len(sqs_payloads))
+
+        for index in result["successful"]:
+            print(
+                f"✅ SQS Message Sent in send_embedding_sqs_message_batch for s3_key {sqs_payloads[index]['transcript_s3_key']}!"
+            )
+
+        return result
 
     except ClientError as e:
         print(
-            f"❌ AWS Client Error sending SQS message in send_embedding_sqs_message for s3_key {sqs_payload['transcript_s3_key']}: {e.response['Error']['Message']}"
+            f"❌ AWS Client Error in send_embedding_sqs_message_batch: {e.response['Error']['Message']}"
         )
 
     except BotoCoreError as e:
+        print(f"❌ Boto3 Internal Error in send_embedding_sqs_message_batch: {str(e)}")
+
+    return _retry_all(len(sqs_payloads))
+
+
+async def delete_extractor_sqs_message_batch(
+    incoming_sqs_msgs: List[Dict[str, Any]],
+) -> SqsBatchResult:
+    """Deletes up to SQS_MAX_BATCH_ENTRIES processed Extractor Push Queue messages in one DeleteMessageBatch call."""
+
+    extractor_push_queue_url = await get_secret_async(
+        "/alwayssaved/EXTRACTOR_PUSH_QUEUE_URL"
+    )
+
+    if not extractor_push_queue_url:
+        print("⚠️ ERROR: SQS Queue URL not set for delete_extractor_sqs_message_batch!")
+        return _retry_all(len(incoming_sqs_msgs))
+
+    try:
+        sqs_client = await get_aio_client("sqs")
+        response = await sqs_client.delete_message_batch(
+            QueueUrl=extractor_push_queue_url,
+            Entries=[
+                {"Id": str(index), "ReceiptHandle": incoming_sqs_msg["ReceiptHandle"]}
+                for index, incoming_sqs_msg in enumerate(incoming_sqs_msgs)
+            ],
+        )
+
+        result = _split_batch_response(response, len(incoming_sqs_msgs))
+
+        for index in result["successful"]:
+            print(
+                f"✅ SQS Message Deleted from Extractor Push Queue: {incoming_sqs_msgs[index]['MessageId']}"
+            )
+
+        return result
+
+    except ClientError as e:
         print(
-            f"❌ Boto3 Internal Error in send_embedding_sqs_message for s3_key {sqs_payload['transcript_s3_key']}: {str(e)}"
+            f"❌ AWS Client Error in delete_extractor_sqs_message_batch: {e.response['Error']['Message']}"
         )
 
-    except Exception as e:
+    except BotoCoreError as e:
         print(
-            f"❌ Unexpected Error in send_embedding_sqs_message for s3_key {sqs_payload['transcript_s3_key']}: {str(e)}"
+            f"❌ Boto3 Internal Error in delete_extractor_sqs_message_batch: {str(e)}"
         )
 
+    return _retry_all(len(incoming_sqs_msgs))
+
+
+async def change_extractor_sqs_message_visibility(
+    incoming_sqs_msg: Dict[str, Any], visibility_timeout: int
+) -> bool:
+    """
+    Sets the remaining visibility timeout of an in-flight Extractor Queue message.
+    A visibility_timeout of 0 releases the message back to the queue right away.
+    """
 
-def delete_extractor_sqs_message(incoming_sqs_msg: Dict[str, Any]) -> None:
     try:
-        extractor_push_queue_url = get_secret("/alwayssaved/EXTRACTOR_PUSH_QUEUE_URL")
+        extractor_push_queue_url = await get_secret_async(
+            "/alwayssaved/EXTRACTOR_PUSH_QUEUE_URL"
+        )
 
         if not extractor_push_queue_url:
             raise ValueError(
-                "⚠️ ERROR: SQS Queue URL not set for delete_extractor_sqs_message!"
+                "⚠️ ERROR: SQS Queue URL not set for change_extractor_sqs_message_visibility!"
             )
 
         receipt_handle = incoming_sqs_msg.get("ReceiptHandle", "")
 
         if len(receipt_handle) == 0:
             raise ValueError(
-                "⚠️ ERROR: Missing ReceiptHandle to delete processed message from Extractor Push Queue!"
+                "⚠️ ERROR: Missing ReceiptHandle to change visibility of Extractor Push Queue message!"
             )
 
-        sqs_client.delete_message(
-            QueueUrl=extractor_push_queue_url, ReceiptHandle=receipt_handle
-        )
-        print(
-            f"✅ SQS Message Deleted from Extractor Push Queue: {incoming_sqs_msg['MessageId']}"
+        sqs_client = await get_aio_client("sqs")
+        await sqs_client.change_message_visibility(
+            QueueUrl=extractor_push_queue_url,
+            ReceiptHandle=receipt_handle,
+            VisibilityTimeout=visibility_timeout,
         )
 
+        return True
+
     except ClientError as e:
         print(
-            f"❌ AWS Client Error sending SQS message: {e.response['Error']['Message']}"
+            f"❌ AWS Client Error changing SQS message visibility: {e.response['Error']['Message']}"
         )
 
     except BotoCoreError as e:
-        print(f"❌ Boto3 Internal Error in delete_extractor_sqs_message: {str(e)}")
+        print(
+            f"❌ Boto3 Internal Error in change_extractor_sqs_message_visibility: {str(e)}"
+        )
 
     except ValueError as e:
-        print(f"❌ Unexpected Error in delete_extractor_sqs_message: {str(e)}")
+        print(
+            f"❌ Unexpected Error in change_extractor_sqs_message_visibility: {str(e)}"
+        )
+
+    return False
@@ -0,0 +1,118 @@
+"""
+Keeps an in-flight Extractor Queue message invisible for as long as its job is actually running.
+
+The message is received with a short EXTRACTOR_INITIAL_VISIBILITY_TIMEOUT. Once the media
+duration is probed, the lease is sized from the node's measured real-time factor and renewed
+at half its length until the message is deleted or released. If the node dies, the message
+comes back after at most one lease instead of a fixed 50 minutes.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict
+
+from services.audio_transcription.real_time_factor import estimate_processing_seconds
+from services.aws.sqs import change_extractor_sqs_message_visibility
+
+SQS_MAX_VISIBILITY_TIMEOUT = 43200  # 12 hours, SQS limit counted from first receive.
+
+HEARTBEAT_MIN_LEASE_SECONDS = int(os.getenv("SQS_HEARTBEAT_MIN_LEASE_SECONDS", "30"))
+HEARTBEAT_MAX_LEASE_SECONDS = int(os.getenv("SQS_HEARTBEAT_MAX_LEASE_SECONDS", "600"))
+
+# Download, conversion and upload time on top of the transcription estimate.
+HEARTBEAT_JOB_OVERHEAD_SECONDS = int(
+    os.getenv("SQS_HEARTBEAT_JOB_OVERHEAD_SECONDS", "30")
+)
+
+
+class VisibilityHeartbeat:
+    def __init__(self, sqs_payload: Dict[str, Any], initial_lease_seconds: int):
+        self._sqs_payload = sqs_payload
+        self._message_id = sqs_payload.get("MessageId", "")
+        self._received_at = time.time()
+        self._lease_seconds = initial_lease_seconds
+        self._expected_finish_at: float | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def set_media_duration(self, media_seconds: float) -> None:
+        """
+        Sizes the lease from the probed media duration and kicks off an immediate renewal.
+        The running renewal is stopped first, so two never race to change the visibility.
+        """
+
+        expected_seconds = (
+            estimate_processing_seconds(media_seconds) + HEARTBEAT_JOB_OVERHEAD_SECONDS
+        )
+        self._expected_finish_at = time.time() + expected_seconds
+
+        print(
+            f"💓 SQS Message {self._message_id} has {media_seconds:.0f}s of media, expected to finish in {expected_seconds:.0f}s."
+        )
+
+        if self._task is not None:
+            await self.stop()
+            self._task = asyncio.create_task(self._run(renew_now=True))
+
+    def _next_lease_seconds(self) -> int:
+        if self._expected_finish_at is None:
+            lease = self._lease_seconds
+        else:
+            lease = int(self._expected_finish_at - time.time())
+
+        lease = max(
+            HEARTBEAT_MIN_LEASE_SECONDS, min(lease, HEARTBEAT_MAX_LEASE_SECONDS)
+        )
+
+        # SQS rejects extensions past 12 hours from the original receive.
+        remaining_allowed = int(
+            SQS_MAX_VISIBILITY_TIMEOUT - (time.time() - self._received_at)
+        )
+        return max(0, min(lease, remaining_allowed))
+
+    async def _run(self, renew_now: bool = False) -> None:
+        try:
+            if not renew_now:
+                await asyncio.sleep(self._lease_seconds / 2)
+
+            while True:
+                lease = self._next_lease_seconds()
+                if lease == 0:
+                    print(
+                        f"⚠️ SQS Message {self._message_id} reached the 12 hour visibility limit."
+                    )
+                    return
+
+                renewed = await change_extractor_sqs_message_visibility(
+                    self._sqs_payload, lease
+                )
+                if renewed:
+                    self._lease_seconds = lease
+
+                await asyncio.sleep(max(1, self._lease_seconds / 2))
+
+        except asyncio.CancelledError:
+            pass
+
+    async def stop(self) -> None:
+        """Stops renewing. Call before deleting the message."""
+
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def release(self) -> None:
+        """Stops renewing and makes the message visible again right away for redrive."""
+
+        await self.stop()
+        await change_extractor_sqs_message_visibility(self._sqs_payload, 0)
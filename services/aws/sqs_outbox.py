@@ -0,0 +1,158 @@
+"""
+Batching SQS outbox for embedding hand-offs and Extractor Queue acks.
+
+Entries from every in-flight SQS message are buffered and flushed with SendMessageBatch /
+DeleteMessageBatch once SQS_MAX_BATCH_ENTRIES are waiting or SQS_OUTBOX_MAX_WAIT_MS has passed,
+whichever comes first. Entries that fail inside a batch are retried on their own in a later batch,
+so one bad entry never resends the ones that went through.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Set
+
+from services.aws.sqs import (
+    SQS_MAX_BATCH_ENTRIES,
+    EmbeddingPayload,
+    delete_extractor_sqs_message_batch,
+    send_embedding_sqs_message_batch,
+)
+from services.utils.metrics.main import stage_timer
+from services.utils.types.main import SqsBatchResult
+
+SQS_OUTBOX_MAX_WAIT_MS = int(os.getenv("SQS_OUTBOX_MAX_WAIT_MS", "50"))
+SQS_OUTBOX_MAX_ATTEMPTS = int(os.getenv("SQS_OUTBOX_MAX_ATTEMPTS", "4"))
+
+# Retried entries wait 0.5s, 1s, 2s, ... before they rejoin the outbox.
+_RETRY_BASE_DELAY_SECONDS = 0.5
+
+
+class _PendingEntry(NamedTuple):
+    entry: Any
+    future: asyncio.Future
+    attempt: int
+
+
+class SqsBatcher:
+    """
+    Buffers entries for one batch API and flushes them in batches of up to batch_size.
+    submit resolves once its entry is delivered (True) or has run out of attempts (False).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        flush_batch: Callable[[List[Any]], Awaitable[SqsBatchResult]],
+        batch_size: int = SQS_MAX_BATCH_ENTRIES,
+        max_wait_ms: int = SQS_OUTBOX_MAX_WAIT_MS,
+        max_attempts: int = SQS_OUTBOX_MAX_ATTEMPTS,
+    ):
+        self._name = name
+        self._flush_batch = flush_batch
+        self._batch_size = max(1, min(batch_size, SQS_MAX_BATCH_ENTRIES))
+        self._max_wait_seconds = max_wait_ms / 1000
+        self._max_attempts = max(1, max_attempts)
+        self._queue: asyncio.Queue[_PendingEntry] | None = None
+        self._task: asyncio.Task | None = None
+        self._flushes: Set[asyncio.Task] = set()
+        self._stage = f"sqs_{name.replace(' ', '_')}_batch"
+
+    async def submit(self, entry: Any) -> bool:
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingEntry(entry, future, attempt=1))
+        return await future
+
+    async def _collect_batch(self) -> List[_PendingEntry]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self._max_wait_seconds
+
+        while len(batch) < self._batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+
+            # Keep collecting the next batch while this one is in flight.
+            flush = asyncio.create_task(self._flush(batch))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[_PendingEntry]) -> None:
+        try:
+            with stage_timer(self._stage):
+                result = await self._flush_batch([pending.entry for pending in batch])
+        except Exception as e:
+            print(f"❌ Unexpected error flushing {self._name} SQS batch: {e}")
+            result = {
+                "successful": [],
+                "retryable": list(range(len(batch))),
+                "failed": [],
+            }
+
+        for index in result["successful"]:
+            self._resolve(batch[index], True)
+
+        for index in result["failed"]:
+            self._resolve(batch[index], False)
+
+        for index in result["retryable"]:
+            pending = batch[index]
+
+            if pending.attempt >= self._max_attempts:
+                print(
+                    f"❌ Giving up on {self._name} SQS entry after {pending.attempt} attempts."
+                )
+                self._resolve(pending, False)
+                continue
+
+            delay = _RETRY_BASE_DELAY_SECONDS * (2 ** (pending.attempt - 1))
+            asyncio.get_running_loop().call_later(
+                delay,
+                self._queue.put_nowait,
+                pending._replace(attempt=pending.attempt + 1),
+            )
+
+        print(
+            f"📮 Flushed {self._name} SQS batch: {len(result['successful'])} delivered, {len(result['retryable'])} retrying, {len(result['failed'])} failed"
+        )
+
+    @staticmethod
+    def _resolve(pending: _PendingEntry, delivered: bool) -> None:
+        if not pending.future.done():
+            pending.future.set_result(delivered)
+
+
+embedding_outbox = SqsBatcher("embedding", send_embedding_sqs_message_batch)
+extractor_ack_outbox = SqsBatcher("extractor ack", delete_extractor_sqs_message_batch)
+
+
+async def send_embedding_message(sqs_payload: EmbeddingPayload) -> bool:
+    """Queues a transcript for the embedding_push_queue, resolves once it's sent."""
+
+    return await embedding_outbox.submit(sqs_payload)
+
+
+async def ack_extractor_message(incoming_sqs_msg: Dict[str, Any]) -> bool:
+    """Queues a processed Extractor Push Queue message for deletion, resolves once it's deleted."""
+
+    if not incoming_sqs_msg.get("ReceiptHandle"):
+        print(
+            "⚠️ ERROR: Missing ReceiptHandle to delete processed message from Extractor Push Queue!"
+        )
+        return False
+
+    return await extractor_ack_outbox.submit(incoming_sqs_msg)
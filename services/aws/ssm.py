@@ -1,20 +1,113 @@
+import asyncio
 import os
-from typing import TYPE_CHECKING, Optional
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional, Tuple
 
 import boto3
 from botocore.exceptions import BotoCoreError, ClientError
 
+from services.aws.aio import get_aio_client
+
 if TYPE_CHECKING:
     from mypy_boto3_ssm import SSMClient
 
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 
-ssm_client: "SSMClient" = boto3.client("ssm", region_name=AWS_REGION)
+# Blocking client for lookups from worker threads; coroutines use get_secret_async.
+# Created on first use, boot warms the cache through the async client and rarely needs it.
+_ssm_client: Optional["SSMClient"] = None
+_ssm_client_lock = threading.Lock()
 
+SSM_PARAMETER_PATH = "/alwayssaved/"
+SSM_CACHE_TTL_SECONDS = int(os.getenv("SSM_CACHE_TTL_SECONDS", "300"))
+
+
+class _CachedParameter(NamedTuple):
+    value: str
+    expires_at: float
+
+
+_parameter_cache: Dict[str, _CachedParameter] = {}
+_cache_lock = threading.Lock()
+_refresh_locks: Dict[str, threading.Lock] = {}
+_async_refreshes: Dict[str, asyncio.Future] = {}
+
+
+def _store(param_name: str, value: str) -> None:
+    with _cache_lock:
+        _parameter_cache[param_name] = _CachedParameter(
+            value, time.monotonic() + SSM_CACHE_TTL_SECONDS
+        )
+
+
+def _lookup(param_name: str) -> Tuple[Optional[str], Optional[_CachedParameter]]:
+    """The cached value if it's still fresh, plus whatever entry is cached."""
+
+    with _cache_lock:
+        cached = _parameter_cache.get(param_name)
+
+    if cached is not None and cached.expires_at > time.monotonic():
+        return cached.value, cached
+
+    return None, cached
+
+
+async def load_secrets(path: str = SSM_PARAMETER_PATH) -> int:
+    """
+    Warms the parameter cache with every parameter under path in as few GetParametersByPath calls as possible.
+    Returns the number of parameters loaded.
+    """
 
-def get_secret(param_name: str) -> Optional[str]:
     try:
-        response = ssm_client.get_parameter(Name=param_name, WithDecryption=True)
+        client = await get_aio_client("ssm")
+        paginator = client.get_paginator("get_parameters_by_path")
+        loaded = 0
+
+        async for page in paginator.paginate(
+            Path=path, Recursive=True, WithDecryption=True
+        ):
+            for parameter in page.get("Parameters", []):
+                _store(parameter["Name"], parameter["Value"])
+                loaded += 1
+
+        print(f"✅ Loaded {loaded} SSM parameters under {path}")
+        return loaded
+
+    except ClientError as e:
+        print(
+            f"❌ SSM ClientError in load_secrets: {e.response.get('Error', {}).get('Message', str(e))}"
+        )
+    except BotoCoreError as e:
+        print(f"❌ BotoCoreError in load_secrets: {str(e)}")
+    except Exception as e:
+        print(f"❌ Unexpected error in load_secrets: {str(e)}")
+
+    return 0
+
+
+def invalidate_secret(param_name: Optional[str] = None) -> None:
+    """Drops one cached parameter, or the whole cache when param_name is None."""
+
+    with _cache_lock:
+        if param_name is None:
+            _parameter_cache.clear()
+        else:
+            _parameter_cache.pop(param_name, None)
+
+
+def get_ssm_client() -> "SSMClient":
+    global _ssm_client
+
+    with _ssm_client_lock:
+        if _ssm_client is None:
+            _ssm_client = boto3.client("ssm", region_name=AWS_REGION)
+        return _ssm_client
+
+
+def _fetch_secret(param_name: str) -> Optional[str]:
+    try:
+        response = get_ssm_client().get_parameter(Name=param_name, WithDecryption=True)
         return response["Parameter"]["Value"]
 
     except ClientError as e:
@@ -27,3 +120,76 @@ def get_secret(param_name: str) -> Optional[str]:
         print(f"❌ Unexpected error in get_secret: {str(e)}")
 
     return None
+
+
+def get_secret(param_name: str) -> Optional[str]:
+    """
+    Returns a parameter from the TTL cache, fetching it from SSM on a miss or after expiry.
+    Concurrent callers for the same expired parameter share a single refresh.
+    If the refresh fails, the last known value is served until SSM recovers.
+    """
+
+    value, cached = _lookup(param_name)
+    if value is not None:
+        return value
+
+    with _cache_lock:
+        refresh_lock = _refresh_locks.setdefault(param_name, threading.Lock())
+
+    with refresh_lock:
+        # Another caller may have refreshed it while we waited.
+        value, cached = _lookup(param_name)
+        if value is not None:
+            return value
+
+        value = _fetch_secret(param_name)
+
+        if value is None:
+            return cached.value if cached is not None else None
+
+        _store(param_name, value)
+        return value
+
+
+async def _fetch_secret_async(param_name: str) -> Optional[str]:
+    try:
+        client = await get_aio_client("ssm")
+        response = await client.get_parameter(Name=param_name, WithDecryption=True)
+        return response["Parameter"]["Value"]
+
+    except ClientError as e:
+        print(
+            f"❌ SSM ClientError: {e.response.get('Error', {}).get('Message', str(e))}"
+        )
+    except BotoCoreError as e:
+        print(f"❌ BotoCoreError in SSM: {str(e)}")
+    except Exception as e:
+        print(f"❌ Unexpected error in get_secret_async: {str(e)}")
+
+    return None
+
+
+async def get_secret_async(param_name: str) -> Optional[str]:
+    """
+    get_secret for coroutines, on the same cache. Concurrent callers for the same expired parameter
+    await a single refresh, and a caller being cancelled doesn't cancel it for the others.
+    """
+
+    value, cached = _lookup(param_name)
+    if value is not None:
+        return value
+
+    refresh = _async_refreshes.get(param_name)
+
+    if refresh is None:
+        refresh = asyncio.ensure_future(_fetch_secret_async(param_name))
+        _async_refreshes[param_name] = refresh
+        refresh.add_done_callback(lambda _: _async_refreshes.pop(param_name, None))
+
+    value = await asyncio.shield(refresh)
+
+    if value is None:
+        return cached.value if cached is not None else None
+
+    _store(param_name, value)
+    return value
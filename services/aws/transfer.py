@@ -0,0 +1,498 @@
+"""
+Tuned S3 transfers shared by downloads, streaming ingest and uploads.
+
+Objects are moved as S3_TRANSFER_PART_SIZE_MB parts with up to S3_TRANSFER_MAX_CONCURRENCY parts
+in flight per object, which is what lets multi-GB videos use more than one connection's worth of
+bandwidth. With S3_TRANSFER_CHECKSUM set, uploads ask S3 to store a full-object checksum and
+downloads are verified against it end to end. Every transfer reports its bytes per second.
+
+The *_async transfers do the same from coroutines on the shared aiobotocore client (services/aws/aio.py),
+so many uploads and downloads run at once from the event loop's thread.
+"""
+
+import asyncio
+import base64
+import hashlib
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+from services.aws.aio import get_aio_client
+from services.utils.metrics.main import s3_transfer_bytes_total, stage_seconds
+from services.utils.types.main import TransferStats
+
+MB = 1024 * 1024
+
+S3_TRANSFER_PART_SIZE_MB = int(os.getenv("S3_TRANSFER_PART_SIZE_MB", "16"))
+S3_TRANSFER_MAX_CONCURRENCY = int(os.getenv("S3_TRANSFER_MAX_CONCURRENCY", "10"))
+
+# "" (off), "CRC32" or "SHA256". CRC32 is the cheap one and stays a full-object checksum for multipart uploads.
+S3_TRANSFER_CHECKSUM = os.getenv("S3_TRANSFER_CHECKSUM", "").upper()
+
+transfer_config = TransferConfig(
+    multipart_threshold=S3_TRANSFER_PART_SIZE_MB * MB,
+    multipart_chunksize=S3_TRANSFER_PART_SIZE_MB * MB,
+    max_concurrency=S3_TRANSFER_MAX_CONCURRENCY,
+    use_threads=True,
+)
+
+
+def create_s3_client(region_name: str | None = None):
+    """S3 client with enough pooled connections for every part in flight, plus headroom."""
+
+    return boto3.client(
+        "s3",
+        region_name=region_name,
+        config=Config(max_pool_connections=max(10, S3_TRANSFER_MAX_CONCURRENCY * 2)),
+    )
+
+
+_shared_s3_client = None
+_shared_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """The process's blocking S3 client for worker threads, created on first use instead of at import."""
+
+    global _shared_s3_client
+
+    with _shared_s3_client_lock:
+        if _shared_s3_client is None:
+            _shared_s3_client = create_s3_client()
+        return _shared_s3_client
+
+
+def report_transfer(
+    direction: str, s3_key: str, transferred_bytes: int, seconds: float
+) -> TransferStats:
+    bytes_per_second = transferred_bytes / seconds if seconds > 0 else 0.0
+
+    stage = f"s3_{direction.lower()}"
+    s3_transfer_bytes_total.inc(transferred_bytes, direction=direction.lower())
+    stage_seconds.observe(seconds, stage=stage)
+
+    print(
+        f"📶 {direction} {s3_key}: {transferred_bytes / MB:.1f} MB in {seconds:.2f}s ({bytes_per_second / MB:.1f} MB/s)"
+    )
+
+    return {
+        "s3_key": s3_key,
+        "direction": direction,
+        "bytes": transferred_bytes,
+        "seconds": seconds,
+        "bytes_per_second": bytes_per_second,
+    }
+
+
+# END-TO-END CHECKSUMS
+
+
+class _Crc32:
+    def __init__(self):
+        self._value = 0
+
+    def update(self, data: bytes) -> None:
+        self._value = zlib.crc32(data, self._value)
+
+    def digest(self) -> bytes:
+        return self._value.to_bytes(4, "big")
+
+
+def _new_hasher(algorithm: str):
+    if algorithm == "CRC32":
+        return _Crc32()
+    if algorithm == "SHA256":
+        return hashlib.sha256()
+    raise ValueError(f"Unsupported S3_TRANSFER_CHECKSUM: {algorithm}")
+
+
+def expected_checksum(head_response: Dict[str, Any]) -> str | None:
+    """
+    The object's full-object checksum for S3_TRANSFER_CHECKSUM, or None when it can't be verified locally
+    (checksums off, object uploaded without one, or a composite multipart checksum).
+    """
+
+    if not S3_TRANSFER_CHECKSUM:
+        return None
+
+    checksum = head_response.get(f"Checksum{S3_TRANSFER_CHECKSUM}")
+    checksum_type = head_response.get("ChecksumType")
+
+    if not checksum or checksum_type == "COMPOSITE" or "-" in checksum:
+        return None
+
+    # Without a ChecksumType, only trust checksums of objects that weren't uploaded in parts.
+    if checksum_type is None and "-" in head_response.get("ETag", ""):
+        return None
+
+    return checksum
+
+
+class ChecksumVerifier:
+    """Hashes bytes as they pass through and compares the result with the S3 checksum."""
+
+    def __init__(self, s3_key: str, expected: str | None):
+        self._s3_key = s3_key
+        self._expected = expected
+        self._hasher = _new_hasher(S3_TRANSFER_CHECKSUM) if expected else None
+
+    def update(self, data: bytes) -> None:
+        if self._hasher is not None:
+            self._hasher.update(data)
+
+    def verify(self) -> None:
+        if self._hasher is None:
+            return
+
+        actual = base64.b64encode(self._hasher.digest()).decode("ascii")
+
+        if actual != self._expected:
+            raise ValueError(
+                f"{S3_TRANSFER_CHECKSUM} mismatch for {self._s3_key}: expected {self._expected}, got {actual}"
+            )
+
+
+def _verify_local_file(s3_key: str, file_path: str, expected: str | None) -> None:
+    verifier = ChecksumVerifier(s3_key, expected)
+
+    if expected is None:
+        return
+
+    with open(file_path, "rb") as file:
+        while chunk := file.read(MB):
+            verifier.update(chunk)
+
+    verifier.verify()
+
+
+# TRANSFERS
+
+
+def download_s3_object(
+    s3_client, bucket_name: str, s3_key: str, file_path: str
+) -> TransferStats:
+    """Multipart, concurrent download to file_path. Raises ValueError on a checksum mismatch."""
+
+    start_time = time.perf_counter()
+
+    head_response = (
+        s3_client.head_object(Bucket=bucket_name, Key=s3_key, ChecksumMode="ENABLED")
+        if S3_TRANSFER_CHECKSUM
+        else {}
+    )
+
+    s3_client.download_file(bucket_name, s3_key, file_path, Config=transfer_config)
+
+    _verify_local_file(s3_key, file_path, expected_checksum(head_response))
+
+    return report_transfer(
+        "Downloaded",
+        s3_key,
+        os.path.getsize(file_path),
+        time.perf_counter() - start_time,
+    )
+
+
+def _upload_checksum_args() -> Dict[str, str]:
+    if not S3_TRANSFER_CHECKSUM:
+        return {}
+
+    checksum_args = {"ChecksumAlgorithm": S3_TRANSFER_CHECKSUM}
+    # CRC checksums of multipart uploads can be combined into one for the whole object, SHA256 can't.
+    if S3_TRANSFER_CHECKSUM == "CRC32":
+        checksum_args["ChecksumType"] = "FULL_OBJECT"
+
+    return checksum_args
+
+
+def upload_s3_object(
+    s3_client, file_path: str, bucket_name: str, s3_key: str
+) -> TransferStats:
+    """Multipart, concurrent upload of file_path. S3 validates every part against the checksum when one is set."""
+
+    start_time = time.perf_counter()
+
+    extra_args = _upload_checksum_args() or None
+
+    s3_client.upload_file(
+        file_path, bucket_name, s3_key, ExtraArgs=extra_args, Config=transfer_config
+    )
+
+    return report_transfer(
+        "Uploaded",
+        s3_key,
+        os.path.getsize(file_path),
+        time.perf_counter() - start_time,
+    )
+
+
+class ParallelS3Body:
+    """
+    Drop-in for a GetObject body that fetches parts with concurrent ranged GETs but yields them in order,
+    so sequential consumers like ffmpeg's stdin get the multipart download rate.
+    At most S3_TRANSFER_MAX_CONCURRENCY parts are buffered ahead of the consumer.
+    """
+
+    def __init__(self, s3_client, bucket_name: str, s3_key: str):
+        self._s3_client = s3_client
+        self._bucket_name = bucket_name
+        self._s3_key = s3_key
+        self._part_size = S3_TRANSFER_PART_SIZE_MB * MB
+        self._closed = threading.Event()
+
+        head_response = s3_client.head_object(
+            Bucket=bucket_name, Key=s3_key, ChecksumMode="ENABLED"
+        )
+        self._size: int = head_response["ContentLength"]
+        # Every part must come from the same version of the object.
+        self._etag: str = head_response["ETag"]
+        self._expected_checksum = expected_checksum(head_response)
+
+    def _get_part(self, start: int) -> bytes:
+        end = min(start + self._part_size, self._size) - 1
+        response = self._s3_client.get_object(
+            Bucket=self._bucket_name,
+            Key=self._s3_key,
+            Range=f"bytes={start}-{end}",
+            IfMatch=self._etag,
+        )
+        return response["Body"].read()
+
+    def iter_chunks(self, chunk_size: int | None = None) -> Iterator[bytes]:
+        """Yields whole parts in order; chunk_size is accepted for GetObject body compatibility."""
+
+        start_time = time.perf_counter()
+        verifier = ChecksumVerifier(self._s3_key, self._expected_checksum)
+        offsets = iter(range(0, self._size, self._part_size))
+        pending: Deque[Future] = deque()
+
+        with ThreadPoolExecutor(max_workers=S3_TRANSFER_MAX_CONCURRENCY) as pool:
+            for offset in offsets:
+                pending.append(pool.submit(self._get_part, offset))
+                if len(pending) >= S3_TRANSFER_MAX_CONCURRENCY:
+                    break
+
+            while pending and not self._closed.is_set():
+                part = pending.popleft().result()
+
+                next_offset = next(offsets, None)
+                if next_offset is not None:
+                    pending.append(pool.submit(self._get_part, next_offset))
+
+                verifier.update(part)
+                yield part
+
+            for future in pending:
+                future.cancel()
+
+        if self._closed.is_set():
+            return
+
+        verifier.verify()
+        report_transfer(
+            "Streamed", self._s3_key, self._size, time.perf_counter() - start_time
+        )
+
+    def close(self) -> None:
+        self._closed.set()
+
+
+# ASYNC TRANSFERS
+
+
+def _read_file_range(file_path: str, offset: int, length: int) -> bytes:
+    with open(file_path, "rb") as file:
+        file.seek(offset)
+        return file.read(length)
+
+
+def _truncate_file(file_path: str, size: int) -> None:
+    with open(file_path, "wb") as file:
+        file.truncate(size)
+
+
+def _write_file_range(file_path: str, offset: int, data: bytes) -> None:
+    with open(file_path, "r+b") as file:
+        file.seek(offset)
+        file.write(data)
+
+
+async def _read_body(response: Dict[str, Any]) -> bytes:
+    async with response["Body"] as body:
+        return await body.read()
+
+
+async def upload_s3_object_async(
+    file_path: str, bucket_name: str, s3_key: str
+) -> TransferStats:
+    """
+    upload_s3_object for coroutines. Parts are read in order and uploaded with up to
+    S3_TRANSFER_MAX_CONCURRENCY in flight. If the upload fails or is cancelled, it's aborted so
+    no orphaned parts are left in the bucket.
+    """
+
+    s3_client = await get_aio_client("s3")
+
+    start_time = time.perf_counter()
+    size = os.path.getsize(file_path)
+    part_size = S3_TRANSFER_PART_SIZE_MB * MB
+    checksum_args = _upload_checksum_args()
+
+    if size <= part_size:
+        put_args: Dict[str, Any] = {}
+        if S3_TRANSFER_CHECKSUM:
+            put_args["ChecksumAlgorithm"] = S3_TRANSFER_CHECKSUM
+
+        await s3_client.put_object(
+            Bucket=bucket_name,
+            Key=s3_key,
+            Body=await asyncio.to_thread(_read_file_range, file_path, 0, size),
+            **put_args,
+        )
+
+        return report_transfer(
+            "Uploaded", s3_key, size, time.perf_counter() - start_time
+        )
+
+    upload_id = (
+        await s3_client.create_multipart_upload(
+            Bucket=bucket_name, Key=s3_key, **checksum_args
+        )
+    )["UploadId"]
+
+    # FULL_OBJECT CRC32 has to be sent with the completion, parts are hashed in order as they're read.
+    full_object_hasher = _Crc32() if S3_TRANSFER_CHECKSUM == "CRC32" else None
+    part_slots = asyncio.Semaphore(S3_TRANSFER_MAX_CONCURRENCY)
+    part_tasks: List[asyncio.Task] = []
+
+    async def upload_part(part_number: int, data: bytes) -> Dict[str, Any]:
+        try:
+            part_args: Dict[str, Any] = {}
+            if S3_TRANSFER_CHECKSUM:
+                part_args["ChecksumAlgorithm"] = S3_TRANSFER_CHECKSUM
+
+            response = await s3_client.upload_part(
+                Bucket=bucket_name,
+                Key=s3_key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=data,
+                **part_args,
+            )
+        finally:
+            part_slots.release()
+
+        part = {"PartNumber": part_number, "ETag": response["ETag"]}
+        if S3_TRANSFER_CHECKSUM:
+            checksum_field = f"Checksum{S3_TRANSFER_CHECKSUM}"
+            part[checksum_field] = response[checksum_field]
+
+        return part
+
+    try:
+        for part_number, offset in enumerate(range(0, size, part_size), start=1):
+            # Bounds both the requests in flight and the part buffers held in memory.
+            await part_slots.acquire()
+
+            data = await asyncio.to_thread(
+                _read_file_range, file_path, offset, part_size
+            )
+            if full_object_hasher is not None:
+                full_object_hasher.update(data)
+
+            part_tasks.append(asyncio.create_task(upload_part(part_number, data)))
+
+        parts = await asyncio.gather(*part_tasks)
+
+        completion_args: Dict[str, Any] = {}
+        if full_object_hasher is not None:
+            completion_args = {
+                "ChecksumCRC32": base64.b64encode(full_object_hasher.digest()).decode(
+                    "ascii"
+                ),
+                "ChecksumType": "FULL_OBJECT",
+            }
+
+        await s3_client.complete_multipart_upload(
+            Bucket=bucket_name,
+            Key=s3_key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+            **completion_args,
+        )
+
+    except BaseException:
+        for task in part_tasks:
+            task.cancel()
+
+        # Shielded, so the abort still goes out when the upload itself was cancelled.
+        await asyncio.shield(
+            s3_client.abort_multipart_upload(
+                Bucket=bucket_name, Key=s3_key, UploadId=upload_id
+            )
+        )
+        raise
+
+    return report_transfer("Uploaded", s3_key, size, time.perf_counter() - start_time)
+
+
+async def download_s3_object_async(
+    bucket_name: str, s3_key: str, file_path: str
+) -> TransferStats:
+    """
+    download_s3_object for coroutines. Parts are fetched with concurrent ranged GETs pinned to one
+    version of the object and written in place. Raises ValueError on a checksum mismatch.
+    """
+
+    s3_client = await get_aio_client("s3")
+
+    start_time = time.perf_counter()
+
+    head_response = await s3_client.head_object(
+        Bucket=bucket_name, Key=s3_key, ChecksumMode="ENABLED"
+    )
+    size: int = head_response["ContentLength"]
+    etag: str = head_response["ETag"]
+    part_size = S3_TRANSFER_PART_SIZE_MB * MB
+    part_slots = asyncio.Semaphore(S3_TRANSFER_MAX_CONCURRENCY)
+
+    await asyncio.to_thread(_truncate_file, file_path, size)
+
+    async def download_part(offset: int) -> None:
+        async with part_slots:
+            end = min(offset + part_size, size) - 1
+            response = await s3_client.get_object(
+                Bucket=bucket_name,
+                Key=s3_key,
+                Range=f"bytes={offset}-{end}",
+                IfMatch=etag,
+            )
+            data = await _read_body(response)
+
+        await asyncio.to_thread(_write_file_range, file_path, offset, data)
+
+    part_tasks = [
+        asyncio.create_task(download_part(offset))
+        for offset in range(0, size, part_size)
+    ]
+
+    try:
+        await asyncio.gather(*part_tasks)
+    except BaseException:
+        for task in part_tasks:
+            task.cancel()
+        raise
+
+    await asyncio.to_thread(
+        _verify_local_file, s3_key, file_path, expected_checksum(head_response)
+    )
+
+    return report_transfer("Downloaded", s3_key, size, time.perf_counter() - start_time)
@@ -0,0 +1,171 @@
+"""
+Admission control for the media fan-out: ffmpeg and ffprobe processes (MEDIA_MAX_FFMPEG_PROCESSES)
+and decoded audio held in memory (AUDIO_MEMORY_BUDGET_MB).
+"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from services.utils.metrics.main import (
+    Gauge,
+    audio_reserved_bytes,
+    ffmpeg_processes,
+)
+
+# auto = one per core, at least 2.
+MEDIA_MAX_FFMPEG_PROCESSES = os.getenv("MEDIA_MAX_FFMPEG_PROCESSES", "auto")
+
+# 0 = auto, a quarter of the node's memory (or of its cgroup limit in a container).
+AUDIO_MEMORY_BUDGET_MB = int(os.getenv("AUDIO_MEMORY_BUDGET_MB", "0"))
+
+MB = 1024 * 1024
+
+_AUTO_AUDIO_MEMORY_FRACTION = 0.25
+
+
+class ByteBudget:
+    """
+    Bytes reserved by running jobs, kept within a budget. acquire waits until a reservation fits;
+    one bigger than the whole budget still runs, it just waits to have the budget to itself.
+    """
+
+    def __init__(self, gauge: Gauge, budget_bytes: int | None = None, **labels: Any):
+        self._gauge = gauge
+        self._labels = labels
+        self._budget_bytes = budget_bytes
+        self._reserved_bytes = 0
+        self._condition: asyncio.Condition | None = None
+
+    @property
+    def budget_bytes(self) -> int | None:
+        return self._budget_bytes
+
+    @property
+    def reserved_bytes(self) -> int:
+        return self._reserved_bytes
+
+    def set_budget(self, budget_bytes: int) -> None:
+        self._budget_bytes = max(0, budget_bytes)
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _clamp(self, reserve_bytes: int) -> int:
+        return max(0, min(reserve_bytes, self._budget_bytes))
+
+    def _update(self, change: int) -> None:
+        self._reserved_bytes += change
+        self._gauge.set(self._reserved_bytes, **self._labels)
+
+    async def acquire(self, reserve_bytes: int) -> int:
+        """Waits until reserve_bytes fit, returns the bytes reserved to pass to adjust and release."""
+
+        reserve_bytes = self._clamp(reserve_bytes)
+        condition = self._get_condition()
+
+        async with condition:
+            await condition.wait_for(
+                lambda: self._reserved_bytes + reserve_bytes <= self._budget_bytes
+            )
+            self._update(reserve_bytes)
+
+        return reserve_bytes
+
+    async def adjust(self, reserved_bytes: int, actual_bytes: int) -> int:
+        """
+        Swaps an estimate for what the job really holds, without waiting. Returns the new reservation.
+        Growing past the budget is allowed, the bytes are already in use, it only holds back new jobs.
+        """
+
+        actual_bytes = self._clamp(actual_bytes)
+        condition = self._get_condition()
+
+        async with condition:
+            self._update(actual_bytes - reserved_bytes)
+            condition.notify_all()
+
+        return actual_bytes
+
+    async def release(self, reserved_bytes: int) -> None:
+        if not reserved_bytes:
+            return
+
+        condition = self._get_condition()
+
+        async with condition:
+            self._update(-reserved_bytes)
+            condition.notify_all()
+
+
+class ProcessSlots:
+    """Caps child processes of one kind running at once. acquire/release pair like a lock; hold() wraps them."""
+
+    def __init__(self, name: str, limit: int):
+        self._name = name
+        self._limit = max(1, limit)
+        self._semaphore: asyncio.Semaphore | None = None
+        self._running = 0
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    async def acquire(self) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._limit)
+
+        await self._semaphore.acquire()
+        self._running += 1
+        ffmpeg_processes.set(self._running, process=self._name)
+
+    def release(self) -> None:
+        self._running -= 1
+        ffmpeg_processes.set(self._running, process=self._name)
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def hold(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+def resolve_ffmpeg_process_limit() -> int:
+    if MEDIA_MAX_FFMPEG_PROCESSES == "auto":
+        return max(2, os.cpu_count() or 1)
+
+    return max(1, int(MEDIA_MAX_FFMPEG_PROCESSES))
+
+
+def _memory_limit_bytes() -> int:
+    """Physical memory, or the cgroup v2 limit when the container has a lower one."""
+
+    limit = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+    try:
+        with open("/sys/fs/cgroup/memory.max", encoding="utf-8") as file:
+            cgroup_limit = file.read().strip()
+        if cgroup_limit.isdigit():
+            limit = min(limit, int(cgroup_limit))
+    except OSError:
+        pass
+
+    return limit
+
+
+def resolve_audio_memory_budget() -> int:
+    if AUDIO_MEMORY_BUDGET_MB > 0:
+        return AUDIO_MEMORY_BUDGET_MB * MB
+
+    return int(_memory_limit_bytes() * _AUTO_AUDIO_MEMORY_FRACTION)
+
+
+ffmpeg_slots = ProcessSlots("ffmpeg", resolve_ffmpeg_process_limit())
+
+audio_memory = ByteBudget(audio_reserved_bytes, resolve_audio_memory_budget())
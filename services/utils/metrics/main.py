@@ -0,0 +1,377 @@
+"""
+Pipeline instrumentation.
+
+Histograms and counters per pipeline stage, labeled with model, device and file type, served by
+prometheus_client on http://0.0.0.0:METRICS_PORT/metrics. Every job also emits one structured
+JSON timing record with its per-stage seconds, so p50/p95/p99 and compute per media-hour can be
+computed from either side.
+
+The same server answers /ready with 200 once the service can take SQS messages (503 before), and
+READINESS_FILE mirrors it on disk for file-based probes.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Tuple
+
+import prometheus_client
+
+# 0 disables the endpoint.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+# Append job records to this JSON-lines file as well as stdout.
+METRICS_JOB_LOG_PATH = os.getenv("METRICS_JOB_LOG_PATH", "")
+
+# Created while the service is ready to take SQS messages, removed otherwise. Empty disables it.
+READINESS_FILE = os.getenv("READINESS_FILE", "")
+
+# Stages run from milliseconds (Mongo, SQS) to an hour (transcribing long media on CPU).
+STAGE_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+    300,
+    600,
+    1800,
+    3600,
+)
+REAL_TIME_FACTOR_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 4)
+
+_default_labels: Dict[str, str] = {"model": "", "device": "", "file_type": ""}
+
+# Only the counters themselves, not a _created series per label set.
+prometheus_client.disable_created_metrics()
+
+
+def set_default_labels(**labels: str) -> None:
+    """Labels stamped on every sample, e.g. model and device once they're known at boot."""
+
+    _default_labels.update({name: str(value) for name, value in labels.items()})
+
+
+class _Metric:
+    """
+    A prometheus_client metric labeled with the default labels plus its own. Labels left out of a call
+    are stamped with their default, or "".
+    """
+
+    def __init__(
+        self,
+        metric_class: type,
+        name: str,
+        help_text: str,
+        labels: Tuple[str, ...] = (),
+        **kwargs: Any,
+    ):
+        self._label_names = tuple(_default_labels) + labels
+        self._metric = metric_class(name, help_text, self._label_names, **kwargs)
+
+    def _labeled(self, labels: Dict[str, Any]):
+        values = {name: "" for name in self._label_names}
+        values.update(_default_labels)
+        values.update({name: str(value) for name, value in labels.items()})
+        return self._metric.labels(**values)
+
+
+class Counter(_Metric):
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        super().__init__(prometheus_client.Counter, name, help_text, labels)
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        self._labeled(labels).inc(amount)
+
+
+class Gauge(_Metric):
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        super().__init__(prometheus_client.Gauge, name, help_text, labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        self._labeled(labels).set(value)
+
+
+class Histogram(_Metric):
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        buckets: Tuple[float, ...],
+        labels: Tuple[str, ...] = (),
+    ):
+        super().__init__(
+            prometheus_client.Histogram, name, help_text, labels, buckets=buckets
+        )
+
+    def observe(self, value: float, **labels: Any) -> None:
+        self._labeled(labels).observe(value)
+
+
+stage_seconds = Histogram(
+    "extractor_stage_seconds",
+    "Seconds spent per pipeline stage.",
+    STAGE_BUCKETS,
+    ("stage",),
+)
+real_time_factor = Histogram(
+    "extractor_real_time_factor",
+    "Transcription seconds per media second, per job.",
+    REAL_TIME_FACTOR_BUCKETS,
+)
+jobs_total = Counter(
+    "extractor_jobs_total",
+    "Media uploads and SQS messages processed, by status.",
+    ("job_type", "status"),
+)
+media_seconds_total = Counter(
+    "extractor_media_seconds_total", "Seconds of media processed."
+)
+stage_errors_total = Counter(
+    "extractor_stage_errors_total", "Pipeline stages that raised, by stage.", ("stage",)
+)
+s3_transfer_bytes_total = Counter(
+    "extractor_s3_transfer_bytes_total",
+    "Bytes moved to and from S3, by direction.",
+    ("direction",),
+)
+scratch_reserved_bytes = Gauge(
+    "extractor_scratch_reserved_bytes", "Scratch bytes reserved by running jobs."
+)
+audio_reserved_bytes = Gauge(
+    "extractor_audio_reserved_bytes",
+    "Decoded audio bytes reserved in memory by running jobs.",
+)
+ffmpeg_processes = Gauge(
+    "extractor_ffmpeg_processes", "ffmpeg and ffprobe processes running.", ("process",)
+)
+pipeline_queue_depth = Gauge(
+    "extractor_pipeline_queue_depth",
+    "Jobs waiting in front of each pipeline stage.",
+    ("stage",),
+)
+pipeline_busy_workers = Gauge(
+    "extractor_pipeline_busy_workers",
+    "Pipeline stage workers working on a job.",
+    ("stage",),
+)
+pipeline_busy_seconds_total = Counter(
+    "extractor_pipeline_busy_seconds_total",
+    "Seconds pipeline stage workers spent on jobs; rate / stage concurrency = utilization.",
+    ("stage",),
+)
+routing_decisions_total = Counter(
+    "extractor_routing_decisions_total",
+    "Media uploads routed, by routing rule, model, precision and user tier.",
+    ("rule", "precision", "tier"),
+)
+language_hints_total = Counter(
+    "extractor_language_hints_total",
+    "Transcriptions given the user's language (hinted) or left to Whisper's detection (detected).",
+    ("outcome",),
+)
+transcript_cache_lookups_total = Counter(
+    "extractor_transcript_cache_lookups_total",
+    "Transcript cache lookups, by fingerprint kind (s3 or audio) and outcome (hit or miss).",
+    ("kind", "outcome"),
+)
+vad_skipped_seconds_total = Counter(
+    "extractor_vad_skipped_seconds_total",
+    "Seconds of media without speech cut out before transcription.",
+)
+vad_saved_seconds_total = Counter(
+    "extractor_vad_saved_seconds_total",
+    "Estimated transcription seconds saved by cutting out media without speech.",
+)
+routed_job_seconds = Histogram(
+    "extractor_routed_job_seconds",
+    "Seconds from a media upload entering the pipeline to it finishing, by routing rule.",
+    STAGE_BUCKETS,
+    ("rule", "status"),
+)
+cold_start_seconds = Gauge(
+    "extractor_cold_start_seconds",
+    "Seconds from process start until the service was ready to take SQS messages.",
+)
+
+
+@contextmanager
+def stage_timer(stage: str, **labels: Any) -> Iterator[None]:
+    """Times a block into extractor_stage_seconds; works around awaits too."""
+
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        stage_errors_total.inc(stage=stage, **labels)
+        raise
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage=stage, **labels)
+
+
+class JobTimer:
+    """
+    Collects the stage timings of one job (a media upload or an SQS message) into a structured record,
+    while feeding the same numbers into the stage histograms.
+    """
+
+    def __init__(self, job_type: str, file_type: str = "", **fields: Any):
+        self._file_type = file_type
+        self._start = time.perf_counter()
+        self.record: Dict[str, Any] = {
+            "job_type": job_type,
+            "file_type": file_type,
+            **fields,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "stages": {},
+        }
+
+    def add_stage(self, stage: str, seconds: float) -> None:
+        stages = self.record["stages"]
+        stages[stage] = stages.get(stage, 0.0) + seconds
+        stage_seconds.observe(seconds, stage=stage, file_type=self._file_type)
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            stage_errors_total.inc(stage=stage, file_type=self._file_type)
+            raise
+        finally:
+            self.add_stage(stage, time.perf_counter() - start)
+
+    def finish(self, status: str, **fields: Any) -> Dict[str, Any]:
+        """Closes the record, counts the job and emits the record as one JSON line."""
+
+        self.record.update(fields)
+        self.record["status"] = status
+        self.record["total_seconds"] = time.perf_counter() - self._start
+        for name, value in _default_labels.items():
+            self.record.setdefault(name, value)
+
+        jobs_total.inc(
+            job_type=self.record["job_type"], status=status, file_type=self._file_type
+        )
+
+        media_seconds = self.record.get("media_seconds")
+        if media_seconds:
+            media_seconds_total.inc(media_seconds, file_type=self._file_type)
+
+        emit_job_record(self.record)
+        return self.record
+
+
+_job_log_lock = threading.Lock()
+
+
+def emit_job_record(record: Dict[str, Any]) -> None:
+    line = json.dumps(record, default=str)
+
+    print(f"📊 {line}")
+
+    if METRICS_JOB_LOG_PATH:
+        with (
+            _job_log_lock,
+            open(METRICS_JOB_LOG_PATH, mode="a", encoding="utf-8") as file,
+        ):
+            file.write(line + "\n")
+
+
+# READINESS
+
+_imported_at = time.time()
+_ready = threading.Event()
+
+
+def process_age_seconds() -> float:
+    """Seconds since this process started, or since this module was imported where /proc isn't available."""
+
+    try:
+        with open("/proc/self/stat", encoding="utf-8") as file:
+            # Fields after the parenthesized command name, starttime (clock ticks after boot) is field 22.
+            start_ticks = int(file.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", encoding="utf-8") as file:
+            uptime = float(file.read().split()[0])
+
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+    except (OSError, ValueError, IndexError):
+        return time.time() - _imported_at
+
+
+def set_ready(ready: bool) -> None:
+    if ready:
+        _ready.set()
+    else:
+        _ready.clear()
+
+    if not READINESS_FILE:
+        return
+
+    try:
+        if ready:
+            with open(READINESS_FILE, mode="w", encoding="utf-8") as file:
+                file.write(f"{os.getpid()}\n")
+        elif os.path.exists(READINESS_FILE):
+            os.remove(READINESS_FILE)
+    except OSError as e:
+        print(f"❌ Failed to update READINESS_FILE {READINESS_FILE}: {e}")
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+class _MetricsHandler(prometheus_client.MetricsHandler):
+    """prometheus_client's /metrics handler, plus /ready."""
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/ready":
+            super().do_GET()
+            return
+
+        ready = is_ready()
+        body = b"ready\n" if ready else b"starting\n"
+
+        self.send_response(200 if ready else 503)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Scrapes every few seconds would drown the service logs.
+        pass
+
+
+def start_metrics_server(port: int = METRICS_PORT) -> ThreadingHTTPServer | None:
+    """Serves /metrics from a daemon thread. Returns None when disabled or the port is taken."""
+
+    if port <= 0:
+        return None
+
+    try:
+        server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    except OSError as e:
+        print(f"❌ Failed to start metrics server on port {port}: {e}")
+        return None
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"✅ Serving Prometheus metrics on :{port}/metrics and readiness on /ready")
+
+    return server
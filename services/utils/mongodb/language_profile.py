@@ -0,0 +1,147 @@
+"""
+Per-user language profiles in the user_language_profiles collection. A user's dominant detected language
+is passed to Whisper as a hint so its language detection pass is skipped, with a periodic re-detect.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, NamedTuple
+
+from bson.objectid import ObjectId
+from pymongo import AsyncMongoClient
+from pymongo.errors import PyMongoError
+
+from services.utils.metrics.main import language_hints_total
+
+LANGUAGE_HINTS_ENABLED = os.getenv("LANGUAGE_HINTS_ENABLED", "true") == "true"
+
+# Share of a user's detections the top language needs before it's used as a hint.
+LANGUAGE_HINT_MIN_CONFIDENCE = float(os.getenv("LANGUAGE_HINT_MIN_CONFIDENCE", "0.9"))
+LANGUAGE_HINT_MIN_DETECTIONS = int(os.getenv("LANGUAGE_HINT_MIN_DETECTIONS", "3"))
+
+# 0 never re-detects once a user has a hint.
+LANGUAGE_HINT_REDETECT_EVERY = int(os.getenv("LANGUAGE_HINT_REDETECT_EVERY", "25"))
+
+LANGUAGE_PROFILE_CACHE_SECONDS = float(
+    os.getenv("LANGUAGE_PROFILE_CACHE_SECONDS", "600")
+)
+LANGUAGE_PROFILE_CACHE_SIZE = 10000
+
+
+class _CachedProfile(NamedTuple):
+    detections: Dict[str, int]
+    fetched_at: float
+
+
+_cache_lock = threading.Lock()
+_cache: "OrderedDict[str, _CachedProfile]" = OrderedDict()
+
+# Hinted uploads per user since the last re-detection.
+_hinted_uploads: Dict[str, int] = {}
+
+
+def _get_collection(mongo_client: AsyncMongoClient):
+    return mongo_client.get_database("alwayssaved").get_collection(
+        "user_language_profiles"
+    )
+
+
+def _remember(
+    user_id: str, detections: Dict[str, int], fetched_at: float | None = None
+) -> None:
+    with _cache_lock:
+        _cache[user_id] = _CachedProfile(detections, fetched_at or time.monotonic())
+        _cache.move_to_end(user_id)
+
+        while len(_cache) > LANGUAGE_PROFILE_CACHE_SIZE:
+            evicted_user_id, _ = _cache.popitem(last=False)
+            _hinted_uploads.pop(evicted_user_id, None)
+
+
+async def _get_detections(
+    mongo_client: AsyncMongoClient, user_id: str
+) -> Dict[str, int]:
+    with _cache_lock:
+        cached = _cache.get(user_id)
+
+    if cached and time.monotonic() - cached.fetched_at < LANGUAGE_PROFILE_CACHE_SECONDS:
+        return cached.detections
+
+    try:
+        profile = await _get_collection(mongo_client).find_one(
+            {"_id": ObjectId(user_id)}
+        )
+    except PyMongoError as e:
+        print(f"❌ MongoDB Error in get_language_hint: {e}")
+        return cached.detections if cached else {}
+
+    detections = dict((profile or {}).get("detections", {}))
+    _remember(user_id, detections)
+    return detections
+
+
+def pick_language_hint(detections: Dict[str, int]) -> str | None:
+    """The top detected language, if it's confident enough to skip detection."""
+
+    total = sum(detections.values())
+    if total < max(1, LANGUAGE_HINT_MIN_DETECTIONS):
+        return None
+
+    language, count = max(detections.items(), key=lambda item: item[1])
+    return language if count / total >= LANGUAGE_HINT_MIN_CONFIDENCE else None
+
+
+async def get_language_hint(mongo_client: AsyncMongoClient, user_id: str) -> str | None:
+    """
+    Returns the language to transcribe user_id's next upload in, or None to let Whisper detect it.
+    """
+
+    if not LANGUAGE_HINTS_ENABLED or not ObjectId.is_valid(user_id):
+        return None
+
+    language = pick_language_hint(await _get_detections(mongo_client, user_id))
+
+    if language and LANGUAGE_HINT_REDETECT_EVERY > 0:
+        with _cache_lock:
+            hinted_uploads = _hinted_uploads.get(user_id, 0) + 1
+            _hinted_uploads[user_id] = hinted_uploads % LANGUAGE_HINT_REDETECT_EVERY
+
+        if hinted_uploads >= LANGUAGE_HINT_REDETECT_EVERY:
+            language = None
+
+    language_hints_total.inc(outcome="hinted" if language else "detected")
+    return language
+
+
+async def record_detected_language(
+    mongo_client: AsyncMongoClient, user_id: str, language: str | None
+) -> None:
+    """Counts a language Whisper detected for one of user_id's uploads in their profile."""
+
+    if not LANGUAGE_HINTS_ENABLED or not language or not ObjectId.is_valid(user_id):
+        return
+
+    try:
+        await _get_collection(mongo_client).update_one(
+            {"_id": ObjectId(user_id)},
+            {
+                "$inc": {f"detections.{language}": 1},
+                "$set": {"updated_at": datetime.now(timezone.utc)},
+            },
+            upsert=True,
+        )
+    except PyMongoError as e:
+        print(f"❌ MongoDB Error in record_detected_language: {e}")
+        return
+
+    with _cache_lock:
+        cached = _cache.get(user_id)
+
+    # Keep this node's copy current without another read. It still expires on schedule, picking up other nodes' counts.
+    if cached:
+        detections = dict(cached.detections)
+        detections[language] = detections.get(language, 0) + 1
+        _remember(user_id, detections, cached.fetched_at)
@@ -5,20 +5,23 @@ MongoDB util functions file.
 from pymongo import AsyncMongoClient
 from pymongo.errors import ConnectionFailure
 
-from services.aws.ssm import get_secret
+from services.aws.ssm import get_secret_async
 
 
-def create_mongodb_instance() -> AsyncMongoClient | None:
+async def create_mongodb_instance() -> AsyncMongoClient | None:
+    # Served from the cache load_secrets warmed; a miss is fetched with the async client, never on the loop.
     try:
-        mongo_db_user = get_secret("/alwayssaved/MONGO_DB_USER")
+        mongo_db_user = await get_secret_async("/alwayssaved/MONGO_DB_USER")
 
-        mongo_db_password = get_secret("/alwayssaved/MONGO_DB_PASSWORD")
+        mongo_db_password = await get_secret_async("/alwayssaved/MONGO_DB_PASSWORD")
 
-        mongo_db_base_uri = get_secret("/alwayssaved/MONGO_DB_BASE_URI")
+        mongo_db_base_uri = await get_secret_async("/alwayssaved/MONGO_DB_BASE_URI")
 
-        mongo_db_name = get_secret("/alwayssaved/MONGO_DB_NAME")
+        mongo_db_name = await get_secret_async("/alwayssaved/MONGO_DB_NAME")
 
-        mongo_db_cluster_name = get_secret("/alwayssaved/MONGO_DB_CLUSTER_NAME")
+        mongo_db_cluster_name = await get_secret_async(
+            "/alwayssaved/MONGO_DB_CLUSTER_NAME"
+        )
 
         if (
             mongo_db_user is None
@@ -0,0 +1,190 @@
+"""
+Content-addressed transcript cache: identical media, by S3 object or by decoded audio, reuses the
+transcript already produced with the same model and options instead of being transcribed again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import numpy as np
+from bson.objectid import ObjectId
+from pymongo import AsyncMongoClient, UpdateOne
+from pymongo.errors import PyMongoError
+
+from services.audio_extractor.main import iter_pcm_file
+from services.utils.metrics.main import transcript_cache_lookups_total
+from services.utils.types.main import CachedTranscript, TranscriptCacheStats
+
+# Bump when the Whisper weights or decoding change, then call invalidate_transcript_cache.
+TRANSCRIPT_CACHE_VERSION = os.getenv("TRANSCRIPT_CACHE_VERSION", "1")
+TRANSCRIPT_CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE_ENABLED", "true") == "true"
+
+# Read size when fingerprinting a PCM file, a minute of audio.
+_PCM_WINDOW_SAMPLES = 60 * 16000
+
+_stats_lock = threading.Lock()
+_stats = {"s3_hits": 0, "s3_misses": 0, "audio_hits": 0, "audio_misses": 0}
+
+
+def _get_collection(mongo_client: AsyncMongoClient):
+    return mongo_client.get_database("alwayssaved").get_collection("transcript_cache")
+
+
+def build_cache_key(
+    kind: str, fingerprint: str, model_name: str, options: Dict[str, Any]
+) -> str:
+    key_material = json.dumps(
+        {
+            "kind": kind,
+            "fingerprint": fingerprint,
+            "model_name": model_name,
+            "options": options,
+            "cache_version": TRANSCRIPT_CACHE_VERSION,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+def fingerprint_s3_object(head_response: Dict[str, Any]) -> str | None:
+    """
+    Prefers a full-object S3 checksum, falls back to ETag + size.
+    Multipart ETags depend on the part size, so identical media can still miss here and hit on the audio key.
+    """
+
+    for checksum_field in ("ChecksumSHA256", "ChecksumCRC64NVME", "ChecksumCRC32C"):
+        checksum = head_response.get(checksum_field)
+        if (
+            checksum
+            and head_response.get("ChecksumType", "FULL_OBJECT") == "FULL_OBJECT"
+        ):
+            return f"{checksum_field}:{checksum}"
+
+    etag = (head_response.get("ETag") or "").strip('"')
+    if not etag:
+        return None
+
+    return f"ETag:{etag}:{head_response.get('ContentLength', 0)}"
+
+
+def fingerprint_audio(audio: np.ndarray) -> str:
+    return hashlib.sha256(audio.tobytes()).hexdigest()
+
+
+def fingerprint_pcm_file(pcm_path: str) -> str:
+    """Same fingerprint as fingerprint_audio of the file's decoded audio, without loading all of it."""
+
+    digest = hashlib.sha256()
+    for window in iter_pcm_file(pcm_path, _PCM_WINDOW_SAMPLES):
+        digest.update(window.tobytes())
+    return digest.hexdigest()
+
+
+async def lookup_cached_transcript(
+    mongo_client: AsyncMongoClient, cache_key: str, kind: str
+) -> CachedTranscript | None:
+    if not TRANSCRIPT_CACHE_ENABLED:
+        return None
+
+    try:
+        entry = await _get_collection(mongo_client).find_one(
+            {"_id": cache_key, "cache_version": TRANSCRIPT_CACHE_VERSION}
+        )
+    except PyMongoError as e:
+        print(f"❌ MongoDB Error in lookup_cached_transcript: {e}")
+        entry = None
+
+    with _stats_lock:
+        _stats[f"{kind}_misses" if entry is None else f"{kind}_hits"] += 1
+
+    transcript_cache_lookups_total.inc(
+        kind=kind, outcome="miss" if entry is None else "hit"
+    )
+
+    if entry is None:
+        return None
+
+    return {
+        "transcript_s3_key": entry["transcript_s3_key"],
+        "transcript_file_id": str(entry["transcript_file_id"]),
+        "audio_s3_key": entry.get("audio_s3_key") or "",
+    }
+
+
+async def store_cached_transcript(
+    mongo_client: AsyncMongoClient,
+    cache_keys: List[str],
+    model_name: str,
+    cached_transcript: CachedTranscript,
+) -> None:
+    if not TRANSCRIPT_CACHE_ENABLED or not cache_keys:
+        return
+
+    entry = {
+        "transcript_s3_key": cached_transcript["transcript_s3_key"],
+        "transcript_file_id": ObjectId(cached_transcript["transcript_file_id"]),
+        "audio_s3_key": cached_transcript["audio_s3_key"],
+        "model_name": model_name,
+        "cache_version": TRANSCRIPT_CACHE_VERSION,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+    try:
+        await _get_collection(mongo_client).bulk_write(
+            [
+                UpdateOne({"_id": cache_key}, {"$set": entry}, upsert=True)
+                for cache_key in cache_keys
+            ],
+            ordered=False,
+        )
+    except PyMongoError as e:
+        print(f"❌ MongoDB Error in store_cached_transcript: {e}")
+
+
+async def forget_cached_transcript(
+    mongo_client: AsyncMongoClient, cache_key: str
+) -> None:
+    """Drops an entry whose S3 objects are gone (e.g. the original note was deleted)."""
+
+    try:
+        await _get_collection(mongo_client).delete_one({"_id": cache_key})
+    except PyMongoError as e:
+        print(f"❌ MongoDB Error in forget_cached_transcript: {e}")
+
+
+async def invalidate_transcript_cache(
+    mongo_client: AsyncMongoClient, model_name: str | None = None
+) -> int:
+    """
+    Deletes entries from older TRANSCRIPT_CACHE_VERSIONs, or every entry for model_name when given.
+    Returns the number of entries deleted.
+    """
+
+    query: Dict[str, Any] = (
+        {"model_name": model_name}
+        if model_name
+        else {"cache_version": {"$ne": TRANSCRIPT_CACHE_VERSION}}
+    )
+
+    result = await _get_collection(mongo_client).delete_many(query)
+
+    print(f"🗑️ Invalidated {result.deleted_count} transcript cache entries.")
+    return result.deleted_count
+
+
+def get_transcript_cache_stats() -> TranscriptCacheStats:
+    with _stats_lock:
+        # Every upload starts with an s3 lookup, the audio lookup only runs after an s3 miss.
+        uploads = _stats["s3_hits"] + _stats["s3_misses"]
+        hits = _stats["s3_hits"] + _stats["audio_hits"]
+
+        return {
+            "s3_hits": _stats["s3_hits"],
+            "audio_hits": _stats["audio_hits"],
+            "misses": _stats["audio_misses"],
+            "hit_rate": hits / uploads if uploads else 0.0,
+        }
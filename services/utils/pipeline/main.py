@@ -0,0 +1,236 @@
+"""
+Staged job pipeline.
+
+A job moves through a fixed sequence of stages (for media uploads: fetch, decode, vad, transcribe,
+publish). Each stage has its own pool of worker tasks and a bounded queue in front of it:
+  - A stage never runs more than `concurrency` jobs at once.
+  - A stage whose downstream queue is full holds its finished job until there's room, so work piles
+    up in front of the slowest stage (the transcriber) instead of in memory or on scratch disk.
+While stage N works on one job, the stages before it are already preparing the next ones.
+Queue depth, busy workers and busy seconds per stage are exported as extractor_pipeline_* metrics.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Set
+
+from services.utils.metrics.main import (
+    pipeline_busy_seconds_total,
+    pipeline_busy_workers,
+    pipeline_queue_depth,
+)
+
+
+class Stage(NamedTuple):
+    """
+    handler returns None to pass the job on to the next stage, or the job's result to finish it.
+    Jobs for which skip(job) is true go straight past the stage without queueing for it.
+    """
+
+    name: str
+    handler: Callable[[Any], Awaitable[Any]]
+    concurrency: int
+    queue_size: int
+    skip: Callable[[Any], bool] | None = None
+
+
+class _QueuedJob(NamedTuple):
+    job: Any
+    future: asyncio.Future
+
+
+class StagedPipeline:
+    """
+    Runs jobs through stages with bounded queues between them. submit resolves with the job's result.
+    finalize(job) runs exactly once per job, however it leaves the pipeline (finished, raised, cancelled),
+    and is where the job's resources are released.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        stages: List[Stage],
+        finalize: Callable[[Any], Awaitable[None]] | None = None,
+    ):
+        self._name = name
+        self._stages = stages
+        self._finalize = finalize
+        self._queues: List[asyncio.Queue[_QueuedJob]] = []
+        self._workers: Set[asyncio.Task] = set()
+        self._busy: Dict[str, int] = {stage.name: 0 for stage in stages}
+        self._busy_seconds: Dict[str, float] = {stage.name: 0.0 for stage in stages}
+        self._pending = 0
+
+    @property
+    def stages(self) -> List[Stage]:
+        return self._stages
+
+    def start(self) -> None:
+        """Spawns every stage's workers on the running loop. submit calls it on first use."""
+
+        if self._workers:
+            return
+
+        self._queues = [
+            asyncio.Queue(maxsize=max(1, stage.queue_size)) for stage in self._stages
+        ]
+
+        for index, stage in enumerate(self._stages):
+            for _ in range(max(1, stage.concurrency)):
+                worker = asyncio.create_task(self._work(index))
+                self._workers.add(worker)
+                worker.add_done_callback(self._workers.discard)
+
+        print(
+            f"✅ [BOOT] {self._name} pipeline: "
+            + ", ".join(
+                f"{stage.name} x{stage.concurrency} (queue {stage.queue_size})"
+                for stage in self._stages
+            )
+        )
+
+    def accepting(self) -> bool:
+        """False while the first stage's queue is full, i.e. new jobs would only wait in submit."""
+
+        return not self._queues or not self._queues[0].full()
+
+    def pending(self) -> int:
+        """Jobs submitted and not finished yet, queued or being worked on in any stage."""
+
+        return self._pending
+
+    def busy_seconds(self) -> Dict[str, float]:
+        """Seconds each stage's workers spent on jobs, for utilization = busy / (wall * concurrency)."""
+
+        return dict(self._busy_seconds)
+
+    async def submit(self, job: Any) -> Any:
+        self.start()
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending += 1
+        future.add_done_callback(self._job_done)
+
+        first_index = self._next_index(job, 0)
+
+        if first_index is None:
+            await self._finish(job, future, None)
+            return await future
+
+        try:
+            await self._put(first_index, _QueuedJob(job, future))
+        except asyncio.CancelledError:
+            await asyncio.shield(self._finish(job, future, cancelled=True))
+            raise
+
+        return await future
+
+    def _job_done(self, _: asyncio.Future) -> None:
+        self._pending -= 1
+
+    def _next_index(self, job: Any, index: int) -> int | None:
+        while index < len(self._stages):
+            skip = self._stages[index].skip
+            if not (skip and skip(job)):
+                return index
+            index += 1
+
+        return None
+
+    async def _put(self, index: int, queued: _QueuedJob) -> None:
+        await self._queues[index].put(queued)
+        pipeline_queue_depth.set(
+            self._queues[index].qsize(), stage=self._stages[index].name
+        )
+
+    async def _finish(
+        self,
+        job: Any,
+        future: asyncio.Future,
+        result: Any = None,
+        error: Exception | None = None,
+        cancelled: bool = False,
+    ) -> None:
+        try:
+            if self._finalize:
+                await self._finalize(job)
+        except Exception as e:
+            print(f"❌ Failed to finalize a {self._name} pipeline job: {e}")
+        finally:
+            if not future.done():
+                if cancelled:
+                    future.cancel()
+                elif error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    async def _work(self, index: int) -> None:
+        stage = self._stages[index]
+        queue = self._queues[index]
+
+        while True:
+            queued = await queue.get()
+            pipeline_queue_depth.set(queue.qsize(), stage=stage.name)
+
+            try:
+                # Whoever submitted it stopped waiting (e.g. its SQS message was cancelled).
+                if queued.future.done():
+                    await self._finish(queued.job, queued.future)
+                    continue
+
+                self._busy[stage.name] += 1
+                pipeline_busy_workers.set(self._busy[stage.name], stage=stage.name)
+                start = time.perf_counter()
+
+                try:
+                    result = await stage.handler(queued.job)
+                except asyncio.CancelledError:
+                    await asyncio.shield(
+                        self._finish(queued.job, queued.future, cancelled=True)
+                    )
+                    raise
+                except Exception as e:
+                    await self._finish(queued.job, queued.future, error=e)
+                    continue
+                finally:
+                    elapsed = time.perf_counter() - start
+                    self._busy[stage.name] -= 1
+                    self._busy_seconds[stage.name] += elapsed
+                    pipeline_busy_workers.set(self._busy[stage.name], stage=stage.name)
+                    pipeline_busy_seconds_total.inc(elapsed, stage=stage.name)
+
+                next_index = (
+                    self._next_index(queued.job, index + 1) if result is None else None
+                )
+
+                if next_index is None:
+                    await self._finish(queued.job, queued.future, result)
+                    continue
+
+                try:
+                    # Blocks while the next stage is backed up, which is the backpressure.
+                    await self._put(next_index, queued)
+                except asyncio.CancelledError:
+                    await asyncio.shield(
+                        self._finish(queued.job, queued.future, cancelled=True)
+                    )
+                    raise
+
+            finally:
+                queue.task_done()
+
+    async def stop(self) -> None:
+        """Cancels every worker and finalizes the jobs still queued."""
+
+        workers = list(self._workers)
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        for queue in self._queues:
+            while not queue.empty():
+                queued = queue.get_nowait()
+                await self._finish(queued.job, queued.future, cancelled=True)
+
+        self._queues = []
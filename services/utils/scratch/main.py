@@ -0,0 +1,121 @@
+"""
+Per-job scratch workspaces under SCRATCH_DIR (or /dev/shm with SCRATCH_TMPFS), within SCRATCH_BUDGET_MB.
+Each is removed when its job ends, and ones left behind by a crashed process are purged at boot.
+"""
+
+import asyncio
+import os
+import re
+import shutil
+import tempfile
+from typing import NamedTuple
+
+from services.utils.admission.main import ByteBudget
+from services.utils.metrics.main import scratch_reserved_bytes
+
+# Defaults to the system temp dir. Point it at a fast local volume (NVMe, instance store) if there is one.
+SCRATCH_DIR = os.getenv("SCRATCH_DIR", "")
+SCRATCH_TMPFS = os.getenv("SCRATCH_TMPFS", "false") == "true"
+
+# 0 = auto, 80% of the scratch volume's free space at boot.
+SCRATCH_BUDGET_MB = int(os.getenv("SCRATCH_BUDGET_MB", "0"))
+
+TMPFS_MOUNT = "/dev/shm"
+
+MB = 1024 * 1024
+
+_WORKSPACE_PREFIX = "job-"
+_AUTO_BUDGET_FRACTION = 0.8
+
+
+class Workspace(NamedTuple):
+    path: str
+    reserved_bytes: int
+
+
+def resolve_scratch_root() -> str:
+    if SCRATCH_TMPFS:
+        if os.path.isdir(TMPFS_MOUNT):
+            return os.path.join(TMPFS_MOUNT, "alwayssaved-extractor")
+
+        print(f"⚠️ SCRATCH_TMPFS is set but {TMPFS_MOUNT} doesn't exist, using disk.")
+
+    if SCRATCH_DIR:
+        return SCRATCH_DIR
+
+    return os.path.join(tempfile.gettempdir(), "alwayssaved-extractor")
+
+
+class ScratchSpace:
+    """
+    Hands out isolated job directories under one root and keeps the bytes reserved by running
+    jobs within the budget. acquire and release pair like a lock.
+    """
+
+    def __init__(self, root: str | None = None, budget_bytes: int | None = None):
+        self._root = root
+        self._budget = ByteBudget(scratch_reserved_bytes, budget_bytes)
+        self._prepared = False
+
+    @property
+    def root(self) -> str | None:
+        return self._root
+
+    def prepare(self) -> None:
+        """Creates the root, purges workspaces a crashed process left behind and sizes the budget."""
+
+        root = self._root or resolve_scratch_root()
+        os.makedirs(root, exist_ok=True)
+
+        for name in os.listdir(root):
+            if name.startswith(_WORKSPACE_PREFIX):
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+                print(f"🧹 Removed stale scratch workspace {name}")
+
+        if self._budget.budget_bytes is None:
+            if SCRATCH_BUDGET_MB > 0:
+                self._budget.set_budget(SCRATCH_BUDGET_MB * MB)
+            else:
+                self._budget.set_budget(
+                    int(shutil.disk_usage(root).free * _AUTO_BUDGET_FRACTION)
+                )
+
+        self._root = root
+        self._prepared = True
+
+        print(
+            f"✅ [BOOT] Scratch workspaces in {root} with a {self._budget.budget_bytes / MB:.0f} MB budget."
+        )
+
+    async def acquire(self, job_name: str, reserve_bytes: int) -> Workspace:
+        """Waits until reserve_bytes fit in the budget, then creates the job's directory."""
+
+        if not self._prepared:
+            await asyncio.to_thread(self.prepare)
+
+        # A job bigger than the whole budget still runs, it just waits to have the space to itself.
+        reserve_bytes = await self._budget.acquire(reserve_bytes)
+
+        try:
+            safe_name = re.sub(r"[^A-Za-z0-9._-]", "_", job_name)[:48]
+            path = await asyncio.to_thread(
+                tempfile.mkdtemp,
+                prefix=f"{_WORKSPACE_PREFIX}{safe_name}-",
+                dir=self._root,
+            )
+        except BaseException:
+            await self._budget.release(reserve_bytes)
+            raise
+
+        return Workspace(path, reserve_bytes)
+
+    async def release(self, workspace: Workspace) -> None:
+        """Deletes the job's directory with everything in it and returns its bytes to the budget."""
+
+        try:
+            await asyncio.to_thread(shutil.rmtree, workspace.path, True)
+        finally:
+            await self._budget.release(workspace.reserved_bytes)
+
+
+scratch_space = ScratchSpace()
@@ -1,9 +1,4 @@
-from typing import TypedDict
-
-
-class FilePayload(TypedDict):
-    uploaded_s3_key: str
-    new_file_id: str
+from typing import Any, Dict, List, NotRequired, TypedDict
 
 
 class s3MediaUpload(TypedDict):
@@ -19,11 +14,68 @@ class BaseFilePayload(TypedDict):
     file_path: str
 
 
+class FileRecord(TypedDict):
+    uploaded_s3_key: str
+    new_file_id: str
+    document: Dict[str, Any]
+
+
 class ExtractorStatus(TypedDict):
     s3_key: str
     status: str
+    # Successful uploads only, published once the whole SQS message is done.
+    file_records: NotRequired[List[FileRecord]]
+    embedding_message: NotRequired[Dict[str, Any]]
+    cache_keys: NotRequired[List[str]]
+    # The routed model the transcript came from, stored with its cache entries.
+    model_name: NotRequired[str]
+    cached_transcript: NotRequired["CachedTranscript"]
 
 
 class s3DownloadConvertResult(TypedDict):
     file_name: str
     file_extension: str
+
+
+class ModelRegistryStats(TypedDict):
+    hits: int
+    misses: int
+    evictions: int
+    resident_models: List[str]
+    resident_bytes: int
+    load_seconds: Dict[str, float]
+
+
+class CachedTranscript(TypedDict):
+    transcript_s3_key: str
+    transcript_file_id: str
+    audio_s3_key: str
+
+
+class TranscriptCacheStats(TypedDict):
+    s3_hits: int
+    audio_hits: int
+    misses: int
+    hit_rate: float
+
+
+class CopyFilePayload(TypedDict):
+    user_id: str
+    note_id: str
+    file_name: str
+    source_s3_key: str
+
+
+class TransferStats(TypedDict):
+    s3_key: str
+    direction: str
+    bytes: int
+    seconds: float
+    bytes_per_second: float
+
+
+class SqsBatchResult(TypedDict):
+    # Indexes into the batch entries.
+    successful: List[int]
+    retryable: List[int]
+    failed: List[int]